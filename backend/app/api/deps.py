@@ -1,18 +1,18 @@
 from collections.abc import Generator
 from typing import Annotated
 
-import boto3
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
-from mypy_boto3_dynamodb import DynamoDBServiceResource
 from pydantic import ValidationError
 from sqlmodel import Session
+from types_aiobotocore_dynamodb import DynamoDBServiceResource
 
 from app.core import security
 from app.core.config import settings
 from app.core.db import engine
+from app.core.dynamodb import dynamodb_pool
 from app.models.sql.models import TokenPayload, User
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -29,28 +29,8 @@ SessionDep = Annotated[Session, Depends(get_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-async def get_boto3_session() -> boto3.Session:
-    if settings.ENVIRONMENT == "local":
-        return boto3.Session(
-            region_name=settings.AWS_REGION,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            aws_session_token=settings.AWS_SESSION_TOKEN,
-        )
-
-    return boto3.Session(region_name=settings.AWS_REGION)
-
-
-Boto3SessionDep = Annotated[boto3.Session, Depends(get_boto3_session)]
-
-
-async def get_dynamodb_service_resource(
-    session: Boto3SessionDep,
-) -> DynamoDBServiceResource:
-    if settings.ENVIRONMENT == "local":
-        return session.resource("dynamodb", endpoint_url=settings.DYNAMODB_URL)
-
-    return session.resource("dynamodb")
+async def get_dynamodb_service_resource() -> DynamoDBServiceResource:
+    return await dynamodb_pool.open()
 
 
 DynamoDbServiceResourceDep = Annotated[
@@ -0,0 +1,76 @@
+"""
+Responses serialized straight from already validated models.
+
+FastAPI validates whatever a handler returns against the route's
+`response_model` and then encodes the validated copy with `json.dumps`. A
+handler whose return value is built from validated models can return a
+`ModelResponse` instead: FastAPI sends a `Response` as is, and pydantic-core
+writes the JSON bytes in a single pass. The `response_model` still documents
+the route in the OpenAPI schema.
+"""
+
+import types
+from collections.abc import Mapping, Sequence
+from functools import cache
+from typing import Any, Union, get_args, get_origin
+
+from fastapi import status
+from fastapi.responses import Response
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+
+
+class ModelResponse(Response):
+    """
+    Renders `content`, which may be any model whose fields include those of
+    `response_model` (e.g. a DynamoDB item for its public schema), limited to
+    the fields of `response_model` and without validating it again.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: BaseModel,
+        response_model: type[BaseModel],
+        status_code: int = status.HTTP_200_OK,
+        headers: Mapping[str, str] | None = None,
+        background: BackgroundTask | None = None,
+    ) -> None:
+        self.response_model = response_model
+        super().__init__(content, status_code, headers, background=background)
+
+    def render(self, content: BaseModel) -> bytes:
+        # The schema of `response_model` only emits its own fields, also for
+        # nested models, so filtering is only needed for other classes.
+        include = None
+        if type(content) is not self.response_model:
+            include = response_fields(self.response_model)
+        return content.__pydantic_serializer__.to_json(content, include=include)
+
+
+@cache
+def response_fields(model: type[BaseModel]) -> dict[str, Any]:
+    """`include` that restricts a dump to the fields of `model`, recursively."""
+    return {
+        name: nested_fields(field.annotation)
+        for name, field in model.model_fields.items()
+    }
+
+
+def nested_fields(annotation: Any) -> Any:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return response_fields(annotation)
+
+    origin = get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        for arg in get_args(annotation):
+            if arg is not type(None):
+                nested = nested_fields(arg)
+                if nested is not True:
+                    return nested
+        return True
+    if isinstance(origin, type) and issubclass(origin, Sequence):
+        nested = nested_fields(get_args(annotation)[0])
+        return True if nested is True else {"__all__": nested}
+    return True
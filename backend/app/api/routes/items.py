@@ -5,6 +5,7 @@ from fastapi import APIRouter, HTTPException
 from sqlmodel import func, select
 
 from app.api.deps import CurrentUser, SessionDep
+from app.api.responses import ModelResponse
 from app.models.sql.models import (
     Item,
     ItemCreate,
@@ -45,7 +46,7 @@ def read_items(
         )
         items = session.exec(statement).all()
 
-    return ItemsPublic(data=items, count=count)
+    return ModelResponse(ItemsPublic(data=items, count=count), ItemsPublic)
 
 
 @router.get("/{id}", response_model=ItemPublic)
@@ -1,31 +1,562 @@
-from fastapi import APIRouter, status
+from datetime import datetime
+from typing import Any
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
 
 from app.api.deps import (
     CurrentSuperUser,
     CurrentUser,
     DynamoDbServiceResourceDep,
 )
+from app.api.responses import ModelResponse
+from app.core.availability import week_slot
+from app.core.config import settings
 from app.crud import partner as partner_crud
-from app.schemas.partners import PartnerCreate, PartnerPublic
+from app.crud import partner_import
+from app.exceptions import ConflictException, NotFoundException
+from app.models.dynamodb.base import normalize_string, tokenize
+from app.models.dynamodb.partners import Partner
+from app.schemas.partners import (
+    PartnerCreate,
+    PartnerImportReport,
+    PartnerProfilePublic,
+    PartnerPublic,
+    PartnersBatchGet,
+    PartnersBatchPublic,
+    PartnersNearbyPublic,
+    PartnersOpenPublic,
+    PartnersPublic,
+    PartnersSearchPublic,
+    PartnerUpdate,
+    ServiceCreate,
+    ServicePublic,
+    ServiceUpdate,
+    StafferCreate,
+    StafferPublic,
+    StafferUpdate,
+)
+from app.utils import decode_cursor, encode_cursor
 
 router = APIRouter()
 
+PARTNER_FIELDS = set(PartnerProfilePublic.model_fields) - {"id"}
+PARTNER_CHILDREN: dict[str, type[BaseModel]] = {
+    "services": ServicePublic,
+    "staff": StafferPublic,
+}
+
 
 @router.post("/", response_model=PartnerPublic, status_code=status.HTTP_201_CREATED)
-def crate_partner(
+async def crate_partner(
     _: CurrentSuperUser,
     partner_in: PartnerCreate,
     dynamodb_service_resource: DynamoDbServiceResourceDep,
-):
-    return partner_crud.create_partner(dynamodb_service_resource, partner_in)
+    transactional: bool = Query(
+        default=False,
+        description="Write the partner and its children all-or-nothing.",
+    ),
+) -> Any:
+    return await partner_crud.create_partner(
+        dynamodb_service_resource, partner_in, transactional
+    )
+
+
+@router.post(
+    "/import",
+    response_model=PartnerImportReport,
+    status_code=status.HTTP_200_OK,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {
+                    "schema": {"$ref": "#/components/schemas/PartnerCreate"}
+                }
+            },
+        }
+    },
+)
+async def import_partners(
+    _: CurrentSuperUser,
+    request: Request,
+    dynamodb_service_resource: DynamoDbServiceResourceDep,
+) -> Any:
+    """
+    Bulk import partners from a newline-delimited JSON body, one
+    PartnerCreate per line.
+    """
+    return await partner_import.import_partners(
+        dynamodb_service_resource, request.stream()
+    )
+
+
+@router.get("/", response_model=PartnersPublic, status_code=status.HTTP_200_OK)
+async def list_partners(
+    _: CurrentUser,
+    dynamodb_service_resource: DynamoDbServiceResourceDep,
+    name_prefix: str | None = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
+) -> Any:
+    """
+    List partners ordered by name, optionally filtered by a name prefix.
+    """
+    scope = (
+        f"partners:{settings.PARTNER_NAME_INDEX_SHARDS}:"
+        f"{normalize_string(name_prefix or '')}"
+    )
+    exclusive_start_key = decode_scoped_cursor(cursor, scope)
+
+    partners, last_evaluated_key = await partner_crud.list_partners(
+        dynamodb_service_resource, name_prefix, limit, exclusive_start_key
+    )
+    next_cursor = (
+        encode_cursor(last_evaluated_key, scope) if last_evaluated_key else None
+    )
+    return {"data": partners, "cursor": next_cursor}
+
+
+@router.get("/open", response_model=PartnersOpenPublic, status_code=status.HTTP_200_OK)
+async def list_open_partners(
+    _: CurrentUser,
+    dynamodb_service_resource: DynamoDbServiceResourceDep,
+    at: datetime = Query(
+        description="Wall-clock time in the partners' local time; any time zone "
+        "offset is ignored."
+    ),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
+) -> Any:
+    """
+    List partners open at a given time, resolved to 15-minute weekly slots.
+    """
+    scope = f"partners-open:{week_slot(at)}"
+    exclusive_start_key = decode_scoped_cursor(cursor, scope)
+
+    slots, last_evaluated_key = await partner_crud.list_open_partners(
+        dynamodb_service_resource, at, limit, exclusive_start_key
+    )
+    next_cursor = (
+        encode_cursor(last_evaluated_key, scope) if last_evaluated_key else None
+    )
+    return {
+        "data": [{"id": slot.partner_id, "name": slot.name} for slot in slots],
+        "cursor": next_cursor,
+    }
+
+
+@router.get(
+    "/search", response_model=PartnersSearchPublic, status_code=status.HTTP_200_OK
+)
+async def search_partners(
+    _: CurrentUser,
+    dynamodb_service_resource: DynamoDbServiceResourceDep,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
+) -> Any:
+    """
+    Search partners whose name contains every word of `q`, ordered by name.
+    A page may hold fewer than `limit` partners while a cursor is returned.
+    """
+    tokens = tokenize(q)
+    if not tokens:
+        raise HTTPException(status_code=400, detail="Query has no words")
+
+    scope = f"partners-search:{' '.join(sorted(tokens))}"
+    exclusive_start_key = decode_scoped_cursor(cursor, scope)
+
+    postings, last_evaluated_key = await partner_crud.search_partners(
+        dynamodb_service_resource, q, limit, exclusive_start_key
+    )
+    next_cursor = (
+        encode_cursor(last_evaluated_key, scope) if last_evaluated_key else None
+    )
+    return {
+        "data": [
+            {"id": posting.partner_id, "name": posting.name} for posting in postings
+        ],
+        "cursor": next_cursor,
+    }
+
+
+@router.get(
+    "/nearby", response_model=PartnersNearbyPublic, status_code=status.HTTP_200_OK
+)
+async def find_nearby_partners(
+    _: CurrentUser,
+    dynamodb_service_resource: DynamoDbServiceResourceDep,
+    lat: float = Query(ge=-90, le=90),
+    lon: float = Query(ge=-180, le=180),
+    radius: float = Query(
+        default=2_000,
+        gt=0,
+        le=settings.PARTNER_NEARBY_MAX_RADIUS_METERS,
+        description="Search radius in meters.",
+    ),
+    limit: int = Query(default=20, ge=1, le=100),
+) -> Any:
+    """
+    Find partners within `radius` meters of a point, nearest first.
+    """
+    try:
+        nearby = await partner_crud.find_nearby_partners(
+            dynamodb_service_resource, lat, lon, radius, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "data": [
+            {**partner.model_dump(exclude={"services", "staff"}), "distance": distance}
+            for partner, distance in nearby
+        ]
+    }
+
+
+@router.post(
+    "/batch-get", response_model=PartnersBatchPublic, status_code=status.HTTP_200_OK
+)
+async def batch_get_partners(
+    _: CurrentUser,
+    batch_in: PartnersBatchGet,
+    dynamodb_service_resource: DynamoDbServiceResourceDep,
+) -> Any:
+    partners, not_found = await partner_crud.get_partners(
+        dynamodb_service_resource, batch_in.ids
+    )
+    return {"data": partners, "not_found": not_found}
 
 
 @router.get(
     "/{partner_id}", response_model=PartnerPublic, status_code=status.HTTP_200_OK
 )
-def get_partner(
+async def get_partner(
     _: CurrentUser,
     partner_id: str,
     dynamodb_service_resource: DynamoDbServiceResourceDep,
-):
-    return partner_crud.get_partner(dynamodb_service_resource, partner_id)
+    include: str | None = Query(
+        default=None,
+        description="Comma separated child collections to return: services, staff.",
+    ),
+    fields: str | None = Query(
+        default=None,
+        description="Comma separated partner attributes to return.",
+    ),
+    if_none_match: str | None = Header(default=None),
+) -> Any:
+    """
+    Get a partner with its children. The ETag is the version of the whole
+    collection, so with a matching `If-None-Match` only the version of the
+    partner row is read and 304 is returned.
+    """
+    if if_none_match is not None:
+        version = await partner_crud.get_partner_version(
+            dynamodb_service_resource, partner_id
+        )
+        if version is not None and etag_matches(if_none_match, version):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": format_etag(version)},
+            )
+
+    if include is None and fields is None:
+        partner = await partner_crud.get_partner(dynamodb_service_resource, partner_id)
+        if not partner:
+            raise NotFoundException("Partner", partner_id)
+
+        return ModelResponse(
+            partner, PartnerPublic, headers={"ETag": format_etag(partner.version)}
+        )
+
+    include_set = (
+        parse_selection("include", include, set(PARTNER_CHILDREN))
+        if include is not None
+        else set(PARTNER_CHILDREN)
+    )
+    fields_set = (
+        parse_selection("fields", fields, PARTNER_FIELDS)
+        if fields is not None
+        else None
+    )
+    partner = await partner_crud.get_partner_view(
+        dynamodb_service_resource, partner_id, include_set, fields_set
+    )
+    if not partner:
+        raise NotFoundException("Partner", partner_id)
+
+    return JSONResponse(
+        content=to_sparse_content(partner, include_set, fields_set),
+        status_code=status.HTTP_200_OK,
+        headers={"ETag": format_etag(partner.version)},
+    )
+
+
+@router.patch(
+    "/{partner_id}",
+    response_model=PartnerProfilePublic,
+    status_code=status.HTTP_200_OK,
+)
+async def update_partner(
+    _: CurrentSuperUser,
+    partner_id: str,
+    partner_in: PartnerUpdate,
+    response: Response,
+    dynamodb_service_resource: DynamoDbServiceResourceDep,
+    if_match: str | None = Header(default=None),
+) -> Any:
+    if not partner_in.model_dump(exclude_none=True):
+        raise HTTPException(status_code=400, detail="No fields to update")
+
+    try:
+        partner = await partner_crud.update_partner(
+            dynamodb_service_resource, partner_id, partner_in, parse_if_match(if_match)
+        )
+    except partner_crud.VersionConflictError as e:
+        raise version_conflict(partner_id, e)
+    if not partner:
+        raise NotFoundException("Partner", partner_id)
+
+    response.headers["ETag"] = format_etag(partner.version)
+    return partner
+
+
+@router.post(
+    "/{partner_id}/services",
+    response_model=ServicePublic,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_service(
+    _: CurrentSuperUser,
+    partner_id: str,
+    service_in: ServiceCreate,
+    dynamodb_service_resource: DynamoDbServiceResourceDep,
+) -> Any:
+    service = await partner_crud.create_service(
+        dynamodb_service_resource, partner_id, service_in
+    )
+    if not service:
+        raise NotFoundException("Partner", partner_id)
+
+    return service
+
+
+@router.patch(
+    "/{partner_id}/services/{service_id}",
+    response_model=ServicePublic,
+    status_code=status.HTTP_200_OK,
+)
+async def update_service(
+    _: CurrentSuperUser,
+    partner_id: str,
+    service_id: str,
+    service_in: ServiceUpdate,
+    response: Response,
+    dynamodb_service_resource: DynamoDbServiceResourceDep,
+    if_match: str | None = Header(default=None),
+) -> Any:
+    if not service_in.model_dump(exclude_none=True):
+        raise HTTPException(status_code=400, detail="No fields to update")
+
+    expected_version = parse_if_match(if_match)
+    try:
+        service = await partner_crud.update_service(
+            dynamodb_service_resource,
+            partner_id,
+            service_id,
+            service_in,
+            expected_version,
+        )
+    except partner_crud.VersionConflictError as e:
+        raise version_conflict(partner_id, e)
+    if not service:
+        raise NotFoundException("Service", service_id)
+
+    # Child writes are versioned by their partner, whose new version is only
+    # known when the write was conditional on the old one.
+    if expected_version is not None:
+        response.headers["ETag"] = format_etag(expected_version + 1)
+    return service
+
+
+@router.delete(
+    "/{partner_id}/services/{service_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def delete_service(
+    _: CurrentSuperUser,
+    partner_id: str,
+    service_id: str,
+    dynamodb_service_resource: DynamoDbServiceResourceDep,
+    if_match: str | None = Header(default=None),
+) -> None:
+    try:
+        deleted = await partner_crud.delete_service(
+            dynamodb_service_resource, partner_id, service_id, parse_if_match(if_match)
+        )
+    except partner_crud.VersionConflictError as e:
+        raise version_conflict(partner_id, e)
+    if not deleted:
+        raise NotFoundException("Service", service_id)
+
+
+@router.post(
+    "/{partner_id}/staff",
+    response_model=StafferPublic,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_staffer(
+    _: CurrentSuperUser,
+    partner_id: str,
+    staffer_in: StafferCreate,
+    dynamodb_service_resource: DynamoDbServiceResourceDep,
+) -> Any:
+    staffer = await partner_crud.create_staffer(
+        dynamodb_service_resource, partner_id, staffer_in
+    )
+    if not staffer:
+        raise NotFoundException("Partner", partner_id)
+
+    return staffer
+
+
+@router.patch(
+    "/{partner_id}/staff/{staffer_id}",
+    response_model=StafferPublic,
+    status_code=status.HTTP_200_OK,
+)
+async def update_staffer(
+    _: CurrentSuperUser,
+    partner_id: str,
+    staffer_id: str,
+    staffer_in: StafferUpdate,
+    response: Response,
+    dynamodb_service_resource: DynamoDbServiceResourceDep,
+    if_match: str | None = Header(default=None),
+) -> Any:
+    if not staffer_in.model_dump(exclude_none=True):
+        raise HTTPException(status_code=400, detail="No fields to update")
+
+    expected_version = parse_if_match(if_match)
+    try:
+        staffer = await partner_crud.update_staffer(
+            dynamodb_service_resource,
+            partner_id,
+            staffer_id,
+            staffer_in,
+            expected_version,
+        )
+    except partner_crud.VersionConflictError as e:
+        raise version_conflict(partner_id, e)
+    if not staffer:
+        raise NotFoundException("Staffer", staffer_id)
+
+    # Child writes are versioned by their partner, whose new version is only
+    # known when the write was conditional on the old one.
+    if expected_version is not None:
+        response.headers["ETag"] = format_etag(expected_version + 1)
+    return staffer
+
+
+@router.delete(
+    "/{partner_id}/staff/{staffer_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def delete_staffer(
+    _: CurrentSuperUser,
+    partner_id: str,
+    staffer_id: str,
+    dynamodb_service_resource: DynamoDbServiceResourceDep,
+    if_match: str | None = Header(default=None),
+) -> None:
+    try:
+        deleted = await partner_crud.delete_staffer(
+            dynamodb_service_resource, partner_id, staffer_id, parse_if_match(if_match)
+        )
+    except partner_crud.VersionConflictError as e:
+        raise version_conflict(partner_id, e)
+    if not deleted:
+        raise NotFoundException("Staffer", staffer_id)
+
+
+def version_conflict(
+    partner_id: str, error: partner_crud.VersionConflictError
+) -> ConflictException:
+    """
+    The 409 of a write whose `If-Match` the partner no longer matches, with
+    the partner's current ETag.
+    """
+    return ConflictException(
+        "Partner", partner_id, headers={"ETag": format_etag(error.current_version)}
+    )
+
+
+def decode_scoped_cursor(cursor: str | None, scope: str) -> dict[str, Any] | None:
+    """
+    Returns the `ExclusiveStartKey` of a cursor issued for `scope`, or None
+    without a cursor. Raises a 400 for any other cursor.
+    """
+    if not cursor:
+        return None
+
+    exclusive_start_key = decode_cursor(cursor, scope)
+    if not exclusive_start_key:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return exclusive_start_key
+
+
+def format_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def etag_matches(if_none_match: str, version: int) -> bool:
+    """Weak comparison of an `If-None-Match` header with a version's ETag."""
+    etag = format_etag(version)
+    return any(
+        tag.strip() == "*" or tag.strip().removeprefix("W/") == etag
+        for tag in if_none_match.split(",")
+    )
+
+
+def parse_if_match(if_match: str | None) -> int | None:
+    """
+    Returns the partner version an `If-Match` header requires, or None when
+    it is absent or `*`. Child writes are checked against it as well.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+
+    etag = if_match.strip().removeprefix("W/").strip('"')
+    if not etag.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid If-Match header")
+    return int(etag)
+
+
+def parse_selection(parameter: str, value: str, allowed: set[str]) -> set[str]:
+    selection = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = selection - allowed
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown {parameter}: {', '.join(sorted(unknown))}. "
+            f"Allowed: {', '.join(sorted(allowed))}",
+        )
+    return selection
+
+
+def to_sparse_content(
+    partner: Partner, include: set[str], fields: set[str] | None
+) -> dict[str, Any]:
+    """Renders the selected parts of a partner in the `PartnerPublic` shape."""
+    content = partner.model_dump(
+        mode="json", include={"id", *(PARTNER_FIELDS if fields is None else fields)}
+    )
+    for name, public_model in PARTNER_CHILDREN.items():
+        if name in include:
+            content[name] = [
+                child.model_dump(mode="json", include=set(public_model.model_fields))
+                for child in getattr(partner, name)
+            ]
+    return content
@@ -10,6 +10,7 @@ from app.api.deps import (
     SessionDep,
     get_current_active_superuser,
 )
+from app.api.responses import ModelResponse
 from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
 from app.models.sql.models import (
@@ -45,7 +46,7 @@ def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
     statement = select(User).offset(skip).limit(limit)
     users = session.exec(statement).all()
 
-    return UsersPublic(data=users, count=count)
+    return ModelResponse(UsersPublic(data=users, count=count), UsersPublic)
 
 
 @router.post(
@@ -2,6 +2,9 @@ from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
+from app.core.cache import CacheStats
+from app.core.dynamodb_metrics import RouteCapacityStats, route_capacity
+from app.crud import partner as partner_crud
 from app.models.sql.models import Message
 from app.utils import generate_test_email, send_email
 
@@ -29,3 +32,26 @@ def test_email(email_to: EmailStr) -> Message:
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
+
+
+@router.get(
+    "/partner-cache-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def partner_cache_stats() -> CacheStats:
+    """
+    Hit/miss counters and current size of this worker's partner cache.
+    """
+    return partner_crud.partner_cache.stats()
+
+
+@router.get(
+    "/dynamodb-capacity/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def dynamodb_capacity() -> dict[str, RouteCapacityStats]:
+    """
+    DynamoDB calls, consumed capacity, latency, retries and throttles of
+    every route this worker served, summed over its requests.
+    """
+    return route_capacity.snapshot()
@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import logging
+from typing import Any
+
+from types_aiobotocore_dynamodb.service_resource import Table
+
+from app.core.config import settings
+from app.core.dynamodb import dynamodb_pool
+from app.crud.partner import (
+    DERIVED_ITEM_FIELDS,
+    derived_items,
+    partial_partner,
+    put_children,
+    read_partner_row,
+    scan_partner_rows,
+    sync_derived_items,
+)
+from app.models.dynamodb.partners import Partner
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def legacy_token_keys(partner: Partner) -> list[dict[str, str]]:
+    """Keys of the postings written before they were sorted by name."""
+    return [
+        {"pk": token_item.pk, "sk": f"{Partner.entity_type}#{partner.id}"}
+        for token_item in partner.name_token_items()
+    ]
+
+
+async def index_partner(dynamodb_table: Table, item: dict[str, Any]) -> None:
+    partner = partial_partner(item, DERIVED_ITEM_FIELDS)
+    items = derived_items(partner)
+    keys = {(derived_item.pk, derived_item.sk) for derived_item in items}
+    async with dynamodb_table.batch_writer() as batch_writer:
+        for key in legacy_token_keys(partner):
+            if (key["pk"], key["sk"]) not in keys:
+                await batch_writer.delete_item(Key=key)
+        await put_children(batch_writer, items)
+
+    # A concurrent update may have diffed its derived items against the row
+    # before the items above were written, so bring them to the current row.
+    current = await read_partner_row(
+        dynamodb_table, partner.id, DERIVED_ITEM_FIELDS, consistent_read=True
+    )
+    if not current or current.version != partner.version:
+        await sync_derived_items(dynamodb_table, partner, current)
+
+
+async def backfill(dynamodb_table: Table) -> int:
+    """
+    Writes the open-slot and name-token items of every partner row, which
+    partners written before those indexes existed do not have, rewrites the
+    slot items of the others with the partner's name and moves their
+    postings from the partner's id to its name as sort key. The items are put
+    unconditionally, so this is safe to re-run. Returns the number of
+    partners indexed.
+    """
+    indexed = 0
+    async for page in scan_partner_rows(
+        dynamodb_table, {"id", "version", *DERIVED_ITEM_FIELDS}
+    ):
+        await asyncio.gather(*(index_partner(dynamodb_table, i) for i in page))
+        indexed += len(page)
+    return indexed
+
+
+async def run() -> None:
+    dynamodb_service_resource = await dynamodb_pool.open()
+    try:
+        dynamodb_table = await dynamodb_service_resource.Table(
+            settings.DYNAMODB_TABLE_NAME
+        )
+        indexed = await backfill(dynamodb_table)
+    finally:
+        await dynamodb_pool.close()
+
+    logger.info(f"Wrote the open-slot and name-token items of {indexed} partners")
+
+
+def main() -> None:
+    argparse.ArgumentParser(
+        description=(
+            "Write the open-slot and name-token items of every partner, for "
+            "partners written before those indexes existed."
+        )
+    ).parse_args()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
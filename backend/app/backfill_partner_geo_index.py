@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import logging
+import sys
+from typing import Any
+
+from botocore.exceptions import ClientError
+from types_aiobotocore_dynamodb.service_resource import Table
+
+from app.core.config import settings
+from app.core.dynamodb import dynamodb_pool
+from app.crud.partner import scan_partner_rows
+from app.models.dynamodb.partners import Address, Partner
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GEO_INDEX_ATTRIBUTES = ("gsi_geo_pk", "gsi_geo_sk")
+
+
+def geo_index_attributes(item: dict[str, Any]) -> dict[str, str]:
+    partner = Partner.model_construct(address=Address.model_validate(item["address"]))
+    return dict(zip(GEO_INDEX_ATTRIBUTES, partner.geo_index_keys(), strict=True))
+
+
+async def index_partner(dynamodb_table: Table, item: dict[str, Any]) -> None:
+    try:
+        await dynamodb_table.update_item(
+            Key={"pk": item["pk"], "sk": item["sk"]},
+            UpdateExpression="SET "
+            + ", ".join(f"#{name} = :{name}" for name in GEO_INDEX_ATTRIBUTES),
+            # Updates that change the address write the geo keys themselves.
+            ConditionExpression="attribute_exists(pk) AND #address = :address",
+            ExpressionAttributeNames={
+                "#address": "address",
+                **{f"#{name}": name for name in GEO_INDEX_ATTRIBUTES},
+            },
+            ExpressionAttributeValues={
+                ":address": item["address"],
+                **{
+                    f":{name}": value
+                    for name, value in geo_index_attributes(item).items()
+                },
+            },
+        )
+    except ClientError as e:
+        # Deleted or moved since the scan read it.
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+
+
+async def backfill(dynamodb_table: Table, dry_run: bool) -> int:
+    """
+    Writes the geo index keys of every partner row that lacks them or whose
+    keys do not match its address. Returns the rows that were (or, with
+    `dry_run`, would be) indexed.
+    """
+    indexed = 0
+    attributes = {"address", *GEO_INDEX_ATTRIBUTES}
+    async for page in scan_partner_rows(dynamodb_table, attributes):
+        stale = [
+            item
+            for item in page
+            if geo_index_attributes(item)
+            != {name: item.get(name) for name in GEO_INDEX_ATTRIBUTES}
+        ]
+        indexed += len(stale)
+        if not dry_run:
+            await asyncio.gather(*(index_partner(dynamodb_table, i) for i in stale))
+    return indexed
+
+
+async def run(dry_run: bool) -> int:
+    dynamodb_service_resource = await dynamodb_pool.open()
+    try:
+        dynamodb_table = await dynamodb_service_resource.Table(
+            settings.DYNAMODB_TABLE_NAME
+        )
+        indexed = await backfill(dynamodb_table, dry_run)
+    finally:
+        await dynamodb_pool.close()
+
+    logger.info(
+        f"{indexed} partners {'are missing from' if dry_run else 'added to'} "
+        "the geo index"
+    )
+    return 1 if dry_run and indexed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Add partners written before the geo index existed to it."
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only count unindexed partners, exiting with 1 if there are any",
+    )
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.dry_run)))
+
+
+if __name__ == "__main__":
+    main()
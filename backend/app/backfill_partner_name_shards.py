@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import logging
+import sys
+from typing import Any
+
+from botocore.exceptions import ClientError
+from types_aiobotocore_dynamodb.service_resource import Table
+
+from app.core.config import settings
+from app.core.dynamodb import dynamodb_pool
+from app.crud.partner import scan_partner_rows
+from app.models.dynamodb.partners import Partner
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def name_index_partition(item: dict[str, Any]) -> str:
+    partner_id = item["pk"].removeprefix(f"{Partner.parent_entity}#")
+    partner = Partner.model_construct(id=partner_id)
+    return Partner.name_index_partition(partner.name_index_shard)
+
+
+async def move_partner(dynamodb_table: Table, item: dict[str, Any]) -> None:
+    try:
+        await dynamodb_table.update_item(
+            Key={"pk": item["pk"], "sk": item["sk"]},
+            UpdateExpression="SET #gsi_name_pk = :gsi_name_pk",
+            ConditionExpression="attribute_exists(pk)",
+            ExpressionAttributeNames={"#gsi_name_pk": "gsi_name_pk"},
+            ExpressionAttributeValues={":gsi_name_pk": name_index_partition(item)},
+        )
+    except ClientError as e:
+        # Deleted since the scan read it.
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+
+
+async def backfill(dynamodb_table: Table, dry_run: bool) -> int:
+    """
+    Moves every partner row to the name index partition of its shard under
+    the configured `PARTNER_NAME_INDEX_SHARDS`. Returns the rows that were
+    (or, with `dry_run`, would be) moved.
+    """
+    moved = 0
+    async for page in scan_partner_rows(dynamodb_table, {"gsi_name_pk"}):
+        stale = [
+            item
+            for item in page
+            if item.get("gsi_name_pk") != name_index_partition(item)
+        ]
+        moved += len(stale)
+        if not dry_run:
+            await asyncio.gather(*(move_partner(dynamodb_table, i) for i in stale))
+    return moved
+
+
+async def run(dry_run: bool) -> int:
+    dynamodb_service_resource = await dynamodb_pool.open()
+    try:
+        dynamodb_table = await dynamodb_service_resource.Table(
+            settings.DYNAMODB_TABLE_NAME
+        )
+        moved = await backfill(dynamodb_table, dry_run)
+    finally:
+        await dynamodb_pool.close()
+
+    logger.info(
+        f"{moved} partners {'are not in' if dry_run else 'moved to'} their "
+        f"name index shard, out of {settings.PARTNER_NAME_INDEX_SHARDS}"
+    )
+    return 1 if dry_run and moved else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Spread partners over the name index shards, after they were "
+            "provisioned or PARTNER_NAME_INDEX_SHARDS changed."
+        )
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only count stale partners, exiting with 1 if there are any",
+    )
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.dry_run)))
+
+
+if __name__ == "__main__":
+    main()
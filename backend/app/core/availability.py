@@ -0,0 +1,44 @@
+from datetime import datetime, time
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+SLOTS_PER_WEEK = 7 * SLOTS_PER_DAY
+
+
+def to_minutes(value: str) -> int:
+    """Parses an ISO time of day, e.g. "09:30:00", into minutes since midnight."""
+    parsed = time.fromisoformat(value)
+    return parsed.hour * 60 + parsed.minute
+
+
+def week_slot(at: datetime) -> int:
+    """Returns the weekly slot containing the wall-clock time `at`."""
+    minutes = at.hour * 60 + at.minute
+    return at.weekday() * SLOTS_PER_DAY + minutes // SLOT_MINUTES
+
+
+def shift_slots(day: str, start: str, end: str) -> range:
+    """
+    Returns the weekly slots fully covered by a shift, so a partner listed in
+    a slot is open for all of it. A shift ending at or before its start runs
+    past midnight into the next day; Sunday night wraps into Monday.
+    """
+    start_minutes = to_minutes(start)
+    end_minutes = to_minutes(end)
+    if end_minutes <= start_minutes:
+        end_minutes += 24 * 60
+
+    day_offset = DAYS.index(day) * SLOTS_PER_DAY
+    first = day_offset - (-start_minutes // SLOT_MINUTES)
+    last = day_offset + end_minutes // SLOT_MINUTES
+    return range(first, last)
+
+
+def weekly_slots(shifts: list[tuple[str, str, str]]) -> set[int]:
+    """Returns the slots covered by any of the `(day, start, end)` shifts."""
+    return {
+        slot % SLOTS_PER_WEEK
+        for day, start, end in shifts
+        for slot in shift_slots(day, start, end)
+    }
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    size_bytes: int = 0
+
+
+@dataclass
+class _Entry(Generic[V]):
+    value: V
+    size: int
+    expires_at: float
+
+
+class TTLCache(Generic[K, V]):
+    """
+    In-process LRU cache whose entries expire after `ttl` seconds and whose
+    total size, as measured by `sizeof`, never exceeds `max_bytes`.
+
+    Every invalidation bumps `generation`; a reader that captured the
+    generation before going to the database passes it to `set` so a value
+    read before a concurrent write is not cached after that write.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_bytes: int,
+        sizeof: Callable[[V], int],
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._clock = clock
+        self._entries: OrderedDict[K, _Entry[V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+        self.generation = 0
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+
+            if entry.expires_at <= self._clock():
+                self._remove(key)
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry.value
+
+    def set(self, key: K, value: V, generation: int | None = None) -> None:
+        if self.ttl <= 0:
+            return
+
+        size = self._sizeof(value)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if size > self.max_bytes:
+                return
+
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, size, self._clock() + self.ttl)
+            self._stats.size_bytes += size
+            while self._stats.size_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats.evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        with self._lock:
+            self.generation += 1
+            self._stats.invalidations += 1
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._stats.size_bytes = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                expirations=self._stats.expirations,
+                invalidations=self._stats.invalidations,
+                entries=len(self._entries),
+                size_bytes=self._stats.size_bytes,
+            )
+
+    def _remove(self, key: K) -> None:
+        entry = self._entries.pop(key)
+        self._stats.size_bytes -= entry.size
@@ -0,0 +1,378 @@
+"""
+Change feed over the DynamoDB table's stream.
+
+Handlers registered on a `ChangeFeed` receive the table's changes after the
+fact, so derived state (such as index items) can be maintained off the
+request path. Each call gets the changes of a single partition key (for
+partners: one item collection) in the order they were written; different
+partitions are handled concurrently.
+
+In AWS the stream is consumed by a Lambda event source mapping, which passes
+each batch of records to `ChangeFeed.dispatch` and checkpoints when it
+returns. `StreamPoller` stands in for it on DynamoDB Local, or wherever a
+long-running consumer is preferred: it polls the stream's shards and keeps
+its own checkpoints.
+
+Delivery is at least once. A batch whose handler fails is delivered again,
+so handlers must be idempotent.
+"""
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass
+from typing import Any, Literal, Protocol, TypedDict, TypeVar
+
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from types_aiobotocore_dynamodb import DynamoDBClient
+from types_aiobotocore_dynamodb.service_resource import Table
+from types_aiobotocore_dynamodb.type_defs import AttributeValueTypeDef
+from typing_extensions import NotRequired, Self
+
+from app.models.dynamodb.change_feed import ChangeFeedCheckpoint
+
+logger = logging.getLogger(__name__)
+
+_deserializer = TypeDeserializer()
+
+# Attribute values in the wire format, such as {"pk": {"S": "PARTNER#1"}}.
+StreamImage = dict[str, AttributeValueTypeDef]
+
+
+class StreamRecordChange(TypedDict):
+    Keys: StreamImage
+    SequenceNumber: str
+    NewImage: NotRequired[StreamImage]
+    OldImage: NotRequired[StreamImage]
+
+
+class StreamRecord(TypedDict):
+    """A GetRecords record, or one of a Lambda stream event."""
+
+    eventName: Literal["INSERT", "MODIFY", "REMOVE"]
+    dynamodb: StreamRecordChange
+
+
+class SequenceNumberRange(TypedDict):
+    StartingSequenceNumber: str
+    # Only set once the shard is closed.
+    EndingSequenceNumber: NotRequired[str]
+
+
+class Shard(TypedDict):
+    ShardId: str
+    SequenceNumberRange: SequenceNumberRange
+    ParentShardId: NotRequired[str]
+
+
+def deserialize(image: StreamImage | None) -> dict[str, Any] | None:
+    if image is None:
+        return None
+    return {key: _deserializer.deserialize(value) for key, value in image.items()}
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """One stream record, with its keys and images deserialized."""
+
+    event_name: Literal["INSERT", "MODIFY", "REMOVE"]
+    sequence_number: str
+    keys: dict[str, Any]
+    new_image: dict[str, Any] | None
+    old_image: dict[str, Any] | None
+
+    @property
+    def partition_key(self) -> str:
+        partition_key: str = self.keys["pk"]
+        return partition_key
+
+    @property
+    def item_type(self) -> str | None:
+        return (self.new_image or self.old_image or {}).get("item_type")
+
+    @classmethod
+    def from_record(cls, record: StreamRecord) -> Self:
+        change = record["dynamodb"]
+        return cls(
+            event_name=record["eventName"],
+            sequence_number=change["SequenceNumber"],
+            keys=deserialize(change["Keys"]) or {},
+            new_image=deserialize(change.get("NewImage")),
+            old_image=deserialize(change.get("OldImage")),
+        )
+
+
+ChangeHandler = Callable[[list[ChangeEvent]], Awaitable[None]]
+ChangeHandlerT = TypeVar("ChangeHandlerT", bound=ChangeHandler)
+
+
+@dataclass(frozen=True)
+class Registration:
+    handler: ChangeHandler
+    # Item types the handler receives; all of them when empty.
+    item_types: frozenset[str]
+
+    def select(self, events: list[ChangeEvent]) -> list[ChangeEvent]:
+        if not self.item_types:
+            return events
+        return [event for event in events if event.item_type in self.item_types]
+
+
+class ChangeFeed:
+    """Handlers of the table's changes, which `dispatch` delivers to."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.registrations: list[Registration] = []
+
+    def handler(self, *item_types: str) -> Callable[[ChangeHandlerT], ChangeHandlerT]:
+        """Registers the decorated handler for changes of `item_types`."""
+
+        def register(handler: ChangeHandlerT) -> ChangeHandlerT:
+            self.registrations.append(Registration(handler, frozenset(item_types)))
+            return handler
+
+        return register
+
+    async def dispatch(self, records: Sequence[StreamRecord]) -> None:
+        """
+        Delivers stream records to the handlers, one partition at a time per
+        handler and in record order. Raises if any handler failed, after
+        the other partitions have been handled.
+        """
+        partitions: dict[str, list[ChangeEvent]] = {}
+        for record in records:
+            event = ChangeEvent.from_record(record)
+            partitions.setdefault(event.partition_key, []).append(event)
+
+        results = await asyncio.gather(
+            *(self.dispatch_partition(events) for events in partitions.values()),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def dispatch_partition(self, events: list[ChangeEvent]) -> None:
+        for registration in self.registrations:
+            selected = registration.select(events)
+            if selected:
+                await registration.handler(selected)
+
+
+class Checkpoints(Protocol):
+    async def load(self, shard_id: str) -> str | None: ...
+
+    async def save(self, shard_id: str, sequence_number: str) -> None: ...
+
+
+class MemoryCheckpoints:
+    """Checkpoints of a consumer that starts over with each process."""
+
+    def __init__(self) -> None:
+        self.sequence_numbers: dict[str, str] = {}
+
+    async def load(self, shard_id: str) -> str | None:
+        return self.sequence_numbers.get(shard_id)
+
+    async def save(self, shard_id: str, sequence_number: str) -> None:
+        self.sequence_numbers[shard_id] = sequence_number
+
+
+class TableCheckpoints:
+    """Checkpoints kept as `ChangeFeedCheckpoint` items of the table itself."""
+
+    def __init__(self, dynamodb_table: Table, feed: str) -> None:
+        self.dynamodb_table = dynamodb_table
+        self.feed = feed
+
+    async def load(self, shard_id: str) -> str | None:
+        key = ChangeFeedCheckpoint.model_construct(feed=self.feed, shard_id=shard_id)
+        response = await self.dynamodb_table.get_item(
+            Key={"pk": key.pk, "sk": key.sk}, ConsistentRead=True
+        )
+        item = response.get("Item")
+        return (
+            ChangeFeedCheckpoint.from_dynamodb_item(item).sequence_number
+            if item
+            else None
+        )
+
+    async def save(self, shard_id: str, sequence_number: str) -> None:
+        checkpoint = ChangeFeedCheckpoint(
+            feed=self.feed, shard_id=shard_id, sequence_number=sequence_number
+        )
+        await self.dynamodb_table.put_item(Item=checkpoint.to_dynamodb_item())
+
+
+def is_checkpoint(record: StreamRecord) -> bool:
+    partition_key = record["dynamodb"]["Keys"]["pk"].get("S", "")
+    return partition_key.startswith(f"{ChangeFeedCheckpoint.parent_entity}#")
+
+
+class StreamPoller:
+    """
+    Polls the shards of a table's stream and dispatches their records to a
+    `ChangeFeed`, checkpointing each shard after every delivered batch.
+
+    Shards are read one at a time, oldest first, and a shard is only read
+    once its parent has ended, so a shard's records are delivered before
+    those of the shards split from it, which keeps the changes of a
+    partition in order. A failed batch is retried from the last checkpoint
+    on the next poll.
+
+    The checkpoint items are written to the stream as well. Batches made up
+    only of them advance the poller without a checkpoint, so an idle poller
+    does not keep feeding itself.
+    """
+
+    def __init__(
+        self,
+        feed: ChangeFeed,
+        client: DynamoDBClient,
+        streams_client: Any,
+        table_name: str,
+        checkpoints: Checkpoints,
+        batch_size: int = 100,
+        poll_seconds: float = 1.0,
+        start_at_latest: bool = False,
+    ) -> None:
+        self.feed = feed
+        self.client = client
+        self.streams_client = streams_client
+        self.table_name = table_name
+        self.checkpoints = checkpoints
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        # Without a checkpoint, start after the newest record rather than at
+        # the oldest one still in the stream (24 hours).
+        self.start_at_latest = start_at_latest
+        self.iterators: dict[str, str] = {}
+        self.finished_shards: set[str] = set()
+
+    async def run(self) -> None:
+        """Polls until cancelled."""
+        stream_arn = await self.stream_arn()
+        logger.info(f"Consuming {stream_arn} for change feed {self.feed.name}")
+        while True:
+            try:
+                await self.poll(stream_arn)
+            except Exception:
+                logger.exception(f"Change feed {self.feed.name} failed, retrying")
+                self.iterators.clear()
+            await asyncio.sleep(self.poll_seconds)
+
+    async def stream_arn(self) -> str:
+        response = await self.client.describe_table(TableName=self.table_name)
+        stream_arn = response["Table"].get("LatestStreamArn")
+        if not stream_arn:
+            raise RuntimeError(f"Table {self.table_name} has no stream enabled")
+        return stream_arn
+
+    async def poll(self, stream_arn: str) -> int:
+        """Reads every shard up to its newest record; returns the records read."""
+        read = 0
+        shards = await self.list_shards(stream_arn)
+        shard_ids = {shard["ShardId"] for shard in shards}
+        for shard in shards:
+            if shard["ShardId"] in self.finished_shards:
+                continue
+            # A parent still in the stream has to be read to its end first.
+            parent_id = shard.get("ParentShardId")
+            if parent_id in shard_ids and parent_id not in self.finished_shards:
+                continue
+            closed = "EndingSequenceNumber" in shard["SequenceNumberRange"]
+            read += await self.read_shard(stream_arn, shard["ShardId"], closed)
+        return read
+
+    async def list_shards(self, stream_arn: str) -> list[Shard]:
+        shards: list[Shard] = []
+        kwargs: dict[str, Any] = {"StreamArn": stream_arn}
+        while True:
+            description = (await self.streams_client.describe_stream(**kwargs))[
+                "StreamDescription"
+            ]
+            shards.extend(description["Shards"])
+            last_shard_id = description.get("LastEvaluatedShardId")
+            if not last_shard_id:
+                break
+            kwargs["ExclusiveStartShardId"] = last_shard_id
+        # Child shards start after their parents ended.
+        return sorted(
+            shards,
+            key=lambda shard: int(
+                shard["SequenceNumberRange"]["StartingSequenceNumber"]
+            ),
+        )
+
+    async def read_shard(
+        self, stream_arn: str, shard_id: str, closed: bool = False
+    ) -> int:
+        """
+        Reads an open shard up to its newest record, and a closed one up to
+        its end, which GetRecords may only reach after empty pages.
+        """
+        read = 0
+        iterator: str | None = self.iterators.pop(shard_id, None)
+        if iterator is None:
+            iterator = await self.shard_iterator(stream_arn, shard_id)
+        while iterator:
+            try:
+                response = await self.streams_client.get_records(
+                    ShardIterator=iterator, Limit=self.batch_size
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ExpiredIteratorException":
+                    raise
+                iterator = await self.shard_iterator(stream_arn, shard_id)
+                continue
+
+            records: list[StreamRecord] = response["Records"]
+            if records:
+                await self.deliver(shard_id, records)
+                read += len(records)
+            iterator = response.get("NextShardIterator")
+            if not records and not closed:
+                break
+
+        if iterator:
+            self.iterators[shard_id] = iterator
+        else:
+            # Closed shards end without a next iterator.
+            self.finished_shards.add(shard_id)
+        return read
+
+    async def shard_iterator(self, stream_arn: str, shard_id: str) -> str:
+        kwargs: dict[str, Any] = {"StreamArn": stream_arn, "ShardId": shard_id}
+        sequence_number = await self.checkpoints.load(shard_id)
+        if sequence_number:
+            kwargs["ShardIteratorType"] = "AFTER_SEQUENCE_NUMBER"
+            kwargs["SequenceNumber"] = sequence_number
+        elif self.start_at_latest:
+            kwargs["ShardIteratorType"] = "LATEST"
+        else:
+            kwargs["ShardIteratorType"] = "TRIM_HORIZON"
+        response = await self.streams_client.get_shard_iterator(**kwargs)
+        shard_iterator: str = response["ShardIterator"]
+        return shard_iterator
+
+    async def deliver(self, shard_id: str, records: list[StreamRecord]) -> None:
+        changes = [record for record in records if not is_checkpoint(record)]
+        if not changes:
+            return
+        await self.feed.dispatch(changes)
+        await self.checkpoints.save(shard_id, records[-1]["dynamodb"]["SequenceNumber"])
+
+
+@asynccontextmanager
+async def polling(poller: StreamPoller) -> AsyncIterator[None]:
+    """Runs `poller` in a background task while the context is open."""
+    task = asyncio.create_task(poller.run())
+    try:
+        yield
+    finally:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
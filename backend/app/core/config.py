@@ -62,6 +62,40 @@ class Settings(BaseSettings):
     AWS_SESSION_TOKEN: str
     DYNAMODB_URL: str
     DYNAMODB_TABLE_NAME: str
+    DYNAMODB_MAX_POOL_CONNECTIONS: int = 50
+    DYNAMODB_CONNECT_TIMEOUT: float = 2.0
+    DYNAMODB_READ_TIMEOUT: float = 5.0
+    DYNAMODB_KEEPALIVE_TIMEOUT: float = 60.0
+    DYNAMODB_MAX_ATTEMPTS: int = 3
+    DYNAMODB_QUERY_PAGE_SIZE: int = 250
+    DYNAMODB_TRANSACTION_MAX_ATTEMPTS: int = 3
+    DYNAMODB_TRANSACTION_BACKOFF_SECONDS: float = 0.05
+    DYNAMODB_CAPACITY_METRICS: bool = True
+    # Reports each request's DynamoDB usage in a Server-Timing header. It
+    # exposes internal details to every client, so only enable it to debug.
+    DYNAMODB_SERVER_TIMING: bool = False
+    DYNAMODB_BILLING_MODE: Literal["PAY_PER_REQUEST", "PROVISIONED"] = "PAY_PER_REQUEST"
+    # Used for the table and each of its indexes in PROVISIONED mode.
+    DYNAMODB_READ_CAPACITY_UNITS: int = 5
+    DYNAMODB_WRITE_CAPACITY_UNITS: int = 5
+    # Streams NEW_AND_OLD_IMAGES of every write, which the change feeds read.
+    DYNAMODB_STREAM_ENABLED: bool = True
+    CHANGE_FEED_BATCH_SIZE: int = 100
+    CHANGE_FEED_POLL_SECONDS: float = 1.0
+    PARTNER_BATCH_GET_MAX_CONCURRENCY: int = 16
+    # How long a process may serve a partner that another process changed.
+    PARTNER_CACHE_TTL_SECONDS: float = 5.0
+    PARTNER_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    PARTNER_NEARBY_MAX_RADIUS_METERS: int = 15_000
+    # Changing it requires running app/backfill_partner_name_shards.py.
+    PARTNER_NAME_INDEX_SHARDS: int = 8
+    # Leave the open-slot and name-token items to the partner change feed
+    # consumer instead of writing them with the partner.
+    PARTNER_DERIVED_ITEMS_FROM_CHANGE_FEED: bool = False
+    PARTNER_IMPORT_WRITERS: int = 4
+    PARTNER_IMPORT_MAX_ATTEMPTS: int = 8
+    PARTNER_IMPORT_BASE_BACKOFF_SECONDS: float = 0.05
+    PARTNER_IMPORT_MAX_BACKOFF_SECONDS: float = 5.0
 
     @computed_field  # type: ignore[prop-decorator]
     @property
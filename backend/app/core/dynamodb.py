@@ -0,0 +1,98 @@
+import asyncio
+from contextlib import AbstractAsyncContextManager, AsyncExitStack
+from typing import Any
+
+import aioboto3
+from aiobotocore.config import AioConfig
+from types_aiobotocore_dynamodb import DynamoDBServiceResource
+
+from app.core.config import settings
+from app.core.dynamodb_metrics import register_capacity_hooks
+
+
+def get_client_config() -> AioConfig:
+    return AioConfig(
+        max_pool_connections=settings.DYNAMODB_MAX_POOL_CONNECTIONS,
+        connect_timeout=settings.DYNAMODB_CONNECT_TIMEOUT,
+        read_timeout=settings.DYNAMODB_READ_TIMEOUT,
+        retries={"max_attempts": settings.DYNAMODB_MAX_ATTEMPTS, "mode": "standard"},
+        connector_args={"keepalive_timeout": settings.DYNAMODB_KEEPALIVE_TIMEOUT},
+    )
+
+
+def create_session() -> aioboto3.Session:
+    if settings.ENVIRONMENT == "local":
+        return aioboto3.Session(
+            region_name=settings.AWS_REGION,
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            aws_session_token=settings.AWS_SESSION_TOKEN,
+        )
+
+    return aioboto3.Session(region_name=settings.AWS_REGION)
+
+
+def create_service_resource(
+    session: aioboto3.Session,
+) -> AbstractAsyncContextManager[DynamoDBServiceResource]:
+    if settings.ENVIRONMENT == "local":
+        return session.resource(
+            "dynamodb", endpoint_url=settings.DYNAMODB_URL, config=get_client_config()
+        )
+
+    return session.resource("dynamodb", config=get_client_config())
+
+
+def create_streams_client(
+    session: aioboto3.Session,
+) -> AbstractAsyncContextManager[Any]:
+    """Client of the DynamoDB Streams API, which the change feed reads."""
+    if settings.ENVIRONMENT == "local":
+        return session.client(
+            "dynamodbstreams",
+            endpoint_url=settings.DYNAMODB_URL,
+            config=get_client_config(),
+        )
+
+    return session.client("dynamodbstreams", config=get_client_config())
+
+
+class DynamoDBPool:
+    """
+    Process-wide DynamoDB service resource.
+
+    The session and resource are built once, so credentials and endpoints are
+    resolved a single time and the underlying aiohttp connection pool is kept
+    alive between requests. Opening is guarded by a lock so concurrent first
+    requests do not each build their own resource.
+    """
+
+    def __init__(self) -> None:
+        self._lock = asyncio.Lock()
+        self._exit_stack: AsyncExitStack | None = None
+        self._resource: DynamoDBServiceResource | None = None
+
+    async def open(self) -> DynamoDBServiceResource:
+        if self._resource is not None:
+            return self._resource
+
+        async with self._lock:
+            if self._resource is None:
+                exit_stack = AsyncExitStack()
+                self._resource = await exit_stack.enter_async_context(
+                    create_service_resource(create_session())
+                )
+                if settings.DYNAMODB_CAPACITY_METRICS:
+                    register_capacity_hooks(self._resource.meta.client.meta.events)
+                self._exit_stack = exit_stack
+            return self._resource
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._exit_stack is not None:
+                await self._exit_stack.aclose()
+                self._exit_stack = None
+                self._resource = None
+
+
+dynamodb_pool = DynamoDBPool()
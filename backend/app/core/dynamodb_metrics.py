@@ -0,0 +1,201 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from botocore.hooks import BaseEventHooks
+
+READ_OPERATIONS = {"GetItem", "BatchGetItem", "Query", "Scan", "TransactGetItems"}
+WRITE_OPERATIONS = {
+    "PutItem",
+    "UpdateItem",
+    "DeleteItem",
+    "BatchWriteItem",
+    "TransactWriteItems",
+}
+THROTTLING_CODES = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+}
+_STARTED_AT = "dynamodb_metrics_started_at"
+
+
+@dataclass
+class CapacityStats:
+    """DynamoDB calls made while serving requests, and what they cost."""
+
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    throttles: int = 0
+    # Summed over the calls, so concurrent calls count more than once.
+    latency_ms: float = 0.0
+    # Time during which at least one call was in flight.
+    wall_ms: float = 0.0
+    read_units: float = 0.0
+    write_units: float = 0.0
+    # Capacity units per table and per index, keyed by their names.
+    units_by_index: dict[str, float] = field(default_factory=dict)
+    # Not fields, so the route totals served by the API do not include them.
+    in_flight = 0
+    busy_since = 0.0
+
+    def call_started(self, now: float) -> None:
+        if not self.in_flight:
+            self.busy_since = now
+        self.in_flight += 1
+
+    def call_finished(self, now: float) -> None:
+        if not self.in_flight:
+            return
+        self.in_flight -= 1
+        if not self.in_flight:
+            self.wall_ms += (now - self.busy_since) * 1000
+
+    def add(self, other: "CapacityStats") -> None:
+        self.calls += other.calls
+        self.errors += other.errors
+        self.retries += other.retries
+        self.throttles += other.throttles
+        self.latency_ms += other.latency_ms
+        self.wall_ms += other.wall_ms
+        self.read_units += other.read_units
+        self.write_units += other.write_units
+        for name, units in other.units_by_index.items():
+            self.units_by_index[name] = self.units_by_index.get(name, 0.0) + units
+
+    def add_consumed_capacity(self, operation: str, consumed: dict[str, Any]) -> None:
+        units = float(consumed.get("CapacityUnits", 0.0))
+        read_units = consumed.get("ReadCapacityUnits")
+        write_units = consumed.get("WriteCapacityUnits")
+        if read_units is None and write_units is None:
+            # Entries only carry the read/write split on provisioned tables.
+            read_units = units if operation in READ_OPERATIONS else 0.0
+            write_units = units if operation in WRITE_OPERATIONS else 0.0
+        self.read_units += float(read_units or 0.0)
+        self.write_units += float(write_units or 0.0)
+
+        indexes = {
+            consumed.get("TableName", "table"): consumed.get("Table", {}),
+            **consumed.get("GlobalSecondaryIndexes", {}),
+            **consumed.get("LocalSecondaryIndexes", {}),
+        }
+        for name, capacity in indexes.items():
+            if "CapacityUnits" in capacity:
+                self.units_by_index[name] = self.units_by_index.get(name, 0.0) + float(
+                    capacity["CapacityUnits"]
+                )
+
+    def server_timing(self) -> str:
+        """
+        Formats the stats as one `Server-Timing` header metric, whose duration
+        is the wall time spent waiting on DynamoDB.
+        """
+        description = (
+            f"{self.calls} calls, {self.latency_ms:.1f} ms summed latency, "
+            f"{self.read_units:g} RCU, {self.write_units:g} WCU, "
+            f"{self.retries} retries, {self.throttles} throttles"
+        )
+        return f'dynamodb;dur={self.wall_ms:.1f};desc="{description}"'
+
+
+@dataclass
+class RouteCapacityStats(CapacityStats):
+    requests: int = 0
+
+
+class RouteCapacity:
+    """Per-route totals of the DynamoDB usage of every request in this worker."""
+
+    def __init__(self) -> None:
+        self._routes: dict[str, RouteCapacityStats] = {}
+
+    def record(self, route: str, stats: CapacityStats) -> None:
+        route_stats = self._routes.setdefault(route, RouteCapacityStats())
+        route_stats.requests += 1
+        route_stats.add(stats)
+
+    def snapshot(self) -> dict[str, RouteCapacityStats]:
+        return dict(sorted(self._routes.items()))
+
+    def clear(self) -> None:
+        self._routes.clear()
+
+
+# Stats of the request being served. Concurrent calls of one request run in
+# tasks with copies of its context, so they all update the same object.
+request_capacity: ContextVar[CapacityStats | None] = ContextVar(
+    "dynamodb_request_capacity", default=None
+)
+route_capacity = RouteCapacity()
+
+
+def request_consumed_capacity(params: dict[str, Any], model: Any, **_: Any) -> None:
+    if model.name in READ_OPERATIONS or model.name in WRITE_OPERATIONS:
+        params.setdefault("ReturnConsumedCapacity", "INDEXES")
+
+
+def start_call(context: dict[str, Any], **_: Any) -> None:
+    context[_STARTED_AT] = now = time.perf_counter()
+    stats = request_capacity.get()
+    if stats is not None:
+        stats.call_started(now)
+
+
+def record_attempt(response: Any, **_: Any) -> None:
+    stats = request_capacity.get()
+    if stats is None or response is None:
+        return
+    code = response[1].get("Error", {}).get("Code")
+    if code in THROTTLING_CODES:
+        stats.throttles += 1
+
+
+def record_call(
+    parsed: dict[str, Any], model: Any, context: dict[str, Any], **_: Any
+) -> None:
+    stats = finish_call(context)
+    if stats is None:
+        return
+
+    if "Error" in parsed:
+        stats.errors += 1
+    stats.retries += parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+    consumed = parsed.get("ConsumedCapacity", [])
+    for entry in consumed if isinstance(consumed, list) else [consumed]:
+        stats.add_consumed_capacity(model.name, entry)
+
+
+def record_error(context: dict[str, Any], **_: Any) -> None:
+    """Records a call that failed without a response, e.g. on a timeout."""
+    stats = finish_call(context)
+    if stats is not None:
+        stats.errors += 1
+
+
+def finish_call(context: dict[str, Any]) -> CapacityStats | None:
+    stats = request_capacity.get()
+    if stats is None:
+        return None
+
+    stats.calls += 1
+    started_at = context.get(_STARTED_AT)
+    if started_at is not None:
+        now = time.perf_counter()
+        stats.latency_ms += (now - started_at) * 1000
+        stats.call_finished(now)
+    return stats
+
+
+def register_capacity_hooks(events: BaseEventHooks) -> None:
+    """
+    Makes every data call of a DynamoDB client return its consumed capacity
+    and records it, with latency, retries and throttles, into the stats of
+    the current request. Calls outside a request are not recorded.
+    """
+    events.register("provide-client-params.dynamodb", request_consumed_capacity)
+    events.register("before-call.dynamodb", start_call)
+    events.register("needs-retry.dynamodb", record_attempt)
+    events.register("after-call.dynamodb", record_call)
+    events.register("after-call-error.dynamodb", record_error)
@@ -0,0 +1,101 @@
+import math
+from collections.abc import Sequence
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_METERS = 6_371_008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+
+
+def encode_geohash(lat: float, lon: float, precision: int) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash: list[str] = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(geohash) < precision:
+        value, value_range = (lon, lon_range) if even else (lat, lat_range)
+        middle = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            value_range[0] = middle
+        else:
+            value_range[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(geohash)
+
+
+def cell_size_degrees(precision: int) -> tuple[float, float]:
+    """Returns the (height, width) in degrees of a geohash cell."""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180 / 2**lat_bits, 360 / 2**lon_bits
+
+
+def cell_size_meters(precision: int, lat: float) -> tuple[float, float]:
+    """Returns the (height, width) in meters of a geohash cell at `lat`."""
+    height, width = cell_size_degrees(precision)
+    return (
+        height * METERS_PER_DEGREE,
+        width * METERS_PER_DEGREE * math.cos(math.radians(lat)),
+    )
+
+
+def covering_cells(
+    lat: float, lon: float, radius_meters: float, min_precision: int
+) -> list[str]:
+    """
+    Returns the cell containing the point and its eight neighbours, at the
+    finest precision whose cells are still at least `radius_meters` across,
+    so together they cover the whole search circle. None of the cells is
+    coarser than `min_precision`; raises ValueError when the radius is too
+    large for that.
+    """
+    precision = min_precision
+    while precision < 12 and min(cell_size_meters(precision + 1, lat)) >= (
+        radius_meters
+    ):
+        precision += 1
+    if min(cell_size_meters(precision, lat)) < radius_meters:
+        raise ValueError(f"Radius {radius_meters} m is too large")
+
+    height, width = cell_size_degrees(precision)
+    cells = {
+        encode_geohash(
+            max(-90.0, min(90.0, lat + d_lat * height)),
+            (lon + d_lon * width + 180) % 360 - 180,
+            precision,
+        )
+        for d_lat in (-1, 0, 1)
+        for d_lon in (-1, 0, 1)
+    }
+    return sorted(cells)
+
+
+def haversine_distances(
+    lat: float, lon: float, points: Sequence[tuple[float, float]]
+) -> list[float]:
+    """
+    Great-circle distances in meters from one origin to many points. The
+    origin's trigonometry is computed once for the whole batch.
+    """
+    origin_lat = math.radians(lat)
+    origin_lon = math.radians(lon)
+    cos_origin_lat = math.cos(origin_lat)
+    distances: list[float] = []
+    for point_lat, point_lon in points:
+        point_lat_rad = math.radians(point_lat)
+        a = (
+            math.sin((point_lat_rad - origin_lat) / 2) ** 2
+            + cos_origin_lat
+            * math.cos(point_lat_rad)
+            * math.sin((math.radians(point_lon) - origin_lon) / 2) ** 2
+        )
+        distances.append(2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a)))
+    return distances
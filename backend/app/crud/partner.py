@@ -1,63 +1,1265 @@
-from collections.abc import Sequence
+import asyncio
+import heapq
+from collections import Counter
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Any, TypeVar, cast
 
-from boto3.dynamodb.table import BatchWriter
-from mypy_boto3_dynamodb import DynamoDBServiceResource
+from aioboto3.dynamodb.table import BatchWriter
+from botocore.exceptions import ClientError
+from types_aiobotocore_dynamodb import DynamoDBServiceResource
+from types_aiobotocore_dynamodb.service_resource import Table
+from types_aiobotocore_dynamodb.type_defs import (
+    DeleteTypeDef,
+    TransactWriteItemTypeDef,
+    UpdateTypeDef,
+)
 
+from app.core.availability import week_slot
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.models.dynamodb.partners import Partner, PartnerChild, Service, Staffer
-from app.schemas.partners import PartnerCreate
+from app.core.geo import covering_cells, haversine_distances
+from app.crud.transactions import (
+    backoff,
+    cancellation_reasons,
+    is_retryable,
+    transact_put_items,
+)
+from app.models.dynamodb.base import BaseItem, normalize_string, tokenize
+from app.models.dynamodb.partners import (
+    GEO_INDEX_PARTITION_PRECISION,
+    PARTNER_GEO_INDEX,
+    PARTNER_NAME_INDEX,
+    Partner,
+    PartnerChild,
+    PartnerNameToken,
+    PartnerOpenSlot,
+    Service,
+    Staffer,
+)
+from app.schemas.partners import (
+    PartnerCreate,
+    PartnerUpdate,
+    ServiceCreate,
+    ServiceUpdate,
+    StafferCreate,
+    StafferUpdate,
+)
 
+PartnerChildT = TypeVar("PartnerChildT", bound=PartnerChild)
 
-def create_partner(
-    dynamodb_service_resource: DynamoDBServiceResource, partner_in: PartnerCreate
+# A partner's (min_price, max_price), None without services.
+PriceRange = tuple[Decimal | None, Decimal | None]
+
+# Pages of postings one search request reads at most, so a common word whose
+# partners rarely match the other words cannot make it read the whole list.
+SEARCH_PAGES_PER_REQUEST = 5
+
+# Per-process cache of whole partner collections, keyed by partner id.
+# Partners returned from it are shared, so callers must not mutate them.
+partner_cache: TTLCache[str, Partner] = TTLCache(
+    ttl=settings.PARTNER_CACHE_TTL_SECONDS,
+    max_bytes=settings.PARTNER_CACHE_MAX_BYTES,
+    sizeof=lambda partner: len(partner.model_dump_json()),
+)
+
+
+class VersionConflictError(Exception):
+    """An item's version did not match the version the write expected."""
+
+    def __init__(self, current_version: int) -> None:
+        super().__init__(f"Item is at version {current_version}")
+        self.current_version = current_version
+
+
+# Partner rows keep the revision of the whole collection in `version`: every
+# child write increments it as well, so it also serves as the collection's
+# ETag. Appended to an update expression's SET clause.
+PARTNER_VERSION_UPDATE = (
+    "#version = if_not_exists(#version, :version_one) + :version_one"
+)
+
+# Partner fields that the open-slot and name-token items are derived from.
+DERIVED_ITEM_FIELDS = {"name", "is_active", "working_hours"}
+
+
+async def create_partner(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    partner_in: PartnerCreate,
+    transactional: bool = False,
 ) -> Partner:
-    dynamodb_table = dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    """
+    Writes a new partner with its children, open-slot and name-token items
+    (the latter two unless the partner change feed maintains them).
+
+    By default the items go through BatchWriteItem, which is cheapest but
+    can leave part of them written if it fails. `transactional` writes the
+    partner row and its children with TransactWriteItems instead:
+    all-or-nothing for up to 100 items, and for larger partners in chunks
+    with the partner row last, so it only becomes visible once every child
+    is written. The open-slot and name-token items, which point to the row,
+    are only written after it.
+    """
     partner = to_model(partner_in)
+    if transactional:
+        row, *children = collection_items(partner)
+        await transact_put_items(
+            dynamodb_service_resource, [*children, row], partner.pk
+        )
+        invalidate_partner(partner.id)
+        if not settings.PARTNER_DERIVED_ITEMS_FROM_CHANGE_FEED:
+            dynamodb_table = await dynamodb_service_resource.Table(
+                settings.DYNAMODB_TABLE_NAME
+            )
+            await sync_derived_items(dynamodb_table, None, partner)
+        return partner
 
-    with dynamodb_table.batch_writer() as batch_writer:
-        batch_writer.put_item(
+    dynamodb_table = await dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    async with dynamodb_table.batch_writer() as batch_writer:
+        await batch_writer.put_item(
             Item=partner.to_dynamodb_item(exclude={"services", "staff"})
         )
-        put_children(batch_writer, partner.services)
-        put_children(batch_writer, partner.staff)
+        await put_children(batch_writer, partner.services)
+        await put_children(batch_writer, partner.staff)
+        if not settings.PARTNER_DERIVED_ITEMS_FROM_CHANGE_FEED:
+            await put_children(batch_writer, derived_items(partner))
 
+    invalidate_partner(partner.id)
     return partner
 
 
-def get_partner(
-    dynamodb_service_resource: DynamoDBServiceResource, partner_id: str
+async def update_partner(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    partner_id: str,
+    partner_in: PartnerUpdate,
+    expected_version: int | None = None,
 ) -> Partner | None:
-    dynamodb_table = dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
-    response = dynamodb_table.query(
-        KeyConditionExpression="#pk=:pk",
-        ExpressionAttributeNames={"#pk": "pk"},
-        ExpressionAttributeValues={":pk": f"PARTNER#{partner_id}"},
+    """
+    Updates the supplied fields of the partner row, without its children, and
+    keeps the partner's open-slot and name-token items in line with the new
+    row, unless the partner change feed maintains them.
+    """
+    values = partner_in.model_dump(exclude_unset=True, exclude_none=True, mode="json")
+    partner = Partner.model_validate_partial(values, id=partner_id)
+    if (
+        not DERIVED_ITEM_FIELDS & set(values)
+        or settings.PARTNER_DERIVED_ITEMS_FROM_CHANGE_FEED
+    ):
+        attributes = await update_item(
+            dynamodb_service_resource, partner, set(values), expected_version
+        )
+        if attributes is None:
+            return None
+        invalidate_partner(partner_id)
+        return Partner.from_dynamodb_item(attributes)
+
+    # The derived items are diffed against the row this update replaces: it
+    # is read strongly consistent and the update is conditioned on its
+    # version, re-reading it if another write got in between.
+    dynamodb_table = await dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    for attempt in range(settings.DYNAMODB_TRANSACTION_MAX_ATTEMPTS):
+        old_partner = await read_partner_row(
+            dynamodb_table, partner_id, DERIVED_ITEM_FIELDS, consistent_read=True
+        )
+        if old_partner is None:
+            return None
+        if expected_version is not None and old_partner.version != expected_version:
+            raise VersionConflictError(old_partner.version)
+        try:
+            attributes = await update_item(
+                dynamodb_service_resource, partner, set(values), old_partner.version
+            )
+            break
+        except VersionConflictError:
+            last_attempt = attempt + 1 == settings.DYNAMODB_TRANSACTION_MAX_ATTEMPTS
+            if expected_version is not None or last_attempt:
+                raise
+    if attributes is None:
+        return None
+
+    invalidate_partner(partner_id)
+    partner = Partner.from_dynamodb_item(attributes)
+    await sync_derived_items(dynamodb_table, old_partner, partner)
+    return partner
+
+
+def derived_items(partner: Partner) -> list[PartnerOpenSlot | PartnerNameToken]:
+    return [*partner.open_slot_items(), *partner.name_token_items()]
+
+
+async def sync_derived_items(
+    dynamodb_table: Table, old_partner: Partner | None, partner: Partner | None
+) -> None:
+    """
+    Brings the open-slot and name-token items from those of `old_partner` to
+    those of `partner`, where None stands for a partner that does not exist.
+    """
+    if old_partner and partner:
+        await update_open_slots(dynamodb_table, old_partner, partner)
+        await update_name_tokens(dynamodb_table, old_partner, partner)
+        return
+
+    async with dynamodb_table.batch_writer() as batch_writer:
+        if partner:
+            await put_children(batch_writer, derived_items(partner))
+        if old_partner:
+            for item in derived_items(old_partner):
+                await batch_writer.delete_item(Key={"pk": item.pk, "sk": item.sk})
+
+
+async def update_open_slots(
+    dynamodb_table: Table, old_partner: Partner, partner: Partner
+) -> None:
+    """
+    Deletes the slot items the partner is no longer open in and writes the
+    new ones. All of them are rewritten when the name, which they carry,
+    changed.
+    """
+    old_slots = old_partner.open_slots
+    new_slots = partner.open_slots
+    if old_partner.name != partner.name:
+        slots_to_put = new_slots
+    else:
+        slots_to_put = new_slots - old_slots
+
+    async with dynamodb_table.batch_writer() as batch_writer:
+        for slot_item in old_partner.open_slot_items(old_slots - new_slots):
+            await batch_writer.delete_item(Key={"pk": slot_item.pk, "sk": slot_item.sk})
+        await put_children(batch_writer, partner.open_slot_items(slots_to_put))
+
+
+async def update_name_tokens(
+    dynamodb_table: Table, old_partner: Partner, partner: Partner
+) -> None:
+    """
+    Moves the partner's postings to the new name: they are sorted by it, so
+    renaming deletes every old posting whose key changed and puts the new
+    ones, which carry the name.
+    """
+    if old_partner.name == partner.name:
+        return
+
+    token_items = partner.name_token_items()
+    keys = {(token_item.pk, token_item.sk) for token_item in token_items}
+    async with dynamodb_table.batch_writer() as batch_writer:
+        for token_item in old_partner.name_token_items():
+            if (token_item.pk, token_item.sk) not in keys:
+                await batch_writer.delete_item(
+                    Key={"pk": token_item.pk, "sk": token_item.sk}
+                )
+        await put_children(batch_writer, token_items)
+
+
+async def create_service(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    partner_id: str,
+    service_in: ServiceCreate,
+) -> Service | None:
+    service = Service(**service_in.model_dump(), partner_id=partner_id)
+    return await put_child(dynamodb_service_resource, service)
+
+
+async def create_staffer(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    partner_id: str,
+    staffer_in: StafferCreate,
+) -> Staffer | None:
+    staffer = Staffer(**staffer_in.model_dump(), partner_id=partner_id)
+    return await put_child(dynamodb_service_resource, staffer)
+
+
+async def put_child(
+    dynamodb_service_resource: DynamoDBServiceResource, child: PartnerChildT
+) -> PartnerChildT | None:
+    """
+    Writes a single new child item of an existing partner, counting it on the
+    partner row in the same transaction. Returns None, writing nothing, when
+    the partner does not exist.
+    """
+    put_action: TransactWriteItemTypeDef = {
+        "Put": {
+            "TableName": settings.DYNAMODB_TABLE_NAME,
+            "Item": child.to_dynamodb_item(),
+            "ConditionExpression": "attribute_not_exists(pk)",
+        }
+    }
+    written = await transact_child_write(
+        dynamodb_service_resource,
+        child,
+        put_action,
+        count_delta=1,
+        reprice=isinstance(child, Service),
+        price=child.price if isinstance(child, Service) else None,
+    )
+    if not written:
+        return None
+
+    invalidate_partner(child.partner_id)
+    return child
+
+
+async def transact_child_write(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    child: PartnerChild,
+    child_action: TransactWriteItemTypeDef,
+    count_delta: int = 0,
+    reprice: bool = False,
+    price: Decimal | None = None,
+    expected_version: int | None = None,
+) -> bool:
+    """
+    Writes `child_action` in one transaction with the partner row update that
+    increments the partner's version and adds `count_delta` to its count of
+    the child's kind. With `expected_version` the partner has to be at that
+    version, the ETag of its whole collection.
+
+    With `reprice`, for a service that is now at `price` (or removed when it
+    is None), the same update sets the partner's price range, computed by
+    `read_price_range` and conditioned on the partner version read with it.
+    As every child write increments that version, the range cannot be based
+    on services that changed in the meantime.
+
+    Transactions cancelled by a conflicting write, and price ranges whose
+    partner version moved on, are retried with jittered exponential backoff.
+    Returns False, writing nothing, if the partner or the updated child does
+    not exist and raises `VersionConflictError` if the partner is not at
+    `expected_version`.
+    """
+    dynamodb_table = await dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    partner_key = Partner.model_construct(id=child.partner_id)
+    for attempt in range(settings.DYNAMODB_TRANSACTION_MAX_ATTEMPTS):
+        if attempt:
+            await backoff(attempt)
+
+        partner_version, price_range = expected_version, None
+        if reprice and isinstance(child, Service):
+            read = await read_price_range(
+                dynamodb_table, child, price, inserted=count_delta > 0
+            )
+            if read is None:
+                return False
+            partner_version, price_range = read
+            if expected_version not in (None, partner_version):
+                raise VersionConflictError(partner_version)
+        partner_action = partner_version_action(
+            partner_key,
+            partner_version,
+            (child.count_attribute, count_delta) if count_delta else None,
+            price_range,
+        )
+        try:
+            await dynamodb_service_resource.meta.client.transact_write_items(
+                TransactItems=[child_action, partner_action]
+            )
+            return True
+        except ClientError as e:
+            last_attempt = attempt + 1 == settings.DYNAMODB_TRANSACTION_MAX_ATTEMPTS
+            # A partner that moved on from the caller's version is a conflict.
+            moved_on = expected_version is None and partner_moved_on(e)
+            if last_attempt or not (is_retryable(e) or moved_on):
+                raise_on_child_conflict(e)
+                return False
+    return False
+
+
+async def read_price_range(
+    dynamodb_table: Table,
+    service: Service,
+    price: Decimal | None,
+    inserted: bool = False,
+) -> tuple[int, PriceRange] | None:
+    """
+    Reads the partner's version and price range, strongly consistent, and
+    returns that version with the price range the partner has once `service`
+    is at `price`, or removed when it is None. Returns None if the partner
+    does not exist.
+
+    An `inserted` service, or one whose old price was strictly inside the
+    range, only widens it. Otherwise the service was at the minimum or
+    maximum, so all service prices are queried to find the new ones.
+    """
+    partner = await read_partner_row(
+        dynamodb_table,
+        service.partner_id,
+        {"min_price", "max_price"},
+        consistent_read=True,
     )
-    staff: list[Staffer] = []
-    services: list[Service] = []
-    partner: Partner | None = None
-    for item in response.get("Items", []):
-        if item["item_type"] == "STAFFER":
-            staff.append(Staffer.model_validate(item))
+    if partner is None:
+        return None
+
+    price_range = (partner.min_price, partner.max_price)
+    if price is not None and inserted:
+        return partner.version, widen_price_range(price_range, price)
+    if price is not None:
+        response = await dynamodb_table.get_item(
+            Key={"pk": service.pk, "sk": service.sk},
+            ProjectionExpression="#price",
+            ExpressionAttributeNames={"#price": "price"},
+            ConsistentRead=True,
+        )
+        old_price = response.get("Item", {}).get("price")
+        min_price, max_price = price_range
+        if (
+            isinstance(old_price, Decimal)
+            and min_price is not None
+            and max_price is not None
+            and min_price < old_price < max_price
+        ):
+            return partner.version, widen_price_range(price_range, price)
+
+    prices = {
+        item["id"]: item["price"]
+        async for page in query_pages(
+            dynamodb_table,
+            ConsistentRead=True,
+            KeyConditionExpression="#pk=:pk AND begins_with(#sk, :sk_prefix)",
+            ProjectionExpression="#id, #price",
+            ExpressionAttributeNames={
+                "#pk": "pk",
+                "#sk": "sk",
+                "#id": "id",
+                "#price": "price",
+            },
+            ExpressionAttributeValues={
+                ":pk": partner.pk,
+                ":sk_prefix": f"{Service.entity_type}#",
+            },
+        )
+        for item in page
+    }
+    if price is None:
+        prices.pop(service.id, None)
+    else:
+        prices[service.id] = price
+    return partner.version, (
+        min(prices.values(), default=None),
+        max(prices.values(), default=None),
+    )
+
+
+def widen_price_range(price_range: PriceRange, price: Decimal) -> PriceRange:
+    min_price, max_price = price_range
+    return (
+        price if min_price is None else min(min_price, price),
+        price if max_price is None else max(max_price, price),
+    )
+
+
+def partner_version_action(
+    partner_key: Partner,
+    expected_version: int | None = None,
+    count: tuple[str, int] | None = None,
+    price_range: PriceRange | None = None,
+) -> TransactWriteItemTypeDef:
+    """
+    TransactWriteItems action incrementing the version of a partner row, if
+    it is at `expected_version`, and applying a (count attribute, delta) and
+    a (min, max) price range. A failed condition returns the stored row.
+    """
+    update_expression = f"SET {PARTNER_VERSION_UPDATE}"
+    condition_expression = "attribute_exists(pk)"
+    expression_attribute_names = {"#version": "version"}
+    expression_attribute_values: dict[str, Any] = {":version_one": 1}
+    if price_range is not None:
+        update_expression += ", #min_price = :min_price, #max_price = :max_price"
+        expression_attribute_names["#min_price"] = "min_price"
+        expression_attribute_names["#max_price"] = "max_price"
+        (
+            expression_attribute_values[":min_price"],
+            expression_attribute_values[":max_price"],
+        ) = price_range
+    if count is not None:
+        update_expression += " ADD #count :delta"
+        expression_attribute_names["#count"] = count[0]
+        expression_attribute_values[":delta"] = count[1]
+    if expected_version is not None:
+        condition_expression += f" AND {version_condition(expected_version)}"
+        expression_attribute_values[":expected_version"] = expected_version
+    return {
+        "Update": {
+            "TableName": settings.DYNAMODB_TABLE_NAME,
+            "Key": {"pk": partner_key.pk, "sk": partner_key.sk},
+            "UpdateExpression": update_expression,
+            "ConditionExpression": condition_expression,
+            "ExpressionAttributeNames": expression_attribute_names,
+            "ExpressionAttributeValues": expression_attribute_values,
+            "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+        }
+    }
+
+
+async def update_service(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    partner_id: str,
+    service_id: str,
+    service_in: ServiceUpdate,
+    expected_version: int | None = None,
+) -> Service | None:
+    values = service_in.model_dump(exclude_unset=True, exclude_none=True, mode="json")
+    service = Service.model_validate_partial(
+        values, id=service_id, partner_id=partner_id
+    )
+    attributes = await update_child(
+        dynamodb_service_resource,
+        service,
+        set(values),
+        expected_version,
+        reprice="price" in values,
+    )
+    if attributes is None:
+        return None
+
+    invalidate_partner(partner_id)
+    return Service.from_dynamodb_item(attributes)
+
+
+async def update_staffer(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    partner_id: str,
+    staffer_id: str,
+    staffer_in: StafferUpdate,
+    expected_version: int | None = None,
+) -> Staffer | None:
+    values = staffer_in.model_dump(exclude_unset=True, exclude_none=True, mode="json")
+    staffer = Staffer.model_validate_partial(
+        values, id=staffer_id, partner_id=partner_id
+    )
+    attributes = await update_child(
+        dynamodb_service_resource, staffer, set(values), expected_version
+    )
+    if attributes is None:
+        return None
+
+    invalidate_partner(partner_id)
+    return Staffer.from_dynamodb_item(attributes)
+
+
+async def update_item(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    item: BaseItem,
+    fields: set[str],
+    expected_version: int | None = None,
+) -> dict[str, Any] | None:
+    """
+    Writes `fields` of an existing item, and the GSI attributes derived from
+    them, with a single UpdateItem that also increments the item's version.
+    Returns the item's attributes after the update, or None if it does not
+    exist.
+
+    With `expected_version` the write only succeeds if the item is still at
+    that version, otherwise raises `VersionConflictError`. The failed write
+    returns the stored item, so telling a conflict from a missing item takes
+    no extra read.
+    """
+    dynamodb_table = await dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    update = update_action(item, fields, expected_version)
+    try:
+        response = await dynamodb_table.update_item(
+            Key=update["Key"],
+            UpdateExpression=update["UpdateExpression"],
+            ConditionExpression=update["ConditionExpression"],
+            ExpressionAttributeNames=update["ExpressionAttributeNames"],
+            ExpressionAttributeValues=update["ExpressionAttributeValues"],
+            ReturnValues="ALL_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            raise_on_version_conflict(e)
+            return None
+        raise
+
+    return response["Attributes"]
+
+
+async def update_child(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    child: PartnerChild,
+    fields: set[str],
+    expected_version: int | None = None,
+    reprice: bool = False,
+) -> dict[str, Any] | None:
+    """
+    `update_item` for a child, which also increments the partner's version,
+    and with `reprice` sets its price range, in the same transaction (see
+    `transact_child_write`). `expected_version` is the version of the
+    partner, not of the child. Transactions return no attributes, so the
+    updated child is read back with a strongly consistent GetItem.
+    """
+    price = child.price if isinstance(child, Service) and reprice else None
+    written = await transact_child_write(
+        dynamodb_service_resource,
+        child,
+        {"Update": update_action(child, fields, None)},
+        reprice=reprice,
+        price=price,
+        expected_version=expected_version,
+    )
+    if not written:
+        return None
+
+    dynamodb_table = await dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    response = await dynamodb_table.get_item(
+        Key={"pk": child.pk, "sk": child.sk}, ConsistentRead=True
+    )
+    return response.get("Item")
+
+
+def update_action(
+    item: BaseItem, fields: set[str], expected_version: int | None
+) -> UpdateTypeDef:
+    """
+    Update of `fields` shared by `update_item` and `update_child`, returning
+    the stored item if its condition fails.
+    """
+    update_expression = item.to_update_expression(include=fields)
+    update_expression.update_gsis(item.updated_gsis(fields))
+    update_expression.increment_version()
+    condition_expression = "attribute_exists(pk)"
+    if expected_version is not None:
+        condition_expression += f" AND {version_condition(expected_version)}"
+        update_expression.expression_attribute_values[":expected_version"] = (
+            expected_version
+        )
+    return {
+        "TableName": settings.DYNAMODB_TABLE_NAME,
+        "Key": {"pk": item.pk, "sk": item.sk},
+        "UpdateExpression": update_expression.update_expression,
+        "ConditionExpression": condition_expression,
+        "ExpressionAttributeNames": update_expression.expression_attribute_names,
+        "ExpressionAttributeValues": update_expression.expression_attribute_values,
+        "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+    }
+
+
+async def delete_service(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    partner_id: str,
+    service_id: str,
+    expected_version: int | None = None,
+) -> bool:
+    service = Service.model_construct(id=service_id, partner_id=partner_id)
+    return await delete_child(dynamodb_service_resource, service, expected_version)
+
+
+async def delete_staffer(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    partner_id: str,
+    staffer_id: str,
+    expected_version: int | None = None,
+) -> bool:
+    staffer = Staffer.model_construct(id=staffer_id, partner_id=partner_id)
+    return await delete_child(dynamodb_service_resource, staffer, expected_version)
+
+
+async def delete_child(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    child: PartnerChild,
+    expected_version: int | None = None,
+) -> bool:
+    """
+    Deletes a single child item and uncounts it on the partner row in the
+    same transaction, which for a service also narrows the partner's price
+    range. Returns False if it does not exist and raises
+    `VersionConflictError` if the partner is not at `expected_version`.
+    """
+    delete_action: DeleteTypeDef = {
+        "TableName": settings.DYNAMODB_TABLE_NAME,
+        "Key": {"pk": child.pk, "sk": child.sk},
+        "ConditionExpression": "attribute_exists(pk)",
+    }
+    deleted = await transact_child_write(
+        dynamodb_service_resource,
+        child,
+        {"Delete": delete_action},
+        count_delta=-1,
+        reprice=isinstance(child, Service),
+        expected_version=expected_version,
+    )
+    if deleted:
+        invalidate_partner(child.partner_id)
+    return deleted
+
+
+def raise_on_child_conflict(error: ClientError) -> None:
+    """
+    Handles a failed transaction that writes a child and then its partner
+    row: raises `VersionConflictError` if the partner exists at another
+    version, returns if the child or the partner does not exist and
+    re-raises any other error.
+    """
+    reasons = cancellation_reasons(error)
+    if not reasons:
+        raise error
+    for reason in reasons:
+        if reason.get("Code") == "ConditionalCheckFailed":
+            stored_item = reason.get("Item")
+            if stored_item:
+                raise VersionConflictError(
+                    int(stored_item.get("version", {}).get("N", 1))
+                )
+            return
+    raise error
+
+
+def partner_moved_on(error: ClientError) -> bool:
+    """
+    Whether a transaction writing a child and then its partner row failed
+    only because the partner row, which exists, was not at the version the
+    write read it at.
+    """
+    reasons = cancellation_reasons(error)
+    return (
+        len(reasons) == 2
+        and reasons[0].get("Code") == "None"
+        and reasons[1].get("Code") == "ConditionalCheckFailed"
+        and bool(reasons[1].get("Item"))
+    )
+
+
+def raise_on_version_conflict(error: ClientError) -> None:
+    """
+    Raises `VersionConflictError` if a conditional write that returned the
+    stored item on failure failed although the item exists.
+    """
+    # The typed error response does not declare the item ALL_OLD returns.
+    stored_item = cast(dict[str, Any], error.response).get("Item")
+    if stored_item:
+        raise VersionConflictError(int(stored_item.get("version", {}).get("N", 1)))
+
+
+def version_condition(expected_version: int) -> str:
+    """
+    Condition that the item is at `expected_version`, using `#version` and
+    `:expected_version`. Items without the attribute count as version 1.
+    """
+    if expected_version == 1:
+        return "(attribute_not_exists(#version) OR #version = :expected_version)"
+    return "#version = :expected_version"
+
+
+def invalidate_partner(partner_id: str) -> None:
+    """Must be called by every code path that writes to a partner collection."""
+    partner_cache.invalidate(partner_id)
+
+
+async def get_partner(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    partner_id: str,
+    page_size: int | None = None,
+) -> Partner | None:
+    """Read-through `partner_cache` in front of `read_partner`."""
+    partner = partner_cache.get(partner_id)
+    if partner:
+        return partner
+
+    generation = partner_cache.generation
+    partner = await read_partner(dynamodb_service_resource, partner_id, page_size)
+    if partner:
+        partner_cache.set(partner_id, partner, generation)
+    return partner
+
+
+async def get_partner_version(
+    dynamodb_service_resource: DynamoDBServiceResource, partner_id: str
+) -> int | None:
+    """
+    Returns the version of a partner collection, None if the partner does not
+    exist, reading only the version of the partner row unless it is cached.
+    """
+    partner = partner_cache.get(partner_id)
+    if partner:
+        return partner.version
+
+    dynamodb_table = await dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    partner = await read_partner_row(dynamodb_table, partner_id, set())
+    return partner.version if partner else None
+
+
+async def read_partner(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    partner_id: str,
+    page_size: int | None = None,
+) -> Partner | None:
+    staff_items: list[dict[str, Any]] = []
+    service_items: list[dict[str, Any]] = []
+    partner_item: dict[str, Any] | None = None
+    async for item in iter_partner_items(
+        dynamodb_service_resource, partner_id, page_size
+    ):
+        if item["item_type"] == Staffer.entity_type:
+            staff_items.append(item)
             continue
 
-        if item["item_type"] == "SERVICE":
-            services.append(Service.model_validate(item))
+        if item["item_type"] == Service.entity_type:
+            service_items.append(item)
             continue
 
-        partner = Partner.model_validate(item)
+        if item["item_type"] == Partner.entity_type:
+            partner_item = item
+
+    if not partner_item:
+        return None
+
+    partner = Partner.from_dynamodb_item(partner_item)
+    partner.staff = Staffer.from_dynamodb_items(staff_items)
+    partner.services = Service.from_dynamodb_items(service_items)
+    return partner
+
 
+async def get_partner_view(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    partner_id: str,
+    include: set[str],
+    fields: set[str] | None = None,
+) -> Partner | None:
+    """
+    Reads only part of a partner collection: the partner row projected to
+    `fields` (all attributes when None) and the child collections named in
+    `include` ("services", "staff"), each with its own `begins_with(sk, ...)`
+    query. Children that are not included are neither read nor validated.
+
+    A cached full partner is returned as is; callers select what they need.
+    """
+    partner = partner_cache.get(partner_id)
+    if partner:
+        return partner
+
+    dynamodb_table = await dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    children: dict[str, type[Service] | type[Staffer]] = {
+        "services": Service,
+        "staff": Staffer,
+    }
+    included_children = [name for name in children if name in include]
+    partner, children_lists = await asyncio.gather(
+        read_partner_row(dynamodb_table, partner_id, fields),
+        asyncio.gather(
+            *(
+                read_partner_children(dynamodb_table, partner_id, children[name])
+                for name in included_children
+            )
+        ),
+    )
     if not partner:
         return None
 
-    partner.staff = staff
-    partner.services = services
+    for name, children_list in zip(included_children, children_lists, strict=True):
+        setattr(partner, name, children_list)
     return partner
 
 
-def put_children(batch_writer: BatchWriter, children: Sequence[PartnerChild]):
+async def read_partner_row(
+    dynamodb_table: Table,
+    partner_id: str,
+    fields: set[str] | None = None,
+    consistent_read: bool = False,
+) -> Partner | None:
+    key_item = Partner.model_construct(id=partner_id)
+    get_item_kwargs: dict[str, Any] = {
+        "Key": {"pk": key_item.pk, "sk": key_item.sk},
+        "ConsistentRead": consistent_read,
+    }
+    if fields is not None:
+        attribute_names = {f"#{field}": field for field in {"id", "version", *fields}}
+        get_item_kwargs["ProjectionExpression"] = ", ".join(attribute_names)
+        get_item_kwargs["ExpressionAttributeNames"] = attribute_names
+
+    item: dict[str, Any] | None = (
+        await dynamodb_table.get_item(**get_item_kwargs)
+    ).get("Item")
+    if not item:
+        return None
+    if fields is None:
+        return Partner.from_dynamodb_item(item)
+    return partial_partner(item, fields)
+
+
+def partial_partner(item: dict[str, Any], fields: set[str]) -> Partner:
+    """A partner with only `fields` validated, from a projected partner row."""
+    values = {field: item[field] for field in fields if field in item}
+    return Partner.model_validate_partial(
+        values, id=item["id"], version=int(item.get("version", 1))
+    )
+
+
+async def read_partner_children(
+    dynamodb_table: Table,
+    partner_id: str,
+    child_class: type[Service] | type[Staffer],
+) -> list[Service] | list[Staffer]:
+    return child_class.from_dynamodb_items(
+        [
+            item
+            async for page in query_pages(
+                dynamodb_table,
+                KeyConditionExpression="#pk=:pk AND begins_with(#sk, :sk_prefix)",
+                ExpressionAttributeNames={"#pk": "pk", "#sk": "sk"},
+                ExpressionAttributeValues={
+                    ":pk": f"{child_class.parent_entity}#{partner_id}",
+                    ":sk_prefix": f"{child_class.entity_type}#",
+                },
+            )
+            for item in page
+        ]
+    )
+
+
+async def get_partners(
+    dynamodb_service_resource: DynamoDBServiceResource, partner_ids: Sequence[str]
+) -> tuple[list[Partner], list[str]]:
+    """
+    Fetches many partner collections concurrently.
+
+    Returns the partners found, in request order, and the ids that were not.
+    At most `PARTNER_BATCH_GET_MAX_CONCURRENCY` collection queries of a single
+    call are in flight at once.
+    """
+    semaphore = asyncio.Semaphore(settings.PARTNER_BATCH_GET_MAX_CONCURRENCY)
+
+    async def bounded_get_partner(partner_id: str) -> Partner | None:
+        async with semaphore:
+            return await get_partner(dynamodb_service_resource, partner_id)
+
+    unique_ids = list(dict.fromkeys(partner_ids))
+    results = await asyncio.gather(
+        *(bounded_get_partner(partner_id) for partner_id in unique_ids)
+    )
+
+    partners: list[Partner] = []
+    not_found: list[str] = []
+    for partner_id, partner in zip(unique_ids, results, strict=True):
+        if partner:
+            partners.append(partner)
+        else:
+            not_found.append(partner_id)
+
+    return partners, not_found
+
+
+async def list_partners(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    name_prefix: str | None,
+    limit: int,
+    exclusive_start_key: dict[str, Any] | None = None,
+) -> tuple[list[Partner], dict[str, Any] | None]:
+    """
+    Returns one page of partners ordered by normalized name, optionally
+    restricted to names starting with `name_prefix`, together with the
+    position to continue from: the `LastEvaluatedKey` of every name-index
+    shard that is not exhausted yet (None for one not read yet).
+
+    The shards are queried in parallel for up to `limit` partners each, and
+    their sorted pages are merged. Shards whose partners were not reached
+    keep their position, so nothing is skipped or repeated across pages.
+    """
+    dynamodb_table = await dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    if exclusive_start_key is None:
+        exclusive_start_key = {
+            str(shard): None for shard in range(settings.PARTNER_NAME_INDEX_SHARDS)
+        }
+    sk_prefix = f"{Partner.entity_type}#{normalize_string(name_prefix or '')}"
+    shards = list(exclusive_start_key)
+    responses = await asyncio.gather(
+        *(
+            query_name_shard(
+                dynamodb_table, int(shard), sk_prefix, limit, exclusive_start_key[shard]
+            )
+            for shard in shards
+        )
+    )
+    pages = [response.get("Items", []) for response in responses]
+    merged = heapq.merge(
+        *(
+            [(shard, item) for item in page]
+            for shard, page in zip(shards, pages, strict=True)
+        ),
+        key=lambda shard_item: shard_item[1][PARTNER_NAME_INDEX.sort_key],
+    )
+    selected = list(islice(merged, limit))
+
+    last_selected = dict(selected)
+    counts = Counter(shard for shard, _ in selected)
+    next_key: dict[str, Any] = {}
+    for shard, page, response in zip(shards, pages, responses, strict=True):
+        if counts[shard] < len(page):
+            next_key[shard] = (
+                name_index_key(last_selected[shard])
+                if counts[shard]
+                else exclusive_start_key[shard]
+            )
+        elif "LastEvaluatedKey" in response:
+            next_key[shard] = response["LastEvaluatedKey"]
+
+    partners = Partner.from_dynamodb_items(item for _, item in selected)
+    return partners, next_key or None
+
+
+async def query_name_shard(
+    dynamodb_table: Table,
+    shard: int,
+    sk_prefix: str,
+    limit: int,
+    exclusive_start_key: dict[str, Any] | None,
+) -> dict[str, Any]:
+    query_kwargs: dict[str, Any] = {
+        "IndexName": PARTNER_NAME_INDEX.name,
+        "KeyConditionExpression": "#pk=:pk AND begins_with(#sk, :sk_prefix)",
+        "ExpressionAttributeNames": {
+            "#pk": PARTNER_NAME_INDEX.partition_key,
+            "#sk": PARTNER_NAME_INDEX.sort_key,
+        },
+        "ExpressionAttributeValues": {
+            ":pk": Partner.name_index_partition(shard),
+            ":sk_prefix": sk_prefix,
+        },
+        "Limit": limit,
+    }
+    if exclusive_start_key:
+        query_kwargs["ExclusiveStartKey"] = exclusive_start_key
+    return await dynamodb_table.query(**query_kwargs)  # type: ignore[return-value]
+
+
+def name_index_key(item: dict[str, Any]) -> dict[str, Any]:
+    """The `ExclusiveStartKey` that continues a name-index query after `item`."""
+    return {
+        key: item[key]
+        for key in ("pk", "sk", PARTNER_NAME_INDEX.partition_key, "gsi_sk")
+    }
+
+
+async def list_open_partners(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    at: datetime,
+    limit: int,
+    exclusive_start_key: dict[str, Any] | None = None,
+) -> tuple[list[PartnerOpenSlot], dict[str, Any] | None]:
+    """
+    Returns one page of the partners open at the wall-clock time `at`, read
+    from the slot's partition of the open-slot index, together with the
+    `LastEvaluatedKey` to continue from. Slot items carry the partner's name,
+    so partner rows are not read.
+    """
+    dynamodb_table = await dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    slot_key = PartnerOpenSlot.model_construct(slot=week_slot(at))
+    query_kwargs: dict[str, Any] = {
+        "KeyConditionExpression": "#pk=:pk",
+        "ExpressionAttributeNames": {"#pk": "pk"},
+        "ExpressionAttributeValues": {":pk": slot_key.pk},
+        "Limit": limit,
+    }
+    if exclusive_start_key:
+        query_kwargs["ExclusiveStartKey"] = exclusive_start_key
+
+    response = await dynamodb_table.query(**query_kwargs)
+    slots = PartnerOpenSlot.from_dynamodb_items(response.get("Items", []))
+    return slots, response.get("LastEvaluatedKey")
+
+
+async def search_partners(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    query: str,
+    limit: int,
+    exclusive_start_key: dict[str, Any] | None = None,
+) -> tuple[list[PartnerNameToken], dict[str, Any] | None]:
+    """
+    Returns up to `limit` partners whose name contains every word of `query`,
+    ordered by normalized name, as postings of the name-token index, together
+    with the key to continue from.
+
+    Only the postings of the query's longest word, the most selective one in
+    practice, are read, in name order and `limit` at a time. Each posting
+    carries the partner's name, so the other words are checked against it.
+    At most `SEARCH_PAGES_PER_REQUEST` pages are read, so a page may hold
+    fewer than `limit` partners although there are more to continue from.
+    Partner rows are not read.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return [], None
+
+    dynamodb_table = await dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    token = max(tokens, key=lambda token: (len(token), token))
+    query_kwargs: dict[str, Any] = {
+        "KeyConditionExpression": "#pk=:pk",
+        "ExpressionAttributeNames": {"#pk": "pk"},
+        "ExpressionAttributeValues": {
+            ":pk": PartnerNameToken.model_construct(token=token).pk
+        },
+        "Limit": limit,
+    }
+    if exclusive_start_key:
+        query_kwargs["ExclusiveStartKey"] = exclusive_start_key
+
+    matches: list[PartnerNameToken] = []
+    for _ in range(SEARCH_PAGES_PER_REQUEST):
+        response = await dynamodb_table.query(**query_kwargs)
+        for posting in PartnerNameToken.from_dynamodb_items(response.get("Items", [])):
+            if not tokens <= tokenize(posting.name):
+                continue
+            matches.append(posting)
+            if len(matches) == limit:
+                return matches, {"pk": posting.pk, "sk": posting.sk}
+
+        last_evaluated_key = response.get("LastEvaluatedKey")
+        if not last_evaluated_key:
+            return matches, None
+        query_kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+    return matches, query_kwargs["ExclusiveStartKey"]
+
+
+async def find_nearby_partners(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    lat: float,
+    lon: float,
+    radius_meters: float,
+    limit: int,
+) -> list[tuple[Partner, float]]:
+    """
+    Returns up to `limit` partners within `radius_meters` of the point with
+    their distances in meters, nearest first.
+
+    The nine geohash cells covering the search circle are queried on the geo
+    index in parallel, so the cost depends on the number of partners nearby
+    rather than on the size of the table.
+    """
+    dynamodb_table = await dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    cells = covering_cells(lat, lon, radius_meters, GEO_INDEX_PARTITION_PRECISION)
+    pages = await asyncio.gather(
+        *(
+            read_pages(
+                query_pages(
+                    dynamodb_table,
+                    IndexName=PARTNER_GEO_INDEX.name,
+                    KeyConditionExpression="#pk=:pk AND begins_with(#sk, :sk_prefix)",
+                    ExpressionAttributeNames={
+                        "#pk": PARTNER_GEO_INDEX.partition_key,
+                        "#sk": PARTNER_GEO_INDEX.sort_key,
+                    },
+                    ExpressionAttributeValues={
+                        ":pk": f"GEO#{cell[:GEO_INDEX_PARTITION_PRECISION]}",
+                        ":sk_prefix": cell,
+                    },
+                )
+            )
+            for cell in cells
+        )
+    )
+    candidates = Partner.from_dynamodb_items(item for items in pages for item in items)
+    distances = haversine_distances(
+        lat,
+        lon,
+        [
+            (float(partner.address.location.lat), float(partner.address.location.lon))
+            for partner in candidates
+        ],
+    )
+    nearby = sorted(
+        (
+            (partner, distance)
+            for partner, distance in zip(candidates, distances, strict=True)
+            if distance <= radius_meters
+        ),
+        key=lambda partner_distance: partner_distance[1],
+    )
+    return nearby[:limit]
+
+
+async def iter_partner_items(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    partner_id: str,
+    page_size: int | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Yields every item of the partner's item collection, one page at a time."""
+    dynamodb_table = await dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    async for page in query_pages(
+        dynamodb_table,
+        page_size=page_size,
+        KeyConditionExpression="#pk=:pk",
+        ExpressionAttributeNames={"#pk": "pk"},
+        ExpressionAttributeValues={":pk": f"PARTNER#{partner_id}"},
+    ):
+        for item in page:
+            yield item
+
+
+async def query_pages(
+    dynamodb_table: Table, page_size: int | None = None, **query_kwargs: Any
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """
+    Lazily follows `LastEvaluatedKey`, yielding the items of one query page at
+    a time, so no more than a single page is buffered.
+    """
+    query_kwargs["Limit"] = page_size or settings.DYNAMODB_QUERY_PAGE_SIZE
+    while True:
+        response = await dynamodb_table.query(**query_kwargs)
+        yield response.get("Items", [])
+
+        last_evaluated_key = response.get("LastEvaluatedKey")
+        if not last_evaluated_key:
+            return
+
+        query_kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+
+async def scan_partner_rows(
+    dynamodb_table: Table, attributes: set[str]
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """
+    Yields the partner rows of the whole table, projected to their keys and
+    `attributes`, one scan page at a time. Only meant for backfills.
+    """
+    attribute_names = {
+        f"#{name}": name for name in sorted({"pk", "sk", "item_type", *attributes})
+    }
+    scan_kwargs: dict[str, Any] = {
+        "FilterExpression": "#item_type = :item_type",
+        "ProjectionExpression": ", ".join(attribute_names),
+        "ExpressionAttributeNames": attribute_names,
+        "ExpressionAttributeValues": {":item_type": Partner.entity_type},
+    }
+    while True:
+        response = await dynamodb_table.scan(**scan_kwargs)
+        yield response.get("Items", [])
+
+        last_evaluated_key = response.get("LastEvaluatedKey")
+        if not last_evaluated_key:
+            return
+
+        scan_kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+
+async def read_pages(
+    pages: AsyncIterator[list[dict[str, Any]]],
+) -> list[dict[str, Any]]:
+    return [item async for page in pages for item in page]
+
+
+async def put_children(
+    batch_writer: BatchWriter,
+    children: Sequence[PartnerChild | PartnerOpenSlot | PartnerNameToken],
+) -> None:
     for child in children:
-        batch_writer.put_item(Item=child.to_dynamodb_item())
+        await batch_writer.put_item(Item=child.to_dynamodb_item())
+
+
+def partner_items(partner: Partner) -> list[dict[str, Any]]:
+    """Returns every item a new partner is written as, its row first."""
+    items = collection_items(partner)
+    if not settings.PARTNER_DERIVED_ITEMS_FROM_CHANGE_FEED:
+        items.extend(item.to_dynamodb_item() for item in derived_items(partner))
+    return items
+
+
+def collection_items(partner: Partner) -> list[dict[str, Any]]:
+    """Returns the partner row and child items of a new partner, row first."""
+    children: list[BaseItem] = [*partner.services, *partner.staff]
+    return [
+        partner.to_dynamodb_item(exclude={"services", "staff"}),
+        *(child.to_dynamodb_item() for child in children),
+    ]
 
 
 def to_model(partner_in: PartnerCreate) -> Partner:
@@ -70,4 +1272,5 @@ def to_model(partner_in: PartnerCreate) -> Partner:
         Staffer(**staffer.model_dump(), partner_id=partner.id)
         for staffer in partner_in.staff
     ]
+    partner.update_aggregates()
     return partner
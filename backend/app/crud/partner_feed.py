@@ -0,0 +1,38 @@
+"""
+Handlers of partner changes, delivered by the table's change feed (see
+`app.core.change_feed`).
+
+`partner_feed` maintains derived items and runs in a single consumer:
+`app/partner_feed_worker.py`, or a Lambda function subscribed to the stream.
+Partner caches are not fed by the stream, as DynamoDB Streams throttles more
+than two readers of a shard; they expire after `PARTNER_CACHE_TTL_SECONDS`.
+"""
+
+from app.core.change_feed import ChangeEvent, ChangeFeed
+from app.core.config import settings
+from app.core.dynamodb import dynamodb_pool
+from app.crud.partner import sync_derived_items
+from app.models.dynamodb.partners import Partner
+
+partner_feed = ChangeFeed("partners")
+
+
+@partner_feed.handler(Partner.entity_type)
+async def sync_partner_derived_items(events: list[ChangeEvent]) -> None:
+    """
+    Brings the open-slot and name-token items of a partner in line with its
+    row. They only depend on the row before the first and after the last
+    change, so a batch of changes to one partner costs a single sync.
+    """
+    if not settings.PARTNER_DERIVED_ITEMS_FROM_CHANGE_FEED:
+        return
+
+    old_image = events[0].old_image
+    new_image = events[-1].new_image
+    dynamodb_service_resource = await dynamodb_pool.open()
+    dynamodb_table = await dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    await sync_derived_items(
+        dynamodb_table,
+        Partner.from_dynamodb_item(old_image) if old_image else None,
+        Partner.from_dynamodb_item(new_image) if new_image else None,
+    )
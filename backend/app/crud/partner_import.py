@@ -0,0 +1,189 @@
+import asyncio
+import random
+from collections.abc import AsyncIterable, AsyncIterator, Sequence
+from typing import Any, TypeVar
+
+from botocore.exceptions import ClientError
+from pydantic import ValidationError
+from types_aiobotocore_dynamodb import DynamoDBServiceResource
+from types_aiobotocore_dynamodb.type_defs import WriteRequestUnionTypeDef
+
+from app.core.config import settings
+from app.crud.partner import partner_items, to_model
+from app.models.dynamodb.partners import Partner
+from app.schemas.partners import (
+    PartnerCreate,
+    PartnerImportLineResult,
+    PartnerImportReport,
+)
+
+# BatchWriteItem accepts at most 25 put requests per call.
+BATCH_SIZE = 25
+
+EntryT = TypeVar("EntryT")
+
+
+async def import_partners(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    chunks: AsyncIterable[bytes],
+    writers: int | None = None,
+) -> PartnerImportReport:
+    """
+    Imports NDJSON `PartnerCreate` records as they stream in.
+
+    Lines are validated one at a time and handed to `writers` concurrent
+    writers through a bounded queue, so memory stays flat however large the
+    import is. A line is reported as failed when it does not validate or
+    when any of its items is still unprocessed after retries; in the latter
+    case some of its children may already have been written. Any other
+    error of a writer cancels the import and is raised.
+    """
+    writers = writers or settings.PARTNER_IMPORT_WRITERS
+    queue: asyncio.Queue[tuple[int, Partner] | None] = asyncio.Queue(
+        maxsize=writers * 4
+    )
+    results: dict[int, PartnerImportLineResult] = {}
+
+    async def write() -> None:
+        pending: list[tuple[int, dict[str, Any]]] = []
+        while (entry := await queue.get()) is not None:
+            line, partner = entry
+            for item in partner_items(partner):
+                pending.append((line, item))
+                if len(pending) == BATCH_SIZE:
+                    await write_batch(dynamodb_service_resource, pending, results)
+                    pending = []
+        if pending:
+            await write_batch(dynamodb_service_resource, pending, results)
+
+    writer_tasks = [asyncio.create_task(write()) for _ in range(writers)]
+    try:
+        line = 0
+        async for raw_line in iter_lines(chunks):
+            line += 1
+            if not raw_line.strip():
+                continue
+            try:
+                partner = to_model(PartnerCreate.model_validate_json(raw_line))
+            except ValidationError as e:
+                results[line] = PartnerImportLineResult(
+                    line=line, error=format_validation_error(e)
+                )
+                continue
+
+            results[line] = PartnerImportLineResult(line=line, id=partner.id)
+            await put_entry(queue, (line, partner), writer_tasks)
+
+        for _ in writer_tasks:
+            await put_entry(queue, None, writer_tasks)
+        await asyncio.gather(*writer_tasks)
+    finally:
+        for task in writer_tasks:
+            task.cancel()
+
+    ordered_results = [results[line] for line in sorted(results)]
+    failed = sum(1 for result in ordered_results if result.error)
+    return PartnerImportReport(
+        imported=len(ordered_results) - failed,
+        failed=failed,
+        results=ordered_results,
+    )
+
+
+async def put_entry(
+    queue: asyncio.Queue[EntryT],
+    entry: EntryT,
+    writer_tasks: list[asyncio.Task[None]],
+) -> None:
+    """
+    Puts `entry` on the writers' queue, raising the error of a writer that
+    failed instead. Writers only stop early by failing, so without this a
+    full queue would wait for them forever.
+    """
+    raise_writer_error(writer_tasks)
+    if not queue.full():
+        queue.put_nowait(entry)
+        return
+
+    put_task = asyncio.ensure_future(queue.put(entry))
+    try:
+        while not put_task.done():
+            running = [task for task in writer_tasks if not task.done()]
+            await asyncio.wait(
+                [put_task, *running], return_when=asyncio.FIRST_COMPLETED
+            )
+            raise_writer_error(writer_tasks)
+    finally:
+        put_task.cancel()
+
+
+def raise_writer_error(writer_tasks: list[asyncio.Task[None]]) -> None:
+    for task in writer_tasks:
+        if task.done() and not task.cancelled():
+            error = task.exception()
+            if error:
+                raise error
+
+
+async def write_batch(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    batch: list[tuple[int, dict[str, Any]]],
+    results: dict[int, PartnerImportLineResult],
+) -> None:
+    """
+    Writes up to 25 items with one BatchWriteItem call, retrying
+    `UnprocessedItems` with capped, jittered exponential backoff. Lines whose
+    items could not be written are marked as failed in `results`.
+    """
+    table_name = settings.DYNAMODB_TABLE_NAME
+    lines = {(item["pk"], item["sk"]): line for line, item in batch}
+    requests: Sequence[WriteRequestUnionTypeDef] = [
+        {"PutRequest": {"Item": item}} for _, item in batch
+    ]
+    error = "Unprocessed after retries"
+
+    for attempt in range(settings.PARTNER_IMPORT_MAX_ATTEMPTS):
+        if attempt:
+            delay = min(
+                settings.PARTNER_IMPORT_MAX_BACKOFF_SECONDS,
+                settings.PARTNER_IMPORT_BASE_BACKOFF_SECONDS * 2**attempt,
+            )
+            await asyncio.sleep(random.uniform(0, delay))
+
+        try:
+            response = await dynamodb_service_resource.meta.client.batch_write_item(
+                RequestItems={table_name: requests}
+            )
+        except ClientError as e:
+            error = e.response["Error"].get("Message") or str(e)
+            break
+
+        requests = response.get("UnprocessedItems", {}).get(table_name, [])
+        if not requests:
+            return
+
+    for request in requests:
+        item = request["PutRequest"]["Item"]
+        line = lines[(item["pk"], item["sk"])]
+        results[line] = PartnerImportLineResult(
+            line=line, id=results[line].id, error=error
+        )
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Splits a byte stream into lines without buffering more than one line."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in e['loc']) or 'line'}: {e['msg']}"
+        for e in error.errors()
+    )
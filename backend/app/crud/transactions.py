@@ -0,0 +1,125 @@
+import asyncio
+import random
+import uuid
+from collections.abc import Sequence
+from typing import Any
+
+from botocore.exceptions import ClientError
+from types_aiobotocore_dynamodb import DynamoDBServiceResource
+from types_aiobotocore_dynamodb.type_defs import TransactWriteItemTypeDef
+
+from app.core.config import settings
+
+# TransactWriteItems accepts at most 100 actions per call.
+TRANSACTION_SIZE = 100
+# Cancellation reasons worth retrying with the same idempotency token.
+RETRYABLE_REASONS = {"TransactionConflict", "ThrottlingError"}
+
+
+async def transact_put_items(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    items: Sequence[dict[str, Any]],
+    token_namespace: str,
+) -> None:
+    """
+    Puts new `items` with TransactWriteItems, failing if any of them exists.
+
+    Up to 100 items are written all-or-nothing. Longer sequences are split
+    into transactions of 100 written in order, so callers put the item that
+    makes the rest visible last. If a later transaction fails, or the call
+    is interrupted in any other way, the items already written are deleted
+    again before the error is re-raised.
+
+    Every transaction carries a ClientRequestToken derived from
+    `token_namespace` and its position, so retrying it after a conflict or
+    an unknown outcome cannot apply it twice.
+    """
+    chunks = [
+        items[start : start + TRANSACTION_SIZE]
+        for start in range(0, len(items), TRANSACTION_SIZE)
+    ]
+    for index, chunk in enumerate(chunks):
+        token = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{token_namespace}/{index}"))
+        try:
+            await transact_put_chunk(dynamodb_service_resource, chunk, token)
+        except BaseException as e:
+            # A cancelled transaction wrote nothing, but after a timeout or a
+            # cancellation of the call the chunk may still have been applied.
+            written = (
+                chunks[:index] if isinstance(e, ClientError) else chunks[: index + 1]
+            )
+            await delete_items(
+                dynamodb_service_resource,
+                [item for chunk in written for item in chunk],
+            )
+            raise
+
+
+async def transact_put_chunk(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    items: Sequence[dict[str, Any]],
+    token: str,
+) -> None:
+    table_name = settings.DYNAMODB_TABLE_NAME
+    transact_items: list[TransactWriteItemTypeDef] = [
+        {
+            "Put": {
+                "TableName": table_name,
+                "Item": item,
+                "ConditionExpression": "attribute_not_exists(pk)",
+            }
+        }
+        for item in items
+    ]
+    for attempt in range(settings.DYNAMODB_TRANSACTION_MAX_ATTEMPTS):
+        if attempt:
+            await backoff(attempt)
+
+        try:
+            await dynamodb_service_resource.meta.client.transact_write_items(
+                TransactItems=transact_items, ClientRequestToken=token
+            )
+            return
+        except ClientError as e:
+            last_attempt = attempt + 1 == settings.DYNAMODB_TRANSACTION_MAX_ATTEMPTS
+            if last_attempt or not is_retryable(e):
+                raise
+
+
+async def backoff(attempt: int) -> None:
+    """Sleeps before retry `attempt` of a transaction, with full jitter."""
+    delay = settings.DYNAMODB_TRANSACTION_BACKOFF_SECONDS * 2**attempt
+    await asyncio.sleep(random.uniform(0, delay))
+
+
+def is_retryable(error: ClientError) -> bool:
+    code = error.response["Error"]["Code"]
+    if code == "TransactionInProgressException":
+        return True
+    return bool(
+        {reason.get("Code") for reason in cancellation_reasons(error)}
+        & RETRYABLE_REASONS
+    )
+
+
+def cancellation_reasons(error: ClientError) -> list[dict[str, Any]]:
+    """
+    Returns the per-action reasons of a cancelled transaction, in the order
+    of its actions, or an empty list for any other error.
+    """
+    if error.response["Error"]["Code"] != "TransactionCanceledException":
+        return []
+    return error.response.get("CancellationReasons", [])  # type: ignore[return-value]
+
+
+async def delete_items(
+    dynamodb_service_resource: DynamoDBServiceResource,
+    items: Sequence[dict[str, Any]],
+) -> None:
+    if not items:
+        return
+
+    dynamodb_table = await dynamodb_service_resource.Table(settings.DYNAMODB_TABLE_NAME)
+    async with dynamodb_table.batch_writer() as batch_writer:
+        for item in items:
+            await batch_writer.delete_item(Key={"pk": item["pk"], "sk": item["sk"]})
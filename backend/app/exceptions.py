@@ -29,3 +29,21 @@ class NotFoundException(AppException):
             },
             headers,
         )
+
+
+class ConflictException(AppException):
+    def __init__(
+        self,
+        entity: str = "Entity",
+        id: str = "not specified",
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        MSG_TEMPLATE = "{entity} with id {id} was modified by another request."
+        super().__init__(
+            status.HTTP_409_CONFLICT,
+            {
+                "message": MSG_TEMPLATE.format(entity=entity, id=id),
+                "status_code": status.HTTP_409_CONFLICT,
+            },
+            headers,
+        )
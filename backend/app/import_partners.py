@@ -0,0 +1,52 @@
+import argparse
+import asyncio
+import logging
+import sys
+from collections.abc import AsyncIterator
+from typing import BinaryIO
+
+from app.core.config import settings
+from app.core.dynamodb import dynamodb_pool
+from app.crud.partner_import import import_partners
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def read_lines(file: BinaryIO) -> AsyncIterator[bytes]:
+    for line in file:
+        yield line
+
+
+async def run(file: BinaryIO, writers: int) -> int:
+    resource = await dynamodb_pool.open()
+    try:
+        report = await import_partners(resource, read_lines(file), writers)
+    finally:
+        await dynamodb_pool.close()
+
+    for result in report.results:
+        if result.error:
+            print(result.model_dump_json())
+    logger.info(f"Imported {report.imported} partners, {report.failed} failed")
+    return 1 if report.failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Import partners from an NDJSON file, one PartnerCreate per line."
+    )
+    parser.add_argument("path", help="NDJSON file to import, or - for stdin")
+    parser.add_argument("--writers", type=int, default=settings.PARTNER_IMPORT_WRITERS)
+    args = parser.parse_args()
+
+    logger.info("Importing partners")
+    if args.path == "-":
+        sys.exit(asyncio.run(run(sys.stdin.buffer, args.writers)))
+
+    with open(args.path, "rb") as file:
+        sys.exit(asyncio.run(run(file, args.writers)))
+
+
+if __name__ == "__main__":
+    main()
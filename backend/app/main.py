@@ -1,10 +1,16 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 import sentry_sdk
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.routing import APIRoute
+from starlette.middleware.base import RequestResponseEndpoint
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.core.config import settings
+from app.core.dynamodb import dynamodb_pool
+from app.core.dynamodb_metrics import CapacityStats, request_capacity, route_capacity
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -14,12 +20,48 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    await dynamodb_pool.open()
+    try:
+        yield
+    finally:
+        await dynamodb_pool.close()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
+
+@app.middleware("http")
+async def record_dynamodb_capacity(
+    request: Request, call_next: RequestResponseEndpoint
+) -> Response:
+    """
+    Collects the DynamoDB usage of each request and adds it to the totals of
+    the matched route. With `DYNAMODB_SERVER_TIMING` it is also reported in a
+    `Server-Timing` header.
+    """
+    stats = CapacityStats()
+    token = request_capacity.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        request_capacity.reset(token)
+
+    if settings.DYNAMODB_SERVER_TIMING and stats.calls:
+        response.headers.append("Server-Timing", stats.server_timing())
+    route = request.scope.get("route")
+    if isinstance(route, APIRoute):
+        route_capacity.record(f"{request.method} {route.path}", stats)
+    return response
+
+
 # Set all CORS enabled origins
 if settings.all_cors_origins:
     app.add_middleware(
@@ -1,9 +1,14 @@
+import re
 from abc import ABC, abstractmethod
+from collections.abc import Iterable
 from dataclasses import dataclass
-from typing import Any, ClassVar, TypeVar
+from functools import cache
+from typing import Any, ClassVar, cast
 
 from fastapi.types import IncEx
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import SchemaSerializer
+from typing_extensions import Self
 from ulid import ULID
 
 from app.utils import now_iso_format
@@ -15,11 +20,28 @@ class GSI:
     value: str
 
 
+@dataclass(frozen=True)
+class GlobalSecondaryIndex:
+    name: str
+    partition_key: str
+    sort_key: str
+    # "ALL", "KEYS_ONLY", or "INCLUDE" together with `non_key_attributes`.
+    projection_type: str = "ALL"
+    non_key_attributes: tuple[str, ...] = ()
+
+
 @dataclass
 class UpdateExpression:
     update_expression: str
     expression_attribute_names: dict[str, str]
-    expression_attribute_values: dict[str, str]
+    expression_attribute_values: dict[str, Any]
+
+    def increment_version(self) -> None:
+        self.update_expression += (
+            ", #version = if_not_exists(#version, :version_one) + :version_one"
+        )
+        self.expression_attribute_names["#version"] = "version"
+        self.expression_attribute_values[":version_one"] = 1
 
     def update_gsis(self, gsis: list[GSI]) -> None:
         for index, gsi in enumerate(gsis):
@@ -33,8 +55,13 @@ class UpdateExpression:
 class BaseItem(BaseModel, ABC):
     """Base item model for all items/rows in the table."""
 
+    # Incremented by every write, for optimistic concurrency. Items written
+    # before versioning have no attribute and read as version 1.
+    version: int = 1
+
     parent_entity: ClassVar[str] = ""
     entity_type: ClassVar[str] = ""
+    global_secondary_indexes: ClassVar[tuple[GlobalSecondaryIndex, ...]] = ()
 
     @property
     @abstractmethod
@@ -51,37 +78,67 @@ class BaseItem(BaseModel, ABC):
     @abstractmethod
     def to_dynamodb_item(self, exclude: IncEx | None = None) -> dict[str, Any]:
         """Converts model to a DynamoDb compatible dict."""
-        return {
-            "pk": self.pk,
-            "sk": self.sk,
-            "item_type": self.entity_type,
-            **self.model_dump(exclude=exclude),
-        }
+        codec = item_codec(type(self))
+        item = codec.dump(self, exclude=exclude)
+        item["pk"] = self.pk
+        item["sk"] = self.sk
+        item["item_type"] = self.entity_type
+        if codec.has_index_attributes:
+            item.update(self.index_attributes())
+        return item
+
+    def index_attributes(self) -> dict[str, Any]:
+        """Returns the attributes written only for the table's indexes."""
+        return {}
 
     @classmethod
     @abstractmethod
-    def from_dynamodb_item(cls, item: dict[str, Any]) -> "BaseItem":
-        """Converts Dynamodb item to app class model."""
-        return cls.model_validate(item)
+    def from_dynamodb_item(cls, item: dict[str, Any]) -> Self:
+        """
+        Converts Dynamodb item to app class model.
+
+        Calls the class's compiled pydantic-core validator directly, skipping
+        the Python-level work `model_validate` does around it.
+        """
+        return cast(Self, cls.__pydantic_validator__.validate_python(item))
+
+    @classmethod
+    def from_dynamodb_items(cls, items: Iterable[dict[str, Any]]) -> list[Self]:
+        """Converts many Dynamodb items of this class in one validator call."""
+        return list_adapter(cls).validate_python(items)
+
+    @classmethod
+    def model_validate_partial(cls, values: dict[str, Any], **keys: Any) -> Self:
+        """
+        Builds an item from the key attributes in `keys` and validates only the
+        fields present in `values`, for partial updates.
+        """
+        item = cls.model_construct(**keys)
+        for field, value in values.items():
+            cls.__pydantic_validator__.validate_assignment(item, field, value)
+        return item
+
+    def updated_gsis(self, fields: set[str]) -> list[GSI]:
+        """Returns the GSI attributes derived from any of `fields`."""
+        return []
 
     @abstractmethod
-    def to_update_expression(self) -> UpdateExpression:
+    def to_update_expression(self, include: IncEx | None = None) -> UpdateExpression:
         """Returns update expression for updating the item in DynamoDb."""
         update_expression: list[str] = []
         expression_attribute_names: dict[str, str] = {}
-        expression_attribute_values: dict[str, str] = {}
+        expression_attribute_values: dict[str, Any] = {}
 
-        for key, value in self.model_dump().items():
-            attribute_name = f"#{key}"
+        codec = item_codec(type(self))
+        for key, value in codec.dump(self, include=include).items():
+            set_clause, attribute_name, value_name = codec.update_fragments[key]
+            update_expression.append(set_clause)
+            expression_attribute_names[attribute_name] = key
             if key == "updatedAt":
-                update_expression.append(f"{attribute_name} = :{key}")
-                expression_attribute_names[attribute_name] = key
-                expression_attribute_values[f":{key}"] = now_iso_format()
+                expression_attribute_values[value_name] = now_iso_format()
                 continue
 
-            update_expression.append(f"{attribute_name} = :{key}")
-            expression_attribute_names[attribute_name] = key
-            expression_attribute_values[f":{key}"] = value
+            expression_attribute_values[value_name] = value
 
         return UpdateExpression(
             update_expression="SET " + ", ".join(update_expression),
@@ -90,9 +147,58 @@ class BaseItem(BaseModel, ABC):
         )
 
 
+@dataclass(frozen=True)
+class ItemCodec:
+    """
+    What serializing one `BaseItem` subclass needs, worked out once: its
+    compiled pydantic-core serializer, whether it writes index attributes
+    and, per field, the `#field = :field` clause with its placeholders.
+    """
+
+    serializer: SchemaSerializer
+    has_index_attributes: bool
+    update_fragments: dict[str, tuple[str, str, str]]
+
+    def dump(
+        self,
+        item: BaseItem,
+        include: IncEx | None = None,
+        exclude: IncEx | None = None,
+    ) -> dict[str, Any]:
+        """`item.model_dump()` without its per-call Python overhead."""
+        return cast(
+            dict[str, Any],
+            self.serializer.to_python(item, include=include, exclude=exclude),
+        )
+
+
+@cache
+def item_codec(item_class: type[BaseItem]) -> ItemCodec:
+    return ItemCodec(
+        serializer=item_class.__pydantic_serializer__,
+        has_index_attributes=(
+            item_class.index_attributes is not BaseItem.index_attributes
+        ),
+        update_fragments={
+            field: (f"#{field} = :{field}", f"#{field}", f":{field}")
+            for field in item_class.model_fields
+        },
+    )
+
+
+@cache
+def list_adapter(item_class: type[BaseItem]) -> TypeAdapter[list[Any]]:
+    return TypeAdapter(list[item_class])  # type: ignore[valid-type]
+
+
 def get_id() -> ULID:
     return str(ULID())
 
 
 def normalize_string(value: str) -> str:
     return value.strip().upper()
+
+
+def tokenize(value: str) -> set[str]:
+    """Splits `value` into its distinct normalized words."""
+    return set(re.findall(r"\w+", normalize_string(value)))
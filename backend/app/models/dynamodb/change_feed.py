@@ -0,0 +1,38 @@
+from typing import Any, ClassVar
+
+from fastapi.types import IncEx
+from typing_extensions import Self
+
+from app.models.dynamodb.base import BaseItem, UpdateExpression
+
+
+class ChangeFeedCheckpoint(BaseItem):
+    """
+    Last stream record of one shard that a change feed has handled (see
+    `app.core.change_feed`). The checkpoints of a feed share a partition.
+    """
+
+    feed: str
+    shard_id: str
+    sequence_number: str
+
+    parent_entity: ClassVar[str] = "CHANGE_FEED"
+    entity_type: ClassVar[str] = "CHECKPOINT"
+
+    @property
+    def pk(self) -> str:
+        return f"{self.parent_entity}#{self.feed}"
+
+    @property
+    def sk(self) -> str:
+        return f"SHARD#{self.shard_id}"
+
+    def to_dynamodb_item(self, exclude: IncEx | None = None) -> dict[str, Any]:
+        return super().to_dynamodb_item(exclude)
+
+    def to_update_expression(self, include: IncEx | None = None) -> UpdateExpression:
+        return super().to_update_expression(include)
+
+    @classmethod
+    def from_dynamodb_item(cls, item: dict[str, Any]) -> Self:
+        return super().from_dynamodb_item(item)
@@ -1,19 +1,48 @@
 from abc import ABC
 from decimal import Decimal
 from enum import Enum
-from typing import Any, ClassVar, Literal
+from typing import Annotated, Any, ClassVar, Literal
 
 from fastapi.types import IncEx
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PlainSerializer
+from typing_extensions import Self
 from ulid import ULID
 
+from app.core.availability import weekly_slots
+from app.core.config import settings
+from app.core.geo import encode_geohash
 from app.models.dynamodb.base import (
+    GSI,
     BaseItem,
+    GlobalSecondaryIndex,
     UpdateExpression,
     get_id,
     normalize_string,
+    tokenize,
 )
 
+# Partners are write-sharded over `PARTNER_NAME_INDEX_SHARDS` partitions of
+# the name index, so listings are not limited by a single hot partition.
+PARTNER_NAME_INDEX = GlobalSecondaryIndex(
+    name="gsi_name_pk-gsi_sk-index", partition_key="gsi_name_pk", sort_key="gsi_sk"
+)
+PARTNER_GEO_INDEX = GlobalSecondaryIndex(
+    name="gsi_geo_pk-gsi_geo_sk-index",
+    partition_key="gsi_geo_pk",
+    sort_key="gsi_geo_sk",
+)
+# Partitions of the geo index are geohash cells of this precision (about
+# 20 x 20 km at mid latitudes); the sort key holds a precise geohash so finer
+# cells are read with begins_with.
+GEO_INDEX_PARTITION_PRECISION = 4
+GEO_INDEX_SORT_PRECISION = 9
+
+# Coordinates are stored as Decimal, which DynamoDB requires, but are
+# rendered as JSON numbers like in the public schemas.
+Coordinate = Annotated[
+    Decimal, PlainSerializer(float, return_type=float, when_used="json")
+]
+
 DaysInWeek = Literal[
     "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"
 ]
@@ -35,8 +64,8 @@ class CurrencyEnum(str, Enum):
 
 class Location(BaseModel):
     address: str
-    lat: Decimal
-    lon: Decimal
+    lat: Coordinate
+    lon: Coordinate
 
 
 class Address(BaseModel):
@@ -50,21 +79,21 @@ class PartnerChild(BaseItem, ABC):
     partner_id: str
 
     parent_entity: ClassVar[str] = "PARTNER"
+    # Partner attribute counting the children of this class.
+    count_attribute: ClassVar[str]
 
     @property
     def pk(self) -> str:
         return f"{self.parent_entity}#{self.partner_id}"
 
     def to_dynamodb_item(self, exclude: IncEx | None = None) -> dict[str, Any]:
-        item = super().to_dynamodb_item(exclude=exclude)
-        item.update({"id": str(self.id), "partner_id": str(self.partner_id)})
-        return item
+        return super().to_dynamodb_item(exclude=exclude)
 
-    def to_update_expression(self) -> UpdateExpression:
-        return super().to_update_expression()
+    def to_update_expression(self, include: IncEx | None = None) -> UpdateExpression:
+        return super().to_update_expression(include)
 
     @classmethod
-    def from_dynamodb_item(cls, item: dict[str, Any]) -> BaseItem:
+    def from_dynamodb_item(cls, item: dict[str, Any]) -> Self:
         return super().from_dynamodb_item(item)
 
 
@@ -74,6 +103,7 @@ class Service(PartnerChild):
     currency: CurrencyEnum
 
     entity_type: ClassVar[str] = "SERVICE"
+    count_attribute: ClassVar[str] = "service_count"
 
     @property
     def sk(self) -> str:
@@ -85,6 +115,7 @@ class Staffer(PartnerChild):
     last_name: str = Field(max_length=50)
 
     entity_type: ClassVar[str] = "STAFFER"
+    count_attribute: ClassVar[str] = "staff_count"
 
     @property
     def sk(self) -> str:
@@ -101,8 +132,19 @@ class Partner(BaseItem):
     services: list[Service] = Field(default_factory=lambda: [])
     staff: list[Staffer] = Field(default_factory=lambda: [])
 
+    # Summaries of the children, kept on the partner row by every write to
+    # them so listings do not need to read the children.
+    service_count: int = 0
+    staff_count: int = 0
+    min_price: Decimal | None = None
+    max_price: Decimal | None = None
+
     parent_entity: ClassVar[str] = "PARTNER"
     entity_type: ClassVar[str] = "PARTNER"
+    global_secondary_indexes: ClassVar[tuple[GlobalSecondaryIndex, ...]] = (
+        PARTNER_NAME_INDEX,
+        PARTNER_GEO_INDEX,
+    )
 
     @property
     def pk(self) -> str:
@@ -116,19 +158,161 @@ class Partner(BaseItem):
     def gsi_sk(self) -> str:
         return f"{self.entity_type}#{normalize_string(self.name)}"
 
-    def to_dynamodb_item(self, exclude: IncEx | None = None) -> dict[str, Any]:
-        item = super().to_dynamodb_item(exclude)
-        item.update(
-            {
-                "id": str(self.id),
-                "gsi_sk": self.gsi_sk,
-            }
+    @property
+    def name_index_shard(self) -> int:
+        """Shard of the name index, from the random bits of the partner's ULID."""
+        random_bits = int.from_bytes(ULID.from_str(self.id).bytes[-4:], "big")
+        return random_bits % settings.PARTNER_NAME_INDEX_SHARDS
+
+    @classmethod
+    def name_index_partition(cls, shard: int) -> str:
+        return f"{cls.entity_type}#{shard}"
+
+    def update_aggregates(self) -> None:
+        """Recomputes the child summaries from `services` and `staff`."""
+        prices = [service.price for service in self.services]
+        self.service_count = len(self.services)
+        self.staff_count = len(self.staff)
+        self.min_price = min(prices, default=None)
+        self.max_price = max(prices, default=None)
+
+    @property
+    def open_slots(self) -> set[int]:
+        """Weekly slots in which the partner is open; none while inactive."""
+        if not self.is_active:
+            return set()
+        return weekly_slots(
+            [
+                (working_day.day, shift.start, shift.end)
+                for working_day in self.working_hours
+                for shift in working_day.shifts
+            ]
+        )
+
+    def open_slot_items(self, slots: set[int] | None = None) -> list["PartnerOpenSlot"]:
+        return [
+            PartnerOpenSlot(slot=slot, partner_id=self.id, name=self.name)
+            for slot in sorted(self.open_slots if slots is None else slots)
+        ]
+
+    @property
+    def name_tokens(self) -> set[str]:
+        return tokenize(self.name)
+
+    def name_token_items(
+        self, tokens: set[str] | None = None
+    ) -> list["PartnerNameToken"]:
+        return [
+            PartnerNameToken(token=token, partner_id=self.id, name=self.name)
+            for token in sorted(self.name_tokens if tokens is None else tokens)
+        ]
+
+    @property
+    def geohash(self) -> str:
+        location = self.address.location
+        return encode_geohash(
+            float(location.lat), float(location.lon), GEO_INDEX_SORT_PRECISION
         )
-        return item
 
-    def to_update_expression(self) -> UpdateExpression:
-        return super().to_update_expression()
+    def geo_index_keys(self) -> tuple[str, str]:
+        """Returns `(gsi_geo_pk, gsi_geo_sk)`, encoding the geohash once."""
+        geohash = self.geohash
+        return f"GEO#{geohash[:GEO_INDEX_PARTITION_PRECISION]}", geohash
+
+    def to_dynamodb_item(self, exclude: IncEx | None = None) -> dict[str, Any]:
+        return super().to_dynamodb_item(exclude)
+
+    def index_attributes(self) -> dict[str, Any]:
+        gsi_geo_pk, gsi_geo_sk = self.geo_index_keys()
+        return {
+            "gsi_name_pk": self.name_index_partition(self.name_index_shard),
+            "gsi_sk": self.gsi_sk,
+            "gsi_geo_pk": gsi_geo_pk,
+            "gsi_geo_sk": gsi_geo_sk,
+        }
+
+    def updated_gsis(self, fields: set[str]) -> list[GSI]:
+        gsis: list[GSI] = []
+        if "name" in fields:
+            gsis.append(GSI(column_name="gsi_sk", value=self.gsi_sk))
+        if "address" in fields:
+            gsi_geo_pk, gsi_geo_sk = self.geo_index_keys()
+            gsis.append(GSI(column_name="gsi_geo_pk", value=gsi_geo_pk))
+            gsis.append(GSI(column_name="gsi_geo_sk", value=gsi_geo_sk))
+        return gsis
+
+    def to_update_expression(self, include: IncEx | None = None) -> UpdateExpression:
+        return super().to_update_expression(include)
+
+    @classmethod
+    def from_dynamodb_item(cls, item: dict[str, Any]) -> Self:
+        return super().from_dynamodb_item(item)
+
+
+class PartnerOpenSlot(BaseItem):
+    """
+    Marks a partner as open during one weekly slot (see
+    `app.core.availability`). The items of a slot share a partition, so the
+    partners open at a given time are read with a single query. They carry
+    the partner's name, so the query alone answers it, and renaming a
+    partner rewrites them.
+    """
+
+    slot: int
+    partner_id: str
+    name: str
+
+    parent_entity: ClassVar[str] = "OPEN"
+    entity_type: ClassVar[str] = "OPEN_SLOT"
+
+    @property
+    def pk(self) -> str:
+        return f"{self.parent_entity}#{self.slot:03d}"
+
+    @property
+    def sk(self) -> str:
+        return f"{Partner.entity_type}#{self.partner_id}"
+
+    def to_dynamodb_item(self, exclude: IncEx | None = None) -> dict[str, Any]:
+        return super().to_dynamodb_item(exclude)
+
+    def to_update_expression(self, include: IncEx | None = None) -> UpdateExpression:
+        return super().to_update_expression(include)
+
+    @classmethod
+    def from_dynamodb_item(cls, item: dict[str, Any]) -> Self:
+        return super().from_dynamodb_item(item)
+
+
+class PartnerNameToken(BaseItem):
+    """
+    Posting of one normalized word of a partner's name. The items of a token
+    share a partition and are sorted by the partner's normalized name, so the
+    partners whose name contains a word are read in name order, one page at a
+    time. Renaming a partner moves all of its postings.
+    """
+
+    token: str
+    partner_id: str
+    name: str
+
+    parent_entity: ClassVar[str] = "TOKEN"
+    entity_type: ClassVar[str] = "NAME_TOKEN"
+
+    @property
+    def pk(self) -> str:
+        return f"{self.parent_entity}#{self.token}"
+
+    @property
+    def sk(self) -> str:
+        return f"{normalize_string(self.name)}#{self.partner_id}"
+
+    def to_dynamodb_item(self, exclude: IncEx | None = None) -> dict[str, Any]:
+        return super().to_dynamodb_item(exclude)
+
+    def to_update_expression(self, include: IncEx | None = None) -> UpdateExpression:
+        return super().to_update_expression(include)
 
     @classmethod
-    def from_dynamodb_item(cls, item: dict[str, Any]) -> BaseItem:
+    def from_dynamodb_item(cls, item: dict[str, Any]) -> Self:
         return super().from_dynamodb_item(item)
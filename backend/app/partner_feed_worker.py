@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from typing import Any
+
+from app.core.change_feed import StreamPoller, TableCheckpoints
+from app.core.config import settings
+from app.core.dynamodb import create_session, create_streams_client, dynamodb_pool
+from app.crud.partner_feed import partner_feed
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def poll() -> None:
+    """
+    Consumes the table's stream until interrupted, in place of the Lambda
+    function, which DynamoDB Local cannot trigger.
+    """
+    dynamodb_service_resource = await dynamodb_pool.open()
+    try:
+        async with create_streams_client(create_session()) as streams_client:
+            dynamodb_table = await dynamodb_service_resource.Table(
+                settings.DYNAMODB_TABLE_NAME
+            )
+            poller = StreamPoller(
+                partner_feed,
+                dynamodb_service_resource.meta.client,
+                streams_client,
+                settings.DYNAMODB_TABLE_NAME,
+                TableCheckpoints(dynamodb_table, partner_feed.name),
+                batch_size=settings.CHANGE_FEED_BATCH_SIZE,
+                poll_seconds=settings.CHANGE_FEED_POLL_SECONDS,
+            )
+            await poller.run()
+    finally:
+        await dynamodb_pool.close()
+
+
+async def handle_stream_event(event: dict[str, Any]) -> None:
+    await dynamodb_pool.open()
+    try:
+        await partner_feed.dispatch(event["Records"])
+    finally:
+        await dynamodb_pool.close()
+
+
+def lambda_handler(event: dict[str, Any], _context: Any) -> None:
+    """
+    Entry point of a Lambda function with the table's stream as event source.
+    A raised error makes Lambda retry the whole batch, before any later
+    record of the shard.
+    """
+    asyncio.run(handle_stream_event(event))
+
+
+def main() -> None:
+    logger.info(f"Starting change feed {partner_feed.name}")
+    asyncio.run(poll())
+
+
+if __name__ == "__main__":
+    main()
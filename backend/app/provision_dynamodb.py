@@ -0,0 +1,348 @@
+import argparse
+import asyncio
+import logging
+import sys
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from botocore.exceptions import BotoCoreError, ClientError
+from tenacity import (
+    after_log,
+    before_log,
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_fixed,
+)
+from types_aiobotocore_dynamodb import DynamoDBClient
+
+# Imported for its BaseItem subclasses, which declare the table's indexes.
+import app.models.dynamodb.partners  # noqa: F401
+from app.core.config import settings
+from app.core.dynamodb import dynamodb_pool
+from app.models.dynamodb.base import BaseItem, GlobalSecondaryIndex
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+max_tries = 60  # 1 minute
+wait_seconds = 1
+poll_seconds = 2
+
+PARTITION_KEY = "pk"
+SORT_KEY = "sk"
+# Every key attribute of the single-table design is a string.
+KEY_ATTRIBUTE_TYPE = "S"
+# The change feed handlers compare the images before and after each write.
+STREAM_VIEW_TYPE = "NEW_AND_OLD_IMAGES"
+
+
+@dataclass
+class TablePlan:
+    """What has to change for a described table to match the declared one."""
+
+    create_indexes: list[GlobalSecondaryIndex] = field(default_factory=list)
+    # Declared with another key schema or projection; recreated with --prune.
+    changed_indexes: list[str] = field(default_factory=list)
+    # Not declared by any item class; deleted with --prune.
+    undeclared_indexes: list[str] = field(default_factory=list)
+    update_billing_mode: bool = False
+    update_stream: bool = False
+
+    def is_empty(self) -> bool:
+        return not (
+            self.create_indexes
+            or self.changed_indexes
+            or self.undeclared_indexes
+            or self.update_billing_mode
+            or self.update_stream
+        )
+
+
+def item_classes() -> list[type[BaseItem]]:
+    classes: list[type[BaseItem]] = []
+    pending: list[type[BaseItem]] = BaseItem.__subclasses__()
+    while pending:
+        item_class = pending.pop()
+        classes.append(item_class)
+        pending.extend(item_class.__subclasses__())
+    return classes
+
+
+def declared_indexes(
+    classes: Iterable[type[BaseItem]],
+) -> dict[str, GlobalSecondaryIndex]:
+    """Collects the GSIs of all item classes, which must agree on each name."""
+    indexes: dict[str, GlobalSecondaryIndex] = {}
+    for item_class in classes:
+        for index in item_class.global_secondary_indexes:
+            if indexes.setdefault(index.name, index) != index:
+                raise ValueError(f"Conflicting definitions of index {index.name}")
+    return dict(sorted(indexes.items()))
+
+
+def stream_specification() -> dict[str, Any]:
+    if not settings.DYNAMODB_STREAM_ENABLED:
+        return {"StreamEnabled": False}
+    return {"StreamEnabled": True, "StreamViewType": STREAM_VIEW_TYPE}
+
+
+def provisioned_throughput() -> dict[str, int]:
+    return {
+        "ReadCapacityUnits": settings.DYNAMODB_READ_CAPACITY_UNITS,
+        "WriteCapacityUnits": settings.DYNAMODB_WRITE_CAPACITY_UNITS,
+    }
+
+
+def key_schema(partition_key: str, sort_key: str) -> list[dict[str, str]]:
+    return [
+        {"AttributeName": partition_key, "KeyType": "HASH"},
+        {"AttributeName": sort_key, "KeyType": "RANGE"},
+    ]
+
+
+def projection(index: GlobalSecondaryIndex) -> dict[str, Any]:
+    result: dict[str, Any] = {"ProjectionType": index.projection_type}
+    if index.non_key_attributes:
+        result["NonKeyAttributes"] = sorted(index.non_key_attributes)
+    return result
+
+
+def index_definition(index: GlobalSecondaryIndex) -> dict[str, Any]:
+    definition: dict[str, Any] = {
+        "IndexName": index.name,
+        "KeySchema": key_schema(index.partition_key, index.sort_key),
+        "Projection": projection(index),
+    }
+    if settings.DYNAMODB_BILLING_MODE == "PROVISIONED":
+        definition["ProvisionedThroughput"] = provisioned_throughput()
+    return definition
+
+
+def attribute_definitions(
+    indexes: Iterable[GlobalSecondaryIndex],
+) -> list[dict[str, str]]:
+    names = {PARTITION_KEY, SORT_KEY}
+    for index in indexes:
+        names |= {index.partition_key, index.sort_key}
+    return [
+        {"AttributeName": name, "AttributeType": KEY_ATTRIBUTE_TYPE}
+        for name in sorted(names)
+    ]
+
+
+def table_definition(indexes: dict[str, GlobalSecondaryIndex]) -> dict[str, Any]:
+    """CreateTable parameters of the table with all of `indexes`."""
+    definition: dict[str, Any] = {
+        "TableName": settings.DYNAMODB_TABLE_NAME,
+        "AttributeDefinitions": attribute_definitions(indexes.values()),
+        "KeySchema": key_schema(PARTITION_KEY, SORT_KEY),
+        "BillingMode": settings.DYNAMODB_BILLING_MODE,
+    }
+    if indexes:
+        definition["GlobalSecondaryIndexes"] = [
+            index_definition(index) for index in indexes.values()
+        ]
+    if settings.DYNAMODB_BILLING_MODE == "PROVISIONED":
+        definition["ProvisionedThroughput"] = provisioned_throughput()
+    if settings.DYNAMODB_STREAM_ENABLED:
+        definition["StreamSpecification"] = stream_specification()
+    return definition
+
+
+def index_shape(definition: dict[str, Any]) -> tuple[Any, ...]:
+    """The parts of an index definition that cannot change in place."""
+    return (
+        tuple(
+            (key["AttributeName"], key["KeyType"]) for key in definition["KeySchema"]
+        ),
+        definition["Projection"]["ProjectionType"],
+        tuple(sorted(definition["Projection"].get("NonKeyAttributes", []))),
+    )
+
+
+def plan_changes(
+    description: dict[str, Any], indexes: dict[str, GlobalSecondaryIndex]
+) -> TablePlan:
+    """Compares a DescribeTable `Table` with the declared `indexes`."""
+    plan = TablePlan()
+    existing = {
+        index["IndexName"]: index
+        for index in description.get("GlobalSecondaryIndexes", [])
+    }
+    for name, index in indexes.items():
+        if name not in existing:
+            plan.create_indexes.append(index)
+        elif index_shape(existing[name]) != index_shape(index_definition(index)):
+            plan.changed_indexes.append(name)
+    plan.undeclared_indexes = sorted(set(existing) - set(indexes))
+
+    billing_mode = description.get("BillingModeSummary", {}).get(
+        "BillingMode", "PROVISIONED"
+    )
+    plan.update_billing_mode = billing_mode != settings.DYNAMODB_BILLING_MODE
+
+    stream = description.get("StreamSpecification", {"StreamEnabled": False})
+    if not stream.get("StreamEnabled"):
+        stream = {"StreamEnabled": False}
+    plan.update_stream = stream != stream_specification()
+    return plan
+
+
+@retry(
+    stop=stop_after_attempt(max_tries),
+    wait=wait_fixed(wait_seconds),
+    retry=retry_if_exception_type(BotoCoreError),
+    before=before_log(logger, logging.INFO),
+    after=after_log(logger, logging.WARN),
+)
+async def describe_table(client: DynamoDBClient) -> dict[str, Any] | None:
+    """Returns the table's description, None if it does not exist."""
+    try:
+        response = await client.describe_table(TableName=settings.DYNAMODB_TABLE_NAME)
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ResourceNotFoundException":
+            return None
+        raise
+    return response["Table"]  # type: ignore[return-value]
+
+
+async def wait_until_active(client: DynamoDBClient) -> dict[str, Any]:
+    """Polls until the table and all its indexes are ACTIVE."""
+    while True:
+        description = await describe_table(client)
+        assert description is not None
+        statuses = [description["TableStatus"]] + [
+            index["IndexStatus"]
+            for index in description.get("GlobalSecondaryIndexes", [])
+        ]
+        if all(status == "ACTIVE" for status in statuses):
+            return description
+        await asyncio.sleep(poll_seconds)
+
+
+async def update_table(client: DynamoDBClient, **kwargs: Any) -> dict[str, Any]:
+    await client.update_table(TableName=settings.DYNAMODB_TABLE_NAME, **kwargs)
+    return await wait_until_active(client)
+
+
+def description_stream_enabled(description: dict[str, Any]) -> bool:
+    return bool(description.get("StreamSpecification", {}).get("StreamEnabled"))
+
+
+async def apply_plan(
+    client: DynamoDBClient,
+    plan: TablePlan,
+    indexes: dict[str, GlobalSecondaryIndex],
+    prune: bool,
+) -> None:
+    """
+    Applies `plan` one UpdateTable call at a time, since DynamoDB creates or
+    deletes a single GSI per call, waiting for each to finish.
+    """
+    if plan.update_billing_mode:
+        logger.info(f"Switching billing mode to {settings.DYNAMODB_BILLING_MODE}")
+        billing: dict[str, Any] = {"BillingMode": settings.DYNAMODB_BILLING_MODE}
+        if settings.DYNAMODB_BILLING_MODE == "PROVISIONED":
+            billing["ProvisionedThroughput"] = provisioned_throughput()
+            kept = set(indexes) - {index.name for index in plan.create_indexes}
+            billing["GlobalSecondaryIndexUpdates"] = [
+                {
+                    "Update": {
+                        "IndexName": name,
+                        "ProvisionedThroughput": provisioned_throughput(),
+                    }
+                }
+                for name in sorted(kept | set(plan.undeclared_indexes))
+            ]
+        await update_table(client, **billing)
+
+    if plan.update_stream:
+        logger.info(f"Updating stream to {stream_specification()}")
+        if description_stream_enabled(await wait_until_active(client)):
+            # A stream's view type cannot change; it is replaced instead.
+            await update_table(client, StreamSpecification={"StreamEnabled": False})
+        if settings.DYNAMODB_STREAM_ENABLED:
+            await update_table(client, StreamSpecification=stream_specification())
+
+    if prune:
+        for name in [*plan.undeclared_indexes, *plan.changed_indexes]:
+            logger.info(f"Deleting index {name}")
+            await update_table(
+                client, GlobalSecondaryIndexUpdates=[{"Delete": {"IndexName": name}}]
+            )
+    recreated = [indexes[name] for name in plan.changed_indexes] if prune else []
+    for index in [*plan.create_indexes, *recreated]:
+        logger.info(f"Creating index {index.name}")
+        await update_table(
+            client,
+            AttributeDefinitions=attribute_definitions(indexes.values()),
+            GlobalSecondaryIndexUpdates=[{"Create": index_definition(index)}],
+        )
+
+
+async def provision(client: DynamoDBClient, prune: bool, dry_run: bool) -> int:
+    """
+    Creates the table, or reconciles an existing one with the declared
+    indexes and billing mode. Returns the exit status: 1 if drift remains.
+    """
+    indexes = declared_indexes(item_classes())
+    description = await describe_table(client)
+    if description is None:
+        logger.info(f"Table {settings.DYNAMODB_TABLE_NAME} does not exist")
+        if dry_run:
+            return 1
+        await client.create_table(**table_definition(indexes))
+        await wait_until_active(client)
+        logger.info(f"Created table {settings.DYNAMODB_TABLE_NAME}")
+        return 0
+
+    plan = plan_changes(description, indexes)
+    if plan.is_empty():
+        logger.info(f"Table {settings.DYNAMODB_TABLE_NAME} is up to date")
+        return 0
+
+    logger.info(f"Table {settings.DYNAMODB_TABLE_NAME} differs: {plan}")
+    if dry_run:
+        return 1
+    await apply_plan(client, plan, indexes, prune)
+    if not prune and plan.changed_indexes:
+        logger.error(
+            f"Indexes {plan.changed_indexes} no longer match their declaration; "
+            "run with --prune to recreate them"
+        )
+        return 1
+    return 0
+
+
+async def run(prune: bool, dry_run: bool) -> int:
+    resource = await dynamodb_pool.open()
+    try:
+        return await provision(resource.meta.client, prune, dry_run)
+    finally:
+        await dynamodb_pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Create or update the DynamoDB table and its indexes."
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="delete undeclared indexes and recreate changed ones",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only report differences, exiting with 1 if there are any",
+    )
+    args = parser.parse_args()
+
+    logger.info("Provisioning DynamoDB")
+    sys.exit(asyncio.run(run(args.prune, args.dry_run)))
+
+
+if __name__ == "__main__":
+    main()
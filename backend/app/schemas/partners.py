@@ -32,8 +32,8 @@ class Location(BaseModel):
 
 
 class Address(BaseModel):
-    country: str
-    city: str
+    country: str = Field(max_length=56)
+    city: str = Field(max_length=100)
     location: Location
 
 
@@ -48,12 +48,37 @@ class Staffer(BaseModel):
     last_name: str = Field(max_length=50)
 
 
-class PartnerCreate(BaseModel):
-    name: str
+class ServiceCreate(Service):
+    pass
+
+
+class StafferCreate(Staffer):
+    pass
+
+
+class ServicePublic(Service):
+    id: ULID
+
+
+class StafferPublic(Staffer):
+    id: ULID
+
+
+class ServiceUpdate(BaseModel):
+    name: str | None = Field(default=None, max_length=50)
+    price: Decimal | None = None
+    currency: CurrencyEnum | None = None
+
+
+class StafferUpdate(BaseModel):
+    first_name: str | None = Field(default=None, max_length=50)
+    last_name: str | None = Field(default=None, max_length=50)
+
+
+class PartnerBase(BaseModel):
+    name: str = Field(max_length=50)
     address: Address
     working_hours: list[WorkingHours]
-    services: list[Service] = Field(default_factory=lambda: [])
-    staff: list[Staffer] = Field(default_factory=lambda: [])
 
     def model_dump(self, *args, **kwargs) -> dict[str, Any]:
         model_dump = super().model_dump(exclude={"services", "staff"})
@@ -73,6 +98,81 @@ class PartnerCreate(BaseModel):
         }
 
 
-class PartnerPublic(PartnerCreate):
+class PartnerCreate(PartnerBase):
+    services: list[Service] = Field(default_factory=lambda: [])
+    staff: list[Staffer] = Field(default_factory=lambda: [])
+
+
+class PartnerUpdate(BaseModel):
+    name: str | None = Field(default=None, max_length=50)
+    is_active: bool | None = None
+    address: Address | None = None
+    working_hours: list[WorkingHours] | None = None
+
+
+class PartnerAggregates(BaseModel):
+    service_count: int = 0
+    staff_count: int = 0
+    min_price: Decimal | None = None
+    max_price: Decimal | None = None
+
+
+class PartnerPublic(PartnerBase, PartnerAggregates):
+    services: list[ServicePublic] = Field(default_factory=lambda: [])
+    staff: list[StafferPublic] = Field(default_factory=lambda: [])
     id: ULID
     is_active: bool
+
+
+class PartnerProfilePublic(PartnerBase, PartnerAggregates):
+    id: ULID
+    is_active: bool
+
+
+class PartnerNearbyPublic(PartnerProfilePublic):
+    distance: float = Field(description="Distance from the search point in meters")
+
+
+class PartnersNearbyPublic(BaseModel):
+    data: list[PartnerNearbyPublic]
+
+
+class PartnerOpenPublic(BaseModel):
+    id: ULID
+    name: str
+
+
+class PartnersOpenPublic(BaseModel):
+    data: list[PartnerOpenPublic]
+    cursor: str | None
+
+
+class PartnersSearchPublic(BaseModel):
+    data: list[PartnerOpenPublic]
+    cursor: str | None
+
+
+class PartnersPublic(BaseModel):
+    data: list[PartnerProfilePublic]
+    cursor: str | None
+
+
+class PartnersBatchGet(BaseModel):
+    ids: list[str] = Field(min_length=1, max_length=100)
+
+
+class PartnersBatchPublic(BaseModel):
+    data: list[PartnerPublic]
+    not_found: list[str]
+
+
+class PartnerImportLineResult(BaseModel):
+    line: int
+    id: str | None = None
+    error: str | None = None
+
+
+class PartnerImportReport(BaseModel):
+    imported: int
+    failed: int
+    results: list[PartnerImportLineResult]
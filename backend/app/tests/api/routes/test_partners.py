@@ -0,0 +1,219 @@
+import json
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from types_aiobotocore_dynamodb import DynamoDBServiceResource
+
+from app.api.deps import get_current_user, get_dynamodb_service_resource
+from app.core.config import settings
+from app.crud import partner as partner_crud
+from app.main import app
+from app.models.sql.models import User
+from app.tests.crud.test_partner import partner_create
+from app.tests.utils.dynamodb import fake_service_resource
+
+PARTNERS_URL = f"{settings.API_V1_STR}/partners"
+
+
+@pytest.fixture
+def resource() -> DynamoDBServiceResource:
+    return fake_service_resource(settings.DYNAMODB_TABLE_NAME)
+
+
+@pytest.fixture
+def partner_client(resource: DynamoDBServiceResource) -> Iterator[TestClient]:
+    """
+    A client signed in as a superuser whose requests use the in-memory table.
+    It is not entered, so the app's lifespan does not connect to DynamoDB.
+    """
+    superuser = User(email="admin@example.com", hashed_password="", is_superuser=True)
+    app.dependency_overrides[get_current_user] = lambda: superuser
+    app.dependency_overrides[get_dynamodb_service_resource] = lambda: resource
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_current_user)
+    app.dependency_overrides.pop(get_dynamodb_service_resource)
+    partner_crud.partner_cache.clear()
+
+
+def create_partner(
+    client: TestClient, name: str = "Fake Barber", **params: Any
+) -> dict[str, Any]:
+    response = client.post(
+        f"{PARTNERS_URL}/",
+        content=partner_create(name).model_dump_json(),
+        headers={"Content-Type": "application/json"},
+        params=params,
+    )
+    assert response.status_code == 201
+    content: dict[str, Any] = response.json()
+    return content
+
+
+def test_get_partner_honours_if_none_match(partner_client: TestClient) -> None:
+    partner = create_partner(partner_client)
+    url = f"{PARTNERS_URL}/{partner['id']}"
+
+    response = partner_client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag == '"1"'
+
+    not_modified = partner_client.get(url, headers={"If-None-Match": f"W/{etag}"})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert not_modified.content == b""
+
+    stale = partner_client.get(url, headers={"If-None-Match": '"0"'})
+    assert stale.status_code == 200
+    assert stale.json()["id"] == partner["id"]
+
+
+def test_update_partner_checks_if_match(partner_client: TestClient) -> None:
+    partner = create_partner(partner_client)
+    url = f"{PARTNERS_URL}/{partner['id']}"
+
+    updated = partner_client.patch(
+        url, json={"name": "Renamed"}, headers={"If-Match": '"1"'}
+    )
+    assert updated.status_code == 200
+    assert updated.json()["name"] == "Renamed"
+    assert updated.headers["ETag"] == '"2"'
+
+    conflict = partner_client.patch(
+        url, json={"name": "Stale"}, headers={"If-Match": '"1"'}
+    )
+    assert conflict.status_code == 409
+    assert conflict.headers["ETag"] == '"2"'
+
+    malformed = partner_client.patch(
+        url, json={"name": "Malformed"}, headers={"If-Match": "version-2"}
+    )
+    assert malformed.status_code == 400
+    assert partner_client.get(url).json()["name"] == "Renamed"
+
+
+def test_update_partner_rejects_over_long_fields(partner_client: TestClient) -> None:
+    partner = create_partner(partner_client)
+    url = f"{PARTNERS_URL}/{partner['id']}"
+
+    long_name = partner_client.patch(url, json={"name": "x" * 51})
+    assert long_name.status_code == 422
+    address = {**partner["address"], "city": "x" * 101}
+    long_city = partner_client.patch(url, json={"address": address})
+    assert long_city.status_code == 422
+    assert partner_client.get(url).json()["name"] == partner["name"]
+
+
+def test_get_partner_returns_only_selected_fields(partner_client: TestClient) -> None:
+    partner = create_partner(partner_client)
+    url = f"{PARTNERS_URL}/{partner['id']}"
+
+    response = partner_client.get(url, params={"fields": "name", "include": "staff"})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"1"'
+    content = response.json()
+    assert set(content) == {"id", "name", "staff"}
+    assert content["name"] == "Fake Barber"
+    assert [staffer["first_name"] for staffer in content["staff"]] == ["Ana"]
+
+    unknown = partner_client.get(url, params={"fields": "name,secret"})
+    assert unknown.status_code == 400
+    assert "secret" in unknown.json()["detail"]
+
+
+def test_batch_get_partners_reports_not_found(partner_client: TestClient) -> None:
+    partner = create_partner(partner_client)
+
+    response = partner_client.post(
+        f"{PARTNERS_URL}/batch-get", json={"ids": ["missing", partner["id"]]}
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert [found["id"] for found in content["data"]] == [partner["id"]]
+    assert content["not_found"] == ["missing"]
+
+
+def test_create_partner_transactionally(partner_client: TestClient) -> None:
+    partner = create_partner(partner_client, transactional=True)
+
+    response = partner_client.get(f"{PARTNERS_URL}/{partner['id']}")
+    assert response.status_code == 200
+    assert len(response.json()["services"]) == 3
+    search = partner_client.get(f"{PARTNERS_URL}/search", params={"q": "barber"})
+    assert [found["id"] for found in search.json()["data"]] == [partner["id"]]
+
+
+def test_import_partners_reports_each_line(partner_client: TestClient) -> None:
+    lines = [
+        partner_create("Imported").model_dump_json(),
+        json.dumps({"name": "Incomplete"}),
+        partner_create("Also Imported").model_dump_json(),
+    ]
+
+    response = partner_client.post(
+        f"{PARTNERS_URL}/import",
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["imported"], report["failed"]) == (2, 1)
+    results = {result["line"]: result for result in report["results"]}
+    assert results[2]["error"]
+    partner = partner_client.get(f"{PARTNERS_URL}/{results[1]['id']}")
+    assert partner.json()["name"] == "Imported"
+
+
+def test_search_partners_pages_with_a_cursor(partner_client: TestClient) -> None:
+    for name in ["Old Town Barber", "Barber Shop", "Town Barber"]:
+        create_partner(partner_client, name=name)
+
+    url = f"{PARTNERS_URL}/search"
+    first = partner_client.get(url, params={"q": "barber", "limit": 2}).json()
+    assert [found["name"] for found in first["data"]] == [
+        "Barber Shop",
+        "Old Town Barber",
+    ]
+    second = partner_client.get(
+        url, params={"q": "barber", "limit": 2, "cursor": first["cursor"]}
+    ).json()
+    assert [found["name"] for found in second["data"]] == ["Town Barber"]
+    assert second["cursor"] is None
+
+    other_query = partner_client.get(
+        url, params={"q": "town barber", "cursor": first["cursor"]}
+    )
+    assert other_query.status_code == 400
+
+
+def test_child_writes_check_if_match_against_the_partner(
+    partner_client: TestClient,
+) -> None:
+    partner = create_partner(partner_client)
+    url = f"{PARTNERS_URL}/{partner['id']}"
+    etag = partner_client.get(url).headers["ETag"]
+    service_url = f"{url}/services/{partner['services'][0]['id']}"
+
+    updated = partner_client.patch(
+        service_url, json={"name": "Renamed"}, headers={"If-Match": etag}
+    )
+    assert updated.status_code == 200
+    assert updated.json()["name"] == "Renamed"
+    assert updated.headers["ETag"] == '"2"'
+
+    stale = partner_client.patch(
+        service_url, json={"name": "Stale"}, headers={"If-Match": etag}
+    )
+    assert stale.status_code == 409
+    assert stale.headers["ETag"] == '"2"'
+
+    staffer_url = f"{url}/staff/{partner['staff'][0]['id']}"
+    conflict = partner_client.delete(staffer_url, headers={"If-Match": etag})
+    assert conflict.status_code == 409
+    deleted = partner_client.delete(
+        staffer_url, headers={"If-Match": updated.headers["ETag"]}
+    )
+    assert deleted.status_code == 204
+    assert partner_client.get(url).headers["ETag"] == '"3"'
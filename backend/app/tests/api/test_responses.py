@@ -0,0 +1,37 @@
+import json
+import uuid
+
+from pydantic import TypeAdapter
+
+from app.api.responses import ModelResponse
+from app.crud.partner import to_model
+from app.models.sql.models import ItemPublic, ItemsPublic
+from app.schemas.partners import PartnerPublic
+from app.tests.crud.test_partner import partner_create
+
+
+def test_model_response_renders_public_fields_of_item() -> None:
+    partner = to_model(partner_create(services=2))
+    response = ModelResponse(partner, PartnerPublic, headers={"ETag": '"1"'})
+
+    adapter = TypeAdapter(PartnerPublic)
+    public = adapter.validate_python(partner, from_attributes=True)
+    assert json.loads(bytes(response.body)) == adapter.dump_python(public, mode="json")
+    assert "version" not in json.loads(bytes(response.body))
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["etag"] == '"1"'
+
+
+def test_model_response_renders_validated_model() -> None:
+    owner_id = uuid.uuid4()
+    items = ItemsPublic(
+        data=[
+            ItemPublic(title=f"Item {i}", id=uuid.uuid4(), owner_id=owner_id)
+            for i in range(3)
+        ],
+        count=3,
+    )
+
+    response = ModelResponse(items, ItemsPublic)
+
+    assert json.loads(bytes(response.body)) == items.model_dump(mode="json")
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from app.core.availability import (
+    SLOTS_PER_DAY,
+    shift_slots,
+    week_slot,
+    weekly_slots,
+)
+
+
+def test_week_slot() -> None:
+    # 2024-01-05 is a Friday.
+    assert week_slot(datetime(2024, 1, 5, 19, 30)) == 4 * SLOTS_PER_DAY + 78
+    assert week_slot(datetime(2024, 1, 5, 19, 44)) == 4 * SLOTS_PER_DAY + 78
+
+
+def test_shift_slots_only_fully_covered() -> None:
+    slots = shift_slots("monday", "09:10:00", "10:00:00")
+    assert list(slots) == [37, 38, 39]
+
+
+def test_weekly_slots_wraps_past_midnight() -> None:
+    slots = weekly_slots([("sunday", "23:30:00", "00:30:00")])
+    assert slots == {6 * SLOTS_PER_DAY + 94, 6 * SLOTS_PER_DAY + 95, 0, 1}
@@ -0,0 +1,65 @@
+from app.core.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cache(
+    ttl: float = 10, max_bytes: int = 100
+) -> tuple[TTLCache[str, str], FakeClock]:
+    clock = FakeClock()
+    return TTLCache(ttl=ttl, max_bytes=max_bytes, sizeof=len, clock=clock), clock
+
+
+def test_get_returns_cached_value() -> None:
+    cache, _ = make_cache()
+    cache.set("a", "value")
+    assert cache.get("a") == "value"
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.size_bytes == len("value")
+
+
+def test_entries_expire_after_ttl() -> None:
+    cache, clock = make_cache(ttl=5)
+    cache.set("a", "value")
+    clock.now = 5
+    assert cache.get("a") is None
+    assert cache.stats().expirations == 1
+    assert cache.stats().entries == 0
+
+
+def test_least_recently_used_entries_are_evicted_over_max_bytes() -> None:
+    cache, _ = make_cache(max_bytes=10)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    cache.get("a")
+    cache.set("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    assert cache.stats().evictions == 1
+    assert cache.stats().size_bytes == 8
+
+
+def test_invalidate_removes_entry() -> None:
+    cache, _ = make_cache()
+    cache.set("a", "value")
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert cache.stats().invalidations == 1
+
+
+def test_set_with_stale_generation_is_ignored() -> None:
+    cache, _ = make_cache()
+    generation = cache.generation
+    cache.invalidate("a")
+    cache.set("a", "stale", generation)
+    assert cache.get("a") is None
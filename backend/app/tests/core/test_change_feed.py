@@ -0,0 +1,208 @@
+import asyncio
+from typing import Any
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+
+from app.core.change_feed import (
+    ChangeEvent,
+    ChangeFeed,
+    MemoryCheckpoints,
+    StreamPoller,
+    StreamRecord,
+    StreamRecordChange,
+)
+
+_serializer = TypeSerializer()
+
+
+def stream_record(
+    sequence_number: int,
+    pk: str,
+    new_image: dict[str, Any] | None = None,
+    old_image: dict[str, Any] | None = None,
+) -> StreamRecord:
+    change: StreamRecordChange = {
+        "Keys": {"pk": {"S": pk}, "sk": {"S": pk}},
+        "SequenceNumber": str(sequence_number),
+    }
+    if new_image is not None:
+        change["NewImage"] = serialize({"pk": pk, "sk": pk, **new_image})
+    if old_image is not None:
+        change["OldImage"] = serialize({"pk": pk, "sk": pk, **old_image})
+    if not new_image:
+        return {"eventName": "REMOVE", "dynamodb": change}
+    if old_image:
+        return {"eventName": "MODIFY", "dynamodb": change}
+    return {"eventName": "INSERT", "dynamodb": change}
+
+
+def serialize(image: dict[str, Any]) -> dict[str, Any]:
+    return {key: _serializer.serialize(value) for key, value in image.items()}
+
+
+class FakeStreams:
+    """One open shard of a stream, served through GetRecords."""
+
+    def __init__(self, records: list[StreamRecord]) -> None:
+        self.records = records
+
+    async def describe_table(self, TableName: str) -> dict[str, Any]:
+        return {"Table": {"LatestStreamArn": f"{TableName}/stream"}}
+
+    async def describe_stream(self, StreamArn: str) -> dict[str, Any]:
+        return {
+            "StreamDescription": {
+                "Shards": [
+                    {
+                        "ShardId": "shard-1",
+                        "SequenceNumberRange": {"StartingSequenceNumber": "1"},
+                    }
+                ]
+            }
+        }
+
+    async def get_shard_iterator(self, **kwargs: Any) -> dict[str, Any]:
+        position = 0
+        if kwargs["ShardIteratorType"] == "AFTER_SEQUENCE_NUMBER":
+            position = int(kwargs["SequenceNumber"])
+        elif kwargs["ShardIteratorType"] == "LATEST":
+            position = len(self.records)
+        return {"ShardIterator": str(position)}
+
+    async def get_records(self, ShardIterator: str, Limit: int) -> dict[str, Any]:
+        position = int(ShardIterator)
+        records = self.records[position : position + Limit]
+        return {
+            "Records": records,
+            "NextShardIterator": str(position + len(records)),
+        }
+
+
+def test_dispatch_orders_changes_per_partition() -> None:
+    feed = ChangeFeed("test")
+    handled: list[tuple[str, list[str]]] = []
+
+    @feed.handler("PARTNER")
+    async def partners(events: list[ChangeEvent]) -> None:
+        handled.append((events[0].partition_key, [e.sequence_number for e in events]))
+
+    @feed.handler()
+    async def failing(events: list[ChangeEvent]) -> None:
+        if events[0].partition_key == "PARTNER#2":
+            raise RuntimeError("handler failed")
+
+    records = [
+        stream_record(1, "PARTNER#1", {"item_type": "PARTNER"}),
+        stream_record(2, "PARTNER#2", {"item_type": "PARTNER"}),
+        stream_record(3, "PARTNER#1", {"item_type": "SERVICE"}),
+        stream_record(4, "PARTNER#1", None, {"item_type": "PARTNER"}),
+    ]
+    with pytest.raises(RuntimeError):
+        asyncio.run(feed.dispatch(records))
+
+    assert sorted(handled) == [("PARTNER#1", ["1", "4"]), ("PARTNER#2", ["2"])]
+
+
+def test_stream_poller_checkpoints_delivered_batches() -> None:
+    feed = ChangeFeed("test")
+    delivered: list[str] = []
+    failures = [RuntimeError("handler failed")]
+
+    @feed.handler()
+    async def record(events: list[ChangeEvent]) -> None:
+        if events[0].sequence_number == "3" and failures:
+            raise failures.pop()
+        delivered.extend(event.sequence_number for event in events)
+
+    streams = FakeStreams(
+        [stream_record(n, f"PARTNER#{n}", {"item_type": "PARTNER"}) for n in (1, 2)]
+    )
+    checkpoints = MemoryCheckpoints()
+    client: Any = streams
+    poller = StreamPoller(feed, client, streams, "table", checkpoints, batch_size=1)
+
+    async def poll() -> int:
+        return await poller.poll(await poller.stream_arn())
+
+    assert asyncio.run(poll()) == 2
+    assert checkpoints.sequence_numbers == {"shard-1": "2"}
+
+    streams.records.append(stream_record(3, "PARTNER#3", {"item_type": "PARTNER"}))
+    streams.records.append(stream_record(4, "CHANGE_FEED#test", {"shard_id": "x"}))
+    with pytest.raises(RuntimeError):
+        asyncio.run(poll())
+    poller.iterators.clear()
+    assert asyncio.run(poll()) == 2
+
+    assert delivered == ["1", "2", "3"]
+    # The batch of only a checkpoint item is skipped without a checkpoint.
+    assert checkpoints.sequence_numbers == {"shard-1": "3"}
+
+
+class SplitStreams(FakeStreams):
+    """
+    A closed shard whose pages include empty ones before its end, and the
+    open shard split from it.
+    """
+
+    def __init__(self, pages: dict[str, list[list[StreamRecord]]]) -> None:
+        super().__init__([])
+        self.pages = pages
+
+    async def describe_stream(self, StreamArn: str) -> dict[str, Any]:
+        return {
+            "StreamDescription": {
+                "Shards": [
+                    {
+                        "ShardId": "child",
+                        "ParentShardId": "parent",
+                        "SequenceNumberRange": {"StartingSequenceNumber": "10"},
+                    },
+                    {
+                        "ShardId": "parent",
+                        "SequenceNumberRange": {
+                            "StartingSequenceNumber": "1",
+                            "EndingSequenceNumber": "9",
+                        },
+                    },
+                ]
+            }
+        }
+
+    async def get_shard_iterator(self, **kwargs: Any) -> dict[str, Any]:
+        return {"ShardIterator": f"{kwargs['ShardId']}:0"}
+
+    async def get_records(self, ShardIterator: str, Limit: int) -> dict[str, Any]:
+        shard_id, position = ShardIterator.split(":")
+        pages = self.pages[shard_id]
+        response: dict[str, Any] = {"Records": pages[int(position)]}
+        if int(position) + 1 < len(pages) or shard_id != "parent":
+            next_position = min(int(position) + 1, len(pages) - 1)
+            response["NextShardIterator"] = f"{shard_id}:{next_position}"
+        return response
+
+
+def test_stream_poller_reads_parent_shards_to_their_end() -> None:
+    feed = ChangeFeed("test")
+    delivered: list[str] = []
+
+    @feed.handler()
+    async def record(events: list[ChangeEvent]) -> None:
+        delivered.extend(event.sequence_number for event in events)
+
+    def partner_record(sequence_number: int) -> StreamRecord:
+        return stream_record(sequence_number, "PARTNER#1", {"item_type": "PARTNER"})
+
+    streams = SplitStreams(
+        {
+            "parent": [[partner_record(1)], [], [partner_record(3)], []],
+            "child": [[partner_record(10)], []],
+        }
+    )
+    client: Any = streams
+    poller = StreamPoller(feed, client, streams, "table", MemoryCheckpoints())
+
+    assert asyncio.run(poller.poll("table/stream")) == 3
+    assert delivered == ["1", "3", "10"]
+    assert poller.finished_shards == {"parent"}
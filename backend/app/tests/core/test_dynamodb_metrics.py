@@ -0,0 +1,99 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.dynamodb_metrics import (
+    CapacityStats,
+    RouteCapacity,
+    record_attempt,
+    record_call,
+    request_capacity,
+    start_call,
+)
+
+
+def test_record_call_sums_capacity_per_index() -> None:
+    stats = CapacityStats()
+    token = request_capacity.set(stats)
+    try:
+        context: dict[str, object] = {}
+        start_call(context=context)
+        record_attempt(
+            response=(None, {"Error": {"Code": "ThrottlingException"}}),
+        )
+        record_call(
+            parsed={
+                "ResponseMetadata": {"RetryAttempts": 1},
+                "ConsumedCapacity": {
+                    "TableName": "clipr",
+                    "CapacityUnits": 1.5,
+                    "Table": {"CapacityUnits": 0.5},
+                    "GlobalSecondaryIndexes": {"name-index": {"CapacityUnits": 1.0}},
+                },
+            },
+            model=SimpleNamespace(name="Query"),
+            context=context,
+        )
+        record_call(
+            parsed={
+                "ConsumedCapacity": [
+                    {"TableName": "clipr", "CapacityUnits": 2.0},
+                    {"TableName": "clipr", "CapacityUnits": 2.0},
+                ]
+            },
+            model=SimpleNamespace(name="TransactWriteItems"),
+            context={},
+        )
+    finally:
+        request_capacity.reset(token)
+
+    assert stats.calls == 2
+    assert stats.retries == 1
+    assert stats.throttles == 1
+    assert stats.read_units == 1.5
+    assert stats.write_units == 4.0
+    assert stats.units_by_index == {"clipr": 0.5, "name-index": 1.0}
+    assert stats.latency_ms >= 0
+    assert stats.server_timing().startswith("dynamodb;dur=")
+
+
+def test_server_timing_reports_wall_time_of_concurrent_calls(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    clock = iter([0.0, 0.010, 0.030, 0.040])
+    monkeypatch.setattr(time, "perf_counter", lambda: next(clock))
+    stats = CapacityStats()
+    token = request_capacity.set(stats)
+    try:
+        first: dict[str, object] = {}
+        second: dict[str, object] = {}
+        start_call(context=first)
+        start_call(context=second)
+        get_item = SimpleNamespace(name="GetItem")
+        record_call(parsed={}, model=get_item, context=first)
+        record_call(parsed={}, model=get_item, context=second)
+    finally:
+        request_capacity.reset(token)
+
+    assert round(stats.latency_ms) == 60
+    assert round(stats.wall_ms) == 40
+    assert stats.server_timing().startswith(
+        'dynamodb;dur=40.0;desc="2 calls, 60.0 ms summed latency, '
+    )
+
+
+def test_record_call_outside_request_is_ignored() -> None:
+    record_call(parsed={}, model=SimpleNamespace(name="GetItem"), context={})
+    assert request_capacity.get() is None
+
+
+def test_route_capacity_sums_requests() -> None:
+    routes = RouteCapacity()
+    routes.record("GET /partners", CapacityStats(calls=2, read_units=1.0))
+    routes.record("GET /partners", CapacityStats(calls=1, read_units=0.5))
+
+    stats = routes.snapshot()["GET /partners"]
+    assert stats.requests == 2
+    assert stats.calls == 3
+    assert stats.read_units == 1.5
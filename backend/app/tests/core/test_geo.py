@@ -0,0 +1,25 @@
+import pytest
+
+from app.core.geo import covering_cells, encode_geohash, haversine_distances
+
+
+def test_encode_geohash() -> None:
+    assert encode_geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+
+def test_covering_cells_contain_point_and_neighbours() -> None:
+    cells = covering_cells(45.25, 19.84, 1_000, 4)
+    assert len(cells) == 9
+    assert len({len(cell) for cell in cells}) == 1
+    assert encode_geohash(45.25, 19.84, len(cells[0])) in cells
+
+
+def test_covering_cells_radius_too_large() -> None:
+    with pytest.raises(ValueError):
+        covering_cells(45.25, 19.84, 100_000, 4)
+
+
+def test_haversine_distances() -> None:
+    distances = haversine_distances(45.25, 19.84, [(45.25, 19.84), (46.25, 19.84)])
+    assert distances[0] == 0
+    assert distances[1] == pytest.approx(111_195, rel=1e-3)
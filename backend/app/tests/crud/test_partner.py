@@ -0,0 +1,510 @@
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+
+import pytest
+from botocore.exceptions import ReadTimeoutError
+from types_aiobotocore_dynamodb import DynamoDBServiceResource
+
+from app.core.config import settings
+from app.crud import partner as partner_crud
+from app.models.dynamodb.partners import PartnerNameToken
+from app.schemas.partners import (
+    CurrencyEnum,
+    PartnerCreate,
+    PartnerUpdate,
+    ServiceCreate,
+    ServiceUpdate,
+)
+from app.tests.utils.dynamodb import client_error, fake_service_resource
+
+
+def partner_create(name: str = "Fake Barber", services: int = 3) -> PartnerCreate:
+    return PartnerCreate.model_validate(
+        {
+            "name": name,
+            "address": {
+                "country": "Serbia",
+                "city": "Novi Sad",
+                "location": {"address": "Zmaj Jovina 1", "lat": 45.25, "lon": 19.84},
+            },
+            "working_hours": [
+                {"day": "friday", "shifts": [{"start": "09:00", "end": "17:00"}]}
+            ],
+            "services": [
+                {"name": f"Service {i}", "price": 1000 + i, "currency": "RSD"}
+                for i in range(services)
+            ],
+            "staff": [{"first_name": "Ana", "last_name": "Anic"}],
+        }
+    )
+
+
+@pytest.fixture
+def resource() -> DynamoDBServiceResource:
+    return fake_service_resource(settings.DYNAMODB_TABLE_NAME)
+
+
+def run(coroutine: Any) -> Any:
+    return asyncio.run(coroutine)
+
+
+def search(resource: DynamoDBServiceResource, query: str) -> list[PartnerNameToken]:
+    postings: list[PartnerNameToken]
+    postings, _ = run(partner_crud.search_partners(resource, query, 10))
+    return postings
+
+
+@pytest.mark.parametrize("transactional", [False, True])
+def test_create_and_read_partner(
+    resource: DynamoDBServiceResource, transactional: bool
+) -> None:
+    created = run(
+        partner_crud.create_partner(
+            resource, partner_create(services=120), transactional=transactional
+        )
+    )
+    partner = run(partner_crud.read_partner(resource, created.id, page_size=50))
+
+    assert partner is not None
+    assert partner.name == "Fake Barber"
+    assert len(partner.services) == partner.service_count == 120
+    assert len(partner.staff) == partner.staff_count == 1
+    assert (partner.min_price, partner.max_price) == (Decimal(1000), Decimal(1119))
+
+
+def test_transactional_create_rolls_back_after_an_interrupted_chunk(
+    resource: DynamoDBServiceResource, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    transact_write_items = resource.meta.client.transact_write_items
+    partner_keys: list[str] = []
+
+    async def time_out_after_the_second_chunk(**kwargs: Any) -> Any:
+        partner_keys.append(kwargs["TransactItems"][0]["Put"]["Item"]["pk"])
+        response = await transact_write_items(**kwargs)
+        if len(partner_keys) == 2:
+            raise ReadTimeoutError(endpoint_url="http://dynamodb")
+        return response
+
+    monkeypatch.setattr(
+        resource.meta.client, "transact_write_items", time_out_after_the_second_chunk
+    )
+    with pytest.raises(ReadTimeoutError):
+        run(
+            partner_crud.create_partner(
+                resource, partner_create(services=150), transactional=True
+            )
+        )
+
+    partner_id = partner_keys[0].removeprefix("PARTNER#")
+    items = run(
+        partner_crud.read_pages(
+            partner_crud.query_pages(
+                run(resource.Table(settings.DYNAMODB_TABLE_NAME)),
+                KeyConditionExpression="#pk=:pk",
+                ExpressionAttributeNames={"#pk": "pk"},
+                ExpressionAttributeValues={":pk": partner_keys[0]},
+            )
+        )
+    )
+    assert items == []
+    assert run(partner_crud.read_partner(resource, partner_id)) is None
+
+
+def test_list_partners_pages_by_name(resource: DynamoDBServiceResource) -> None:
+    for name in ["Delta", "Alpha", "Charlie", "Bravo", "Bar"]:
+        run(partner_crud.create_partner(resource, partner_create(name, services=1)))
+
+    first, cursor = run(partner_crud.list_partners(resource, None, 2))
+    second, _ = run(partner_crud.list_partners(resource, None, 10, cursor))
+    prefixed, _ = run(partner_crud.list_partners(resource, "b", 10))
+
+    assert [p.name for p in first + second] == [
+        "Alpha",
+        "Bar",
+        "Bravo",
+        "Charlie",
+        "Delta",
+    ]
+    assert [p.name for p in prefixed] == ["Bar", "Bravo"]
+
+
+def test_list_partners_merges_name_index_shards(
+    resource: DynamoDBServiceResource, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "PARTNER_NAME_INDEX_SHARDS", 3)
+    names = [f"Barber {i}" for i in range(7)]
+    for name in reversed(names):
+        run(partner_crud.create_partner(resource, partner_create(name, services=1)))
+
+    listed: list[str] = []
+    cursor = None
+    for _ in range(len(names)):
+        page, cursor = run(partner_crud.list_partners(resource, "barber", 2, cursor))
+        assert len(page) <= 2
+        listed.extend(partner.name for partner in page)
+        if cursor is None:
+            break
+
+    assert cursor is None
+    assert listed == names
+
+
+def test_update_partner_checks_version(resource: DynamoDBServiceResource) -> None:
+    created = run(partner_crud.create_partner(resource, partner_create()))
+
+    updated = run(
+        partner_crud.update_partner(
+            resource, created.id, PartnerUpdate(name="Renamed"), expected_version=1
+        )
+    )
+    assert updated is not None
+    assert updated.version == 2
+
+    with pytest.raises(partner_crud.VersionConflictError) as conflict:
+        run(
+            partner_crud.update_partner(
+                resource, created.id, PartnerUpdate(name="Stale"), expected_version=1
+            )
+        )
+    assert conflict.value.current_version == 2
+    missing = PartnerUpdate(name="Missing")
+    assert run(partner_crud.update_partner(resource, "missing", missing)) is None
+
+
+def test_update_partner_diffs_open_slots_against_the_replaced_row(
+    resource: DynamoDBServiceResource, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    created = run(partner_crud.create_partner(resource, partner_create()))
+    read_partner_row = partner_crud.read_partner_row
+    concurrent_updates = [
+        {"day": "saturday", "shifts": [{"start": "09:00", "end": "17:00"}]}
+    ]
+
+    async def read_then_update_concurrently(*args: Any, **kwargs: Any) -> Any:
+        partner = await read_partner_row(*args, **kwargs)
+        if concurrent_updates:
+            # Another request changes the hours after this one read the row.
+            partner_in = PartnerUpdate.model_validate(
+                {"working_hours": [concurrent_updates.pop()]}
+            )
+            await partner_crud.update_partner(resource, created.id, partner_in)
+        return partner
+
+    monkeypatch.setattr(partner_crud, "read_partner_row", read_then_update_concurrently)
+    sunday_hours = {"day": "sunday", "shifts": [{"start": "09:00", "end": "17:00"}]}
+    updated = run(
+        partner_crud.update_partner(
+            resource,
+            created.id,
+            PartnerUpdate.model_validate({"working_hours": [sunday_hours]}),
+        )
+    )
+    assert updated is not None
+    assert updated.version == 3
+
+    for day, open_ids in [(3, []), (4, []), (5, [created.id])]:
+        at = datetime(2024, 5, day, 12, 0)
+        open_partners, _ = run(partner_crud.list_open_partners(resource, at, 10))
+        assert [slot.partner_id for slot in open_partners] == open_ids
+
+
+def test_children_maintain_aggregates(resource: DynamoDBServiceResource) -> None:
+    created = run(partner_crud.create_partner(resource, partner_create(services=2)))
+    cheap = run(
+        partner_crud.create_service(
+            resource,
+            created.id,
+            ServiceCreate(name="Cheap", price=Decimal(10), currency=CurrencyEnum.RSD),
+        )
+    )
+    assert cheap is not None
+    missing_partner = run(
+        partner_crud.create_service(
+            resource,
+            "missing",
+            ServiceCreate(name="Orphan", price=Decimal(10), currency=CurrencyEnum.RSD),
+        )
+    )
+    assert missing_partner is None
+
+    partner = run(partner_crud.read_partner(resource, created.id))
+    assert partner is not None
+    assert (partner.service_count, partner.min_price) == (3, Decimal(10))
+
+    run(
+        partner_crud.update_service(
+            resource, created.id, cheap.id, ServiceUpdate(price=Decimal(5000))
+        )
+    )
+    assert run(
+        partner_crud.delete_service(resource, created.id, created.services[0].id)
+    )
+    assert not run(partner_crud.delete_service(resource, created.id, "missing"))
+
+    partner = run(partner_crud.read_partner(resource, created.id))
+    assert partner is not None
+    assert partner.service_count == 2
+    assert (partner.min_price, partner.max_price) == (Decimal(1001), Decimal(5000))
+
+
+def test_find_nearby_and_open_partners(resource: DynamoDBServiceResource) -> None:
+    created = run(partner_crud.create_partner(resource, partner_create()))
+
+    nearby = run(partner_crud.find_nearby_partners(resource, 45.251, 19.841, 500, 10))
+    assert [(partner.id, round(distance)) for partner, distance in nearby] == [
+        (created.id, 136)
+    ]
+
+    friday_noon = datetime(2024, 5, 3, 12, 0)
+    open_partners, _ = run(partner_crud.list_open_partners(resource, friday_noon, 10))
+    assert [(slot.partner_id, slot.name) for slot in open_partners] == [
+        (created.id, created.name)
+    ]
+    run(partner_crud.update_partner(resource, created.id, PartnerUpdate(name="New")))
+    open_partners, _ = run(partner_crud.list_open_partners(resource, friday_noon, 10))
+    assert [slot.name for slot in open_partners] == ["New"]
+    saturday, _ = run(
+        partner_crud.list_open_partners(resource, datetime(2024, 5, 4), 10)
+    )
+    assert saturday == []
+
+
+def test_search_partners_intersects_name_tokens(
+    resource: DynamoDBServiceResource,
+) -> None:
+    for name in ["Old Town Barber", "Barber Shop", "Town Salon"]:
+        run(partner_crud.create_partner(resource, partner_create(name, services=1)))
+    renamed = run(partner_crud.create_partner(resource, partner_create("Nails")))
+
+    barbers = search(resource, "barber")
+    assert [posting.name for posting in barbers] == ["Barber Shop", "Old Town Barber"]
+    town_barbers = search(resource, "town, BARBER")
+    assert [posting.name for posting in town_barbers] == ["Old Town Barber"]
+    assert search(resource, "barber spa") == []
+
+    run(
+        partner_crud.update_partner(
+            resource, renamed.id, PartnerUpdate(name="Town Barber")
+        )
+    )
+    assert search(resource, "nails") == []
+    town_barbers = search(resource, "town barber")
+    assert [posting.name for posting in town_barbers] == [
+        "Old Town Barber",
+        "Town Barber",
+    ]
+    assert town_barbers[1].partner_id == renamed.id
+
+
+def test_search_partners_pages_through_postings_in_name_order(
+    resource: DynamoDBServiceResource,
+) -> None:
+    names = ["Delta Barber", "alpha barber", "Charlie Salon", "Bravo Barber"]
+    for name in names:
+        run(partner_crud.create_partner(resource, partner_create(name, services=1)))
+
+    found: list[str] = []
+    postings, last_key = run(partner_crud.search_partners(resource, "barber", 2))
+    while last_key:
+        found.extend(posting.name for posting in postings)
+        postings, last_key = run(
+            partner_crud.search_partners(resource, "barber", 2, last_key)
+        )
+    found.extend(posting.name for posting in postings)
+    assert found == ["alpha barber", "Bravo Barber", "Delta Barber"]
+
+
+def test_search_partners_reads_a_bounded_number_of_pages(
+    resource: DynamoDBServiceResource, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(partner_crud, "SEARCH_PAGES_PER_REQUEST", 2)
+    for name in ["A Salon", "B Salon", "C Salon", "Town Salon"]:
+        run(partner_crud.create_partner(resource, partner_create(name, services=1)))
+
+    postings, last_key = run(partner_crud.search_partners(resource, "salon town", 1))
+    assert postings == []
+    assert last_key is not None
+    postings, last_key = run(
+        partner_crud.search_partners(resource, "salon town", 1, last_key)
+    )
+    assert [posting.name for posting in postings] == ["Town Salon"]
+
+
+def test_rename_moves_name_postings(resource: DynamoDBServiceResource) -> None:
+    created = run(partner_crud.create_partner(resource, partner_create("Town Barber")))
+    run(
+        partner_crud.update_partner(
+            resource, created.id, PartnerUpdate(name="Zed Barber")
+        )
+    )
+    run(
+        partner_crud.update_partner(
+            resource, created.id, PartnerUpdate(name="ZED barber")
+        )
+    )
+
+    table = run(resource.Table(settings.DYNAMODB_TABLE_NAME))
+    response = run(
+        table.query(
+            KeyConditionExpression="#pk=:pk",
+            ExpressionAttributeNames={"#pk": "pk"},
+            ExpressionAttributeValues={":pk": "TOKEN#BARBER"},
+        )
+    )
+    assert [(item["sk"], item["name"]) for item in response["Items"]] == [
+        (f"ZED BARBER#{created.id}", "ZED barber")
+    ]
+    assert search(resource, "town") == []
+
+
+def test_service_writes_retry_when_the_partner_moved_on(
+    resource: DynamoDBServiceResource, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    created = run(partner_crud.create_partner(resource, partner_create(services=1)))
+    read_price_range = partner_crud.read_price_range
+    concurrent_services = [
+        ServiceCreate(name="Cheap", price=Decimal(10), currency=CurrencyEnum.RSD)
+    ]
+
+    async def read_then_write_concurrently(*args: Any, **kwargs: Any) -> Any:
+        price_range = await read_price_range(*args, **kwargs)
+        if concurrent_services:
+            # Another request adds a service after this one read the prices.
+            service_in = concurrent_services.pop()
+            await partner_crud.create_service(resource, created.id, service_in)
+        return price_range
+
+    monkeypatch.setattr(partner_crud, "read_price_range", read_then_write_concurrently)
+    expensive = run(
+        partner_crud.create_service(
+            resource,
+            created.id,
+            ServiceCreate(
+                name="Pricey", price=Decimal(9000), currency=CurrencyEnum.RSD
+            ),
+        )
+    )
+    assert expensive is not None
+
+    partner = run(partner_crud.read_partner(resource, created.id))
+    assert partner is not None
+    assert (partner.service_count, partner.version) == (3, 3)
+    assert (partner.min_price, partner.max_price) == (Decimal(10), Decimal(9000))
+
+
+def test_service_writes_only_query_prices_to_narrow_the_range(
+    resource: DynamoDBServiceResource, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    created = run(partner_crud.create_partner(resource, partner_create(services=3)))
+    low, middle, _ = created.services
+    query_pages = partner_crud.query_pages
+    price_queries: list[Any] = []
+
+    def counting_query_pages(*args: Any, **kwargs: Any) -> Any:
+        if kwargs.get("ProjectionExpression") == "#id, #price":
+            price_queries.append(kwargs)
+        return query_pages(*args, **kwargs)
+
+    monkeypatch.setattr(partner_crud, "query_pages", counting_query_pages)
+
+    def price_range() -> tuple[Decimal | None, Decimal | None]:
+        partner = run(partner_crud.read_partner(resource, created.id))
+        assert partner is not None
+        return partner.min_price, partner.max_price
+
+    def set_price(service_id: str, price: int) -> None:
+        service_in = ServiceUpdate(price=Decimal(price))
+        run(partner_crud.update_service(resource, created.id, service_id, service_in))
+
+    cheap = ServiceCreate(name="Cheap", price=Decimal(10), currency=CurrencyEnum.RSD)
+    assert run(partner_crud.create_service(resource, created.id, cheap))
+    set_price(middle.id, 5000)
+    assert price_range() == (Decimal(10), Decimal(5000))
+    assert price_queries == []
+
+    set_price(middle.id, 1500)
+    assert price_range() == (Decimal(10), Decimal(1500))
+    assert len(price_queries) == 1
+    assert run(partner_crud.delete_service(resource, created.id, low.id))
+    assert price_range() == (Decimal(10), Decimal(1500))
+    assert len(price_queries) == 2
+
+
+def test_child_writes_retry_transaction_conflicts(
+    resource: DynamoDBServiceResource, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    created = run(partner_crud.create_partner(resource, partner_create()))
+    transact_write_items = resource.meta.client.transact_write_items
+    conflicts = [
+        client_error(
+            "TransactionCanceledException",
+            "Transaction cancelled",
+            "TransactWriteItems",
+            CancellationReasons=[{"Code": "None"}, {"Code": "TransactionConflict"}],
+        )
+    ]
+
+    async def conflict_once(**kwargs: Any) -> Any:
+        if conflicts:
+            raise conflicts.pop()
+        return await transact_write_items(**kwargs)
+
+    monkeypatch.setattr(resource.meta.client, "transact_write_items", conflict_once)
+    assert run(partner_crud.delete_staffer(resource, created.id, created.staff[0].id))
+    assert conflicts == []
+
+    partner = run(partner_crud.read_partner(resource, created.id))
+    assert partner is not None
+    assert (partner.staff, partner.staff_count) == ([], 0)
+
+
+def test_child_writes_increment_partner_version(
+    resource: DynamoDBServiceResource,
+) -> None:
+    created = run(partner_crud.create_partner(resource, partner_create(services=1)))
+    service = created.services[0]
+
+    def partner_version() -> int | None:
+        partner_crud.invalidate_partner(created.id)
+        version: int | None = run(
+            partner_crud.get_partner_version(resource, created.id)
+        )
+        return version
+
+    assert partner_version() == 1
+    updated = run(
+        partner_crud.update_service(
+            resource, created.id, service.id, ServiceUpdate(name="Renamed")
+        )
+    )
+    assert updated is not None
+    assert (updated.name, updated.price, updated.version) == ("Renamed", 1000, 2)
+    assert partner_version() == 2
+
+    with pytest.raises(partner_crud.VersionConflictError) as conflict:
+        run(
+            partner_crud.update_service(
+                resource,
+                created.id,
+                service.id,
+                ServiceUpdate(price=Decimal(500)),
+                expected_version=1,
+            )
+        )
+    assert conflict.value.current_version == 2
+    assert partner_version() == 2
+    with pytest.raises(partner_crud.VersionConflictError):
+        run(
+            partner_crud.delete_staffer(
+                resource, created.id, created.staff[0].id, expected_version=1
+            )
+        )
+    assert run(
+        partner_crud.delete_staffer(
+            resource, created.id, created.staff[0].id, expected_version=2
+        )
+    )
+    assert partner_version() == 3
+    assert run(partner_crud.get_partner_version(resource, "missing")) is None
@@ -0,0 +1,52 @@
+from typing import Any
+
+import pytest
+from types_aiobotocore_dynamodb import DynamoDBServiceResource
+
+from app.core.config import settings
+from app.core.dynamodb import dynamodb_pool
+from app.crud import partner as partner_crud
+from app.crud.partner_feed import partner_feed
+from app.models.dynamodb.partners import Partner
+from app.tests.core.test_change_feed import stream_record
+from app.tests.crud.test_partner import partner_create, run, search
+from app.tests.utils.dynamodb import fake_service_resource
+
+
+@pytest.fixture
+def resource() -> DynamoDBServiceResource:
+    return fake_service_resource(settings.DYNAMODB_TABLE_NAME)
+
+
+def partner_row(partner: Partner) -> dict[str, Any]:
+    return partner.to_dynamodb_item(exclude={"services", "staff"})
+
+
+def test_partner_feed_maintains_derived_items(
+    resource: DynamoDBServiceResource, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    async def open_pool() -> DynamoDBServiceResource:
+        return resource
+
+    monkeypatch.setattr(settings, "PARTNER_DERIVED_ITEMS_FROM_CHANGE_FEED", True)
+    monkeypatch.setattr(dynamodb_pool, "open", open_pool)
+    created = run(partner_crud.create_partner(resource, partner_create("Old Barber")))
+    assert search(resource, "barber") == []
+
+    renamed = created.model_copy(update={"name": "New Salon"})
+    records = [
+        stream_record(1, created.pk, partner_row(created)),
+        stream_record(2, created.pk, partner_row(renamed), partner_row(created)),
+    ]
+    run(partner_feed.dispatch(records))
+
+    assert search(resource, "barber") == []
+    found = search(resource, "new salon")
+    assert [posting.partner_id for posting in found] == [created.id]
+
+    run(
+        partner_feed.dispatch(
+            [stream_record(3, created.pk, None, partner_row(renamed))]
+        )
+    )
+    assert search(resource, "salon") == []
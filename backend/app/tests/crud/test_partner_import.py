@@ -0,0 +1,46 @@
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+
+from app.core.config import settings
+from app.crud.partner_import import import_partners, iter_lines
+from app.tests.crud.test_partner import partner_create
+from app.tests.utils.dynamodb import fake_service_resource
+
+
+async def stream(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(chunks: AsyncIterator[bytes]) -> list[bytes]:
+    return [line async for line in iter_lines(chunks)]
+
+
+def test_iter_lines_joins_lines_split_across_chunks() -> None:
+    lines = asyncio.run(collect(stream(b'{"a"', b": 1}\n{", b'"b": 2}\n\n{"c": 3}')))
+    assert lines == [b'{"a": 1}', b'{"b": 2}', b"", b'{"c": 3}']
+
+
+def test_iter_lines_without_trailing_newline() -> None:
+    assert asyncio.run(collect(stream(b"x\n", b"y"))) == [b"x", b"y"]
+    assert asyncio.run(collect(stream(b"x\n"))) == [b"x"]
+
+
+def test_import_partners_fails_when_the_writers_fail(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    resource = fake_service_resource(settings.DYNAMODB_TABLE_NAME)
+
+    async def batch_write_item(**_: Any) -> None:
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(resource.meta.client, "batch_write_item", batch_write_item)
+    line = partner_create(services=30).model_dump_json().encode() + b"\n"
+
+    # More lines than the queue holds, so the import would block on it.
+    import_task = import_partners(resource, stream(*[line] * 20), writers=1)
+    with pytest.raises(RuntimeError, match="connection lost"):
+        asyncio.run(asyncio.wait_for(import_task, timeout=5))
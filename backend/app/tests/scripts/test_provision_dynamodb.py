@@ -0,0 +1,69 @@
+import pytest
+
+from app.models.dynamodb.base import GlobalSecondaryIndex
+from app.models.dynamodb.partners import PARTNER_GEO_INDEX, PARTNER_NAME_INDEX
+from app.provision_dynamodb import (
+    declared_indexes,
+    index_definition,
+    item_classes,
+    plan_changes,
+    stream_specification,
+    table_definition,
+)
+
+
+def test_declared_indexes_cover_partner_query_patterns() -> None:
+    indexes = declared_indexes(item_classes())
+    assert indexes[PARTNER_NAME_INDEX.name] == PARTNER_NAME_INDEX
+    assert indexes[PARTNER_GEO_INDEX.name] == PARTNER_GEO_INDEX
+
+    definition = table_definition(indexes)
+    attributes = {a["AttributeName"] for a in definition["AttributeDefinitions"]}
+    assert {
+        "pk",
+        "sk",
+        "gsi_name_pk",
+        "gsi_sk",
+        "gsi_geo_pk",
+        "gsi_geo_sk",
+    } <= attributes
+
+
+def test_conflicting_index_definitions() -> None:
+    class Other:
+        global_secondary_indexes = (
+            GlobalSecondaryIndex(PARTNER_NAME_INDEX.name, "item_type", "sk"),
+        )
+
+    with pytest.raises(ValueError):
+        declared_indexes([*item_classes(), Other])  # type: ignore[list-item]
+
+
+def test_plan_changes() -> None:
+    indexes = {index.name: index for index in (PARTNER_NAME_INDEX, PARTNER_GEO_INDEX)}
+    changed_name_index = index_definition(PARTNER_NAME_INDEX)
+    changed_name_index["Projection"] = {"ProjectionType": "KEYS_ONLY"}
+    description = {
+        "BillingModeSummary": {"BillingMode": "PAY_PER_REQUEST"},
+        "GlobalSecondaryIndexes": [
+            changed_name_index,
+            {**index_definition(PARTNER_GEO_INDEX), "IndexName": "old-index"},
+        ],
+    }
+
+    plan = plan_changes(description, indexes)
+    assert plan.create_indexes == [PARTNER_GEO_INDEX]
+    assert plan.changed_indexes == [PARTNER_NAME_INDEX.name]
+    assert plan.undeclared_indexes == ["old-index"]
+    assert not plan.update_billing_mode
+    assert plan.update_stream
+
+    up_to_date = {
+        "BillingModeSummary": {"BillingMode": "PAY_PER_REQUEST"},
+        "StreamSpecification": stream_specification(),
+        "GlobalSecondaryIndexes": [
+            {**index_definition(index), "IndexStatus": "ACTIVE"}
+            for index in indexes.values()
+        ],
+    }
+    assert plan_changes(up_to_date, indexes).is_empty()
@@ -0,0 +1,672 @@
+"""
+In-process stand-in for the parts of the aioboto3 DynamoDB service resource
+that `app.crud` uses, so crud code can be tested and benchmarked without
+DynamoDB Local.
+
+Covered: `Table(...)` with get_item, put_item, update_item, delete_item,
+query (table and GSIs, key conditions, filters, projections, pagination) and
+batch_writer, and `meta.client` with batch_get_item, batch_write_item and
+transact_write_items. Conditional failures, cancelled transactions and
+invalid expressions raise the `ClientError`s DynamoDB would, with stored
+items in error responses in their raw typed form, as the resource returns
+them. Values go through boto3's type serializer on the way in and out, so
+floats are rejected and numbers come back as `Decimal`.
+
+Not modelled: capacity, the 1 MB page limit, eventual consistency of GSIs,
+TTL, streams and idempotency tokens.
+"""
+
+import bisect
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, cast
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+from types_aiobotocore_dynamodb import DynamoDBServiceResource
+
+from app.models.dynamodb.base import GlobalSecondaryIndex
+from app.models.dynamodb.partners import Partner
+from app.tests.utils.dynamodb_expressions import (
+    And,
+    Compare,
+    ExpressionError,
+    Path,
+    Placeholders,
+    Value,
+    apply_update,
+    evaluate_condition,
+    parse_condition,
+    parse_projection,
+    parse_update,
+    project,
+)
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+# DynamoDB's per-call limits.
+BATCH_GET_SIZE = 100
+BATCH_WRITE_SIZE = 25
+TRANSACTION_SIZE = 100
+
+
+@contextmanager
+def expression_errors(operation: str) -> Iterator[None]:
+    """Turns `ExpressionError`s into the ValidationException DynamoDB raises."""
+    try:
+        yield
+    except ExpressionError as e:
+        raise validation_error(str(e), operation) from e
+
+
+def client_error(
+    code: str, message: str, operation: str, **response: Any
+) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": code, "Message": message}, **response},  # type: ignore[typeddict-item]
+        operation,
+    )
+
+
+def validation_error(message: str, operation: str) -> ClientError:
+    return client_error("ValidationException", message, operation)
+
+
+@dataclass
+class _Record:
+    """A stored item, typed as on the wire and deserialized for expressions."""
+
+    wire: dict[str, Any]
+    item: dict[str, Any]
+
+    @classmethod
+    def from_item(cls, item: dict[str, Any]) -> "_Record":
+        wire = {key: _serializer.serialize(value) for key, value in item.items()}
+        return cls(wire=wire, item=cls.deserialize(wire))
+
+    @staticmethod
+    def deserialize(wire: dict[str, Any]) -> dict[str, Any]:
+        return {key: _deserializer.deserialize(value) for key, value in wire.items()}
+
+
+@dataclass
+class _Partition:
+    """Items of one partition of the table or an index, in sort key order."""
+
+    keys: list[Any] = field(default_factory=list)
+    records: dict[Any, _Record] = field(default_factory=dict)
+
+    def put(self, key: Any, record: _Record) -> None:
+        if key not in self.records:
+            bisect.insort(self.keys, key)
+        self.records[key] = record
+
+    def delete(self, key: Any) -> None:
+        if self.records.pop(key, None) is not None:
+            del self.keys[bisect.bisect_left(self.keys, key)]
+
+
+class FakeTable:
+    """One table with a `pk`/`sk` primary key and GSIs projecting all attributes."""
+
+    def __init__(
+        self,
+        name: str,
+        global_secondary_indexes: Iterable[GlobalSecondaryIndex] = (),
+        partition_key: str = "pk",
+        sort_key: str = "sk",
+    ) -> None:
+        self.name = name
+        self.partition_key = partition_key
+        self.sort_key = sort_key
+        self.global_secondary_indexes = {
+            index.name: index for index in global_secondary_indexes
+        }
+        self._partitions: dict[Any, _Partition] = {}
+        self._index_partitions: dict[str, dict[Any, _Partition]] = {
+            name: {} for name in self.global_secondary_indexes
+        }
+
+    def __len__(self) -> int:
+        return sum(len(partition.records) for partition in self._partitions.values())
+
+    # Storage
+
+    def key_of(self, item: dict[str, Any], operation: str) -> tuple[Any, Any]:
+        try:
+            return item[self.partition_key], item[self.sort_key]
+        except KeyError:
+            raise validation_error(
+                "The provided key element does not match the schema", operation
+            ) from None
+
+    def record(self, key: tuple[Any, Any]) -> _Record | None:
+        partition = self._partitions.get(key[0])
+        return partition.records.get(key[1]) if partition else None
+
+    def store(self, key: tuple[Any, Any], record: _Record | None) -> None:
+        old = self.record(key)
+        if old is not None:
+            self._partitions[key[0]].delete(key[1])
+            self._index(old, key, remove=True)
+        if record is not None:
+            self._partitions.setdefault(key[0], _Partition()).put(key[1], record)
+            self._index(record, key)
+
+    def _index(
+        self, record: _Record, key: tuple[Any, Any], remove: bool = False
+    ) -> None:
+        for name, index in self.global_secondary_indexes.items():
+            index_pk = record.item.get(index.partition_key)
+            index_sk = record.item.get(index.sort_key)
+            if index_pk is None or index_sk is None:
+                continue
+            partitions = self._index_partitions[name]
+            index_key = (index_sk, *key)
+            if remove:
+                partitions[index_pk].delete(index_key)
+            else:
+                partitions.setdefault(index_pk, _Partition()).put(index_key, record)
+
+    def check_condition(
+        self,
+        key: tuple[Any, Any],
+        condition: Any,
+        return_old: bool,
+        operation: str,
+    ) -> None:
+        """Raises ConditionalCheckFailedException if `condition` does not hold."""
+        if condition is None:
+            return
+        record = self.record(key)
+        if evaluate_condition(condition, record.item if record else {}):
+            return
+        response: dict[str, Any] = {}
+        if return_old and record is not None:
+            response["Item"] = record.wire
+        raise client_error(
+            "ConditionalCheckFailedException",
+            "The conditional request failed",
+            operation,
+            **response,
+        )
+
+    # Table API
+
+    async def get_item(
+        self,
+        Key: dict[str, Any],
+        ProjectionExpression: str | None = None,
+        ExpressionAttributeNames: dict[str, str] | None = None,
+        ConsistentRead: bool = False,  # noqa: ARG002
+    ) -> dict[str, Any]:
+        with expression_errors("GetItem"):
+            placeholders = Placeholders(ExpressionAttributeNames)
+            paths = (
+                parse_projection(ProjectionExpression, placeholders)
+                if ProjectionExpression
+                else None
+            )
+            placeholders.check_all_used()
+        record = self.record(self.key_of(Key, "GetItem"))
+        if record is None:
+            return {}
+        item = _Record.deserialize(record.wire)
+        return {"Item": project(item, paths) if paths is not None else item}
+
+    async def put_item(
+        self,
+        Item: dict[str, Any],
+        ConditionExpression: str | None = None,
+        ExpressionAttributeNames: dict[str, str] | None = None,
+        ExpressionAttributeValues: dict[str, Any] | None = None,
+        ReturnValues: str = "NONE",
+        ReturnValuesOnConditionCheckFailure: str = "NONE",
+    ) -> dict[str, Any]:
+        key = self.key_of(Item, "PutItem")
+        with expression_errors("PutItem"):
+            placeholders = Placeholders(
+                ExpressionAttributeNames, ExpressionAttributeValues
+            )
+            condition = parse_condition(ConditionExpression, placeholders)
+            placeholders.check_all_used()
+        self.check_condition(
+            key, condition, ReturnValuesOnConditionCheckFailure == "ALL_OLD", "PutItem"
+        )
+        with expression_errors("PutItem"):
+            new_record = _Record.from_item(Item)
+        old = self.record(key)
+        self.store(key, new_record)
+        if ReturnValues == "ALL_OLD" and old is not None:
+            return {"Attributes": _Record.deserialize(old.wire)}
+        return {}
+
+    async def update_item(
+        self,
+        Key: dict[str, Any],
+        UpdateExpression: str,
+        ConditionExpression: str | None = None,
+        ExpressionAttributeNames: dict[str, str] | None = None,
+        ExpressionAttributeValues: dict[str, Any] | None = None,
+        ReturnValues: str = "NONE",
+        ReturnValuesOnConditionCheckFailure: str = "NONE",
+    ) -> dict[str, Any]:
+        key = self.key_of(Key, "UpdateItem")
+        with expression_errors("UpdateItem"):
+            placeholders = Placeholders(
+                ExpressionAttributeNames, ExpressionAttributeValues
+            )
+            actions = parse_update(UpdateExpression, placeholders)
+            condition = parse_condition(ConditionExpression, placeholders)
+            placeholders.check_all_used()
+        self.check_condition(
+            key,
+            condition,
+            ReturnValuesOnConditionCheckFailure == "ALL_OLD",
+            "UpdateItem",
+        )
+        with expression_errors("UpdateItem"):
+            if any(
+                action.path.elements[0] in (self.partition_key, self.sort_key)
+                for action in actions
+            ):
+                raise ExpressionError(
+                    "One or more parameter values were invalid: Cannot update "
+                    "attribute pk. This attribute is part of the key"
+                )
+            old = self.record(key)
+            base = old.item if old else {**Key}
+            updated, touched = apply_update(base, actions)
+            new_record = _Record.from_item(updated)
+        self.store(key, new_record)
+        if ReturnValues == "NONE":
+            return {}
+        return {
+            "Attributes": self._return_values(ReturnValues, old, new_record, touched)
+        }
+
+    @staticmethod
+    def _return_values(
+        return_values: str,
+        old: _Record | None,
+        new: _Record,
+        touched: set[str],
+    ) -> dict[str, Any]:
+        record = new if return_values in ("ALL_NEW", "UPDATED_NEW") else old
+        if record is None:
+            return {}
+        item = _Record.deserialize(record.wire)
+        if return_values.startswith("UPDATED_"):
+            return {key: value for key, value in item.items() if key in touched}
+        return item
+
+    async def delete_item(
+        self,
+        Key: dict[str, Any],
+        ConditionExpression: str | None = None,
+        ExpressionAttributeNames: dict[str, str] | None = None,
+        ExpressionAttributeValues: dict[str, Any] | None = None,
+        ReturnValues: str = "NONE",
+        ReturnValuesOnConditionCheckFailure: str = "NONE",
+    ) -> dict[str, Any]:
+        key = self.key_of(Key, "DeleteItem")
+        with expression_errors("DeleteItem"):
+            placeholders = Placeholders(
+                ExpressionAttributeNames, ExpressionAttributeValues
+            )
+            condition = parse_condition(ConditionExpression, placeholders)
+            placeholders.check_all_used()
+        self.check_condition(
+            key,
+            condition,
+            ReturnValuesOnConditionCheckFailure == "ALL_OLD",
+            "DeleteItem",
+        )
+        old = self.record(key)
+        self.store(key, None)
+        if ReturnValues == "ALL_OLD" and old is not None:
+            return {"Attributes": _Record.deserialize(old.wire)}
+        return {}
+
+    async def query(
+        self,
+        KeyConditionExpression: str,
+        IndexName: str | None = None,
+        FilterExpression: str | None = None,
+        ProjectionExpression: str | None = None,
+        ExpressionAttributeNames: dict[str, str] | None = None,
+        ExpressionAttributeValues: dict[str, Any] | None = None,
+        Limit: int | None = None,
+        ExclusiveStartKey: dict[str, Any] | None = None,
+        ScanIndexForward: bool = True,
+        ConsistentRead: bool = False,  # noqa: ARG002
+        Select: str = "ALL_ATTRIBUTES",
+    ) -> dict[str, Any]:
+        with expression_errors("Query"):
+            placeholders = Placeholders(
+                ExpressionAttributeNames, ExpressionAttributeValues
+            )
+            if IndexName is None:
+                partitions = self._partitions
+                partition_key, sort_key = self.partition_key, self.sort_key
+            elif IndexName in self.global_secondary_indexes:
+                index = self.global_secondary_indexes[IndexName]
+                partitions = self._index_partitions[IndexName]
+                partition_key, sort_key = index.partition_key, index.sort_key
+            else:
+                raise ExpressionError(
+                    "The table does not have the specified index: " + IndexName
+                )
+            partition_value, sort_condition = split_key_condition(
+                parse_condition(KeyConditionExpression, placeholders),
+                partition_key,
+            )
+            filter_node = (
+                parse_condition(FilterExpression, placeholders)
+                if FilterExpression
+                else None
+            )
+            paths = (
+                parse_projection(ProjectionExpression, placeholders)
+                if ProjectionExpression
+                else None
+            )
+            placeholders.check_all_used()
+            if Limit is not None and Limit < 1:
+                raise ExpressionError("Limit must be greater than or equal to 1")
+
+        partition = partitions.get(partition_value) or _Partition()
+        keys = partition.keys
+        if ExclusiveStartKey is None:
+            positions: Iterable[int] = (
+                range(len(keys)) if ScanIndexForward else range(len(keys) - 1, -1, -1)
+            )
+        else:
+            start_key: Any = ExclusiveStartKey[sort_key]
+            if IndexName is not None:
+                start_key = (
+                    start_key,
+                    ExclusiveStartKey[self.partition_key],
+                    ExclusiveStartKey[self.sort_key],
+                )
+            positions = (
+                range(bisect.bisect_right(keys, start_key), len(keys))
+                if ScanIndexForward
+                else range(bisect.bisect_left(keys, start_key) - 1, -1, -1)
+            )
+
+        items: list[dict[str, Any]] = []
+        scanned = 0
+        last: _Record | None = None
+        matched = False
+        for position in positions:
+            record = partition.records[keys[position]]
+            if sort_condition is not None and not evaluate_condition(
+                sort_condition, record.item
+            ):
+                if matched:
+                    # Sort key conditions select one contiguous range.
+                    last = None
+                    break
+                continue
+            matched = True
+            scanned += 1
+            last = record
+            if filter_node is None or evaluate_condition(filter_node, record.item):
+                item = _Record.deserialize(record.wire)
+                items.append(project(item, paths) if paths is not None else item)
+            if Limit is not None and scanned == Limit:
+                break
+        else:
+            last = None
+
+        response: dict[str, Any] = {"Count": len(items), "ScannedCount": scanned}
+        if Select != "COUNT":
+            response["Items"] = items
+        if last is not None:
+            key_attributes = {self.partition_key, self.sort_key}
+            if IndexName is not None:
+                key_attributes |= {partition_key, sort_key}
+            response["LastEvaluatedKey"] = {
+                attribute: last.item[attribute] for attribute in key_attributes
+            }
+        return response
+
+    def batch_writer(self) -> "FakeBatchWriter":
+        return FakeBatchWriter(self)
+
+    # Actions of batches and transactions
+
+    def write_request(self, request: dict[str, Any]) -> None:
+        if "PutRequest" in request:
+            item = request["PutRequest"]["Item"]
+            self.store(self.key_of(item, "BatchWriteItem"), _Record.from_item(item))
+        else:
+            key = request["DeleteRequest"]["Key"]
+            self.store(self.key_of(key, "BatchWriteItem"), None)
+
+
+def split_key_condition(node: Any, partition_key: str) -> tuple[Any, Any]:
+    """
+    Splits a key condition into the partition key value and the condition on
+    the sort key, if any.
+    """
+
+    def partition_value(condition: Any) -> Any:
+        if (
+            isinstance(condition, Compare)
+            and condition.operator == "="
+            and condition.left == Path((partition_key,))
+            and isinstance(condition.right, Value)
+        ):
+            return condition.right.value
+        return None
+
+    value = partition_value(node)
+    if value is not None:
+        return value, None
+    if isinstance(node, And):
+        for condition, other in ((node.left, node.right), (node.right, node.left)):
+            value = partition_value(condition)
+            if value is not None:
+                return value, other
+    raise ExpressionError("Query condition missed key schema element: " + partition_key)
+
+
+class FakeBatchWriter:
+    """Applies each write immediately; DynamoDB's writer flushes in batches."""
+
+    def __init__(self, table: FakeTable) -> None:
+        self._table = table
+
+    async def __aenter__(self) -> "FakeBatchWriter":
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        return None
+
+    async def put_item(self, Item: dict[str, Any]) -> None:
+        self._table.write_request({"PutRequest": {"Item": Item}})
+
+    async def delete_item(self, Key: dict[str, Any]) -> None:
+        self._table.write_request({"DeleteRequest": {"Key": Key}})
+
+
+class FakeDynamoDBClient:
+    """The batch and transaction calls of `resource.meta.client`."""
+
+    def __init__(self, tables: dict[str, FakeTable]) -> None:
+        self._tables = tables
+
+    def table(self, name: str, operation: str) -> FakeTable:
+        if name not in self._tables:
+            raise client_error(
+                "ResourceNotFoundException",
+                "Requested resource not found",
+                operation,
+            )
+        return self._tables[name]
+
+    async def batch_get_item(
+        self, RequestItems: dict[str, dict[str, Any]]
+    ) -> dict[str, Any]:
+        if not RequestItems or (
+            sum(len(request["Keys"]) for request in RequestItems.values())
+            > BATCH_GET_SIZE
+        ):
+            raise validation_error(
+                "Too many items requested for the BatchGetItem call", "BatchGetItem"
+            )
+        responses: dict[str, list[dict[str, Any]]] = {}
+        for name, request in RequestItems.items():
+            table = self.table(name, "BatchGetItem")
+            kwargs = {
+                key: request[key]
+                for key in ("ProjectionExpression", "ExpressionAttributeNames")
+                if key in request
+            }
+            responses[name] = []
+            for key in request["Keys"]:
+                response = await table.get_item(Key=key, **kwargs)
+                if "Item" in response:
+                    responses[name].append(response["Item"])
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    async def batch_write_item(
+        self, RequestItems: dict[str, list[dict[str, Any]]]
+    ) -> dict[str, Any]:
+        requests = [
+            (self.table(name, "BatchWriteItem"), request)
+            for name, table_requests in RequestItems.items()
+            for request in table_requests
+        ]
+        if not requests or len(requests) > BATCH_WRITE_SIZE:
+            raise validation_error(
+                "Too many items requested for the BatchWriteItem call",
+                "BatchWriteItem",
+            )
+        for table, request in requests:
+            table.write_request(request)
+        return {"UnprocessedItems": {}}
+
+    async def transact_write_items(
+        self,
+        TransactItems: list[dict[str, Any]],
+        ClientRequestToken: str | None = None,  # noqa: ARG002
+    ) -> dict[str, Any]:
+        operation = "TransactWriteItems"
+        if not TransactItems or len(TransactItems) > TRANSACTION_SIZE:
+            raise validation_error(
+                "Member must have length less than or equal to 100", operation
+            )
+
+        actions: list[tuple[FakeTable, tuple[Any, Any], str, dict[str, Any]]] = []
+        keys: set[tuple[str, Any, Any]] = set()
+        with expression_errors(operation):
+            for transact_item in TransactItems:
+                (action, request), *_ = transact_item.items()
+                table = self.table(request["TableName"], operation)
+                key = table.key_of(
+                    request["Item"] if action == "Put" else request["Key"], operation
+                )
+                if (table.name, *key) in keys:
+                    raise ExpressionError(
+                        "Transaction request cannot include multiple operations "
+                        "on one item"
+                    )
+                keys.add((table.name, *key))
+                actions.append((table, key, action, request))
+
+            reasons = [
+                self.check(table, key, request) for table, key, _, request in actions
+            ]
+            if any(reason["Code"] != "None" for reason in reasons):
+                codes = ", ".join(reason["Code"] for reason in reasons)
+                raise client_error(
+                    "TransactionCanceledException",
+                    "Transaction cancelled, please refer cancellation reasons "
+                    f"for specific reasons [{codes}]",
+                    operation,
+                    CancellationReasons=reasons,
+                )
+            # Every action sees the items as they were before the transaction.
+            planned = [self.plan(*action) for action in actions]
+
+        for table, key, record in planned:
+            table.store(key, record)
+        return {}
+
+    @staticmethod
+    def plan(
+        table: FakeTable, key: tuple[Any, Any], action: str, request: dict[str, Any]
+    ) -> tuple[FakeTable, tuple[Any, Any], _Record | None]:
+        old = table.record(key)
+        if action == "Put":
+            return table, key, _Record.from_item(request["Item"])
+        if action == "Delete":
+            return table, key, None
+        if action == "ConditionCheck":
+            return table, key, old
+        if action != "Update":
+            raise ExpressionError(f"Unknown transaction action {action}")
+
+        placeholders = Placeholders(
+            request.get("ExpressionAttributeNames"),
+            request.get("ExpressionAttributeValues"),
+        )
+        actions = parse_update(request["UpdateExpression"], placeholders)
+        updated, _ = apply_update(old.item if old else {**request["Key"]}, actions)
+        return table, key, _Record.from_item(updated)
+
+    @staticmethod
+    def check(
+        table: FakeTable, key: tuple[Any, Any], request: dict[str, Any]
+    ) -> dict[str, Any]:
+        """Returns the cancellation reason of one action, "None" if it can run."""
+        placeholders = Placeholders(
+            request.get("ExpressionAttributeNames"),
+            request.get("ExpressionAttributeValues"),
+        )
+        if "UpdateExpression" in request:
+            parse_update(request["UpdateExpression"], placeholders)
+        condition = parse_condition(request.get("ConditionExpression"), placeholders)
+        placeholders.check_all_used()
+        try:
+            table.check_condition(
+                key,
+                condition,
+                request.get("ReturnValuesOnConditionCheckFailure") == "ALL_OLD",
+                "TransactWriteItems",
+            )
+        except ClientError as e:
+            reason = {
+                "Code": "ConditionalCheckFailed",
+                "Message": "The conditional request failed",
+            }
+            if "Item" in e.response:
+                reason["Item"] = e.response["Item"]  # type: ignore[typeddict-item]
+            return reason
+        return {"Code": "None"}
+
+
+class FakeDynamoDBResource:
+    """Drop-in for the aioboto3 service resource over in-memory tables."""
+
+    def __init__(self, tables: Iterable[FakeTable]) -> None:
+        self.tables = {table.name: table for table in tables}
+        self.meta = SimpleNamespace(client=FakeDynamoDBClient(self.tables))
+
+    async def Table(self, name: str) -> FakeTable:  # noqa: N802
+        return self.meta.client.table(name, "DescribeTable")  # type: ignore[no-any-return]
+
+
+def fake_service_resource(table_name: str) -> DynamoDBServiceResource:
+    """
+    Returns an in-memory resource with an empty `table_name` table carrying
+    the partner GSIs, typed as the real resource for crud functions.
+    """
+    table = FakeTable(table_name, Partner.global_secondary_indexes)
+    return cast(DynamoDBServiceResource, FakeDynamoDBResource([table]))
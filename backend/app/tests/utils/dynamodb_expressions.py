@@ -0,0 +1,716 @@
+"""
+Parser and evaluator for the DynamoDB expression language, covering what the
+in-memory table in `app.tests.utils.dynamodb` needs: condition, filter and
+key condition expressions, update expressions and projection expressions.
+
+Expressions are parsed into small node trees and evaluated against items in
+their deserialized form (numbers as `Decimal`, sets as `set`).
+"""
+
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any
+
+PathElement = str | int
+
+
+class ExpressionError(ValueError):
+    """An expression DynamoDB would reject with a ValidationException."""
+
+
+class _Missing:
+    def __repr__(self) -> str:
+        return "MISSING"
+
+
+MISSING: Any = _Missing()
+
+_TOKEN_RE = re.compile(
+    r"""\s*(?:
+    (?P<name>\#[A-Za-z0-9_]+)
+    |(?P<value>:[A-Za-z0-9_]+)
+    |(?P<number>\d+)
+    |(?P<op><>|<=|>=|=|<|>|\(|\)|\[|\]|,|\.|\+|-)
+    |(?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    )""",
+    re.VERBOSE,
+)
+_COMPARATORS = {"=", "<>", "<", "<=", ">", ">="}
+
+
+@dataclass(frozen=True)
+class Path:
+    elements: tuple[PathElement, ...]
+
+
+@dataclass(frozen=True)
+class Value:
+    value: Any
+
+
+@dataclass(frozen=True)
+class Size:
+    path: Path
+
+
+@dataclass(frozen=True)
+class Compare:
+    operator: str
+    left: Any
+    right: Any
+
+
+@dataclass(frozen=True)
+class Between:
+    operand: Any
+    low: Any
+    high: Any
+
+
+@dataclass(frozen=True)
+class In:
+    operand: Any
+    options: tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class Function:
+    name: str
+    args: tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class And:
+    left: Any
+    right: Any
+
+
+@dataclass(frozen=True)
+class Or:
+    left: Any
+    right: Any
+
+
+@dataclass(frozen=True)
+class Not:
+    condition: Any
+
+
+@dataclass(frozen=True)
+class IfNotExists:
+    path: Path
+    default: Any
+
+
+@dataclass(frozen=True)
+class ListAppend:
+    left: Any
+    right: Any
+
+
+@dataclass(frozen=True)
+class Arithmetic:
+    operator: str
+    left: Any
+    right: Any
+
+
+@dataclass(frozen=True)
+class UpdateAction:
+    action: str
+    path: Path
+    value: Any = None
+
+
+class Placeholders:
+    """
+    Resolves `#name` and `:value` placeholders for the expressions of one
+    call and remembers which were used, since DynamoDB rejects unused ones.
+    """
+
+    def __init__(
+        self,
+        names: dict[str, str] | None = None,
+        values: dict[str, Any] | None = None,
+    ) -> None:
+        self.names = names or {}
+        self.values = values or {}
+        self._used_names: set[str] = set()
+        self._used_values: set[str] = set()
+
+    def name(self, placeholder: str) -> str:
+        if placeholder not in self.names:
+            raise ExpressionError(
+                f"An expression attribute name used in the document path is "
+                f"not defined; attribute name: {placeholder}"
+            )
+        self._used_names.add(placeholder)
+        return self.names[placeholder]
+
+    def value(self, placeholder: str) -> Any:
+        if placeholder not in self.values:
+            raise ExpressionError(
+                f"An expression attribute value used in expression is not "
+                f"defined; attribute value: {placeholder}"
+            )
+        self._used_values.add(placeholder)
+        return self.values[placeholder]
+
+    def check_all_used(self) -> None:
+        unused_names = set(self.names) - self._used_names
+        if unused_names:
+            raise ExpressionError(
+                "Value provided in ExpressionAttributeNames unused in "
+                f"expressions: keys: {{{', '.join(sorted(unused_names))}}}"
+            )
+        unused_values = set(self.values) - self._used_values
+        if unused_values:
+            raise ExpressionError(
+                "Value provided in ExpressionAttributeValues unused in "
+                f"expressions: keys: {{{', '.join(sorted(unused_values))}}}"
+            )
+
+
+class _Parser:
+    def __init__(self, expression: str, placeholders: Placeholders) -> None:
+        self.tokens = self._tokenize(expression)
+        self.position = 0
+        self.placeholders = placeholders
+
+    @staticmethod
+    def _tokenize(expression: str) -> list[tuple[str, str]]:
+        tokens: list[tuple[str, str]] = []
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = _TOKEN_RE.match(expression, position)
+            if not match or match.end() == position:
+                raise ExpressionError(
+                    f"Invalid expression: unexpected character at {position}: "
+                    f"{expression!r}"
+                )
+            kind = match.lastgroup
+            assert kind is not None
+            tokens.append((kind, match.group(kind)))
+            position = match.end()
+        return tokens
+
+    def peek(self, offset: int = 0) -> tuple[str, str] | None:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def peek_keyword(self, *keywords: str) -> bool:
+        token = self.peek()
+        return token is not None and token[0] == "word" and token[1].upper() in keywords
+
+    def peek_op(self, *ops: str) -> bool:
+        token = self.peek()
+        return token is not None and token[0] == "op" and token[1] in ops
+
+    def next(self) -> tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise ExpressionError("Invalid expression: unexpected end of input")
+        self.position += 1
+        return token
+
+    def expect_op(self, op: str) -> None:
+        kind, text = self.next()
+        if kind != "op" or text != op:
+            raise ExpressionError(f"Invalid expression: expected {op!r}, got {text!r}")
+
+    def done(self) -> bool:
+        return self.position == len(self.tokens)
+
+    def finish(self) -> None:
+        token = self.peek()
+        if token is not None:
+            raise ExpressionError(f"Invalid expression: unexpected token {token[1]!r}")
+
+    # Conditions
+
+    def condition(self) -> Any:
+        node = self.conjunction()
+        while self.peek_keyword("OR"):
+            self.next()
+            node = Or(node, self.conjunction())
+        return node
+
+    def conjunction(self) -> Any:
+        node = self.negation()
+        while self.peek_keyword("AND"):
+            self.next()
+            node = And(node, self.negation())
+        return node
+
+    def negation(self) -> Any:
+        if self.peek_keyword("NOT"):
+            self.next()
+            return Not(self.negation())
+        return self.predicate()
+
+    def predicate(self) -> Any:
+        if self.peek_op("("):
+            self.next()
+            node = self.condition()
+            self.expect_op(")")
+            return node
+
+        token = self.peek()
+        next_token = self.peek(1)
+        if (
+            token is not None
+            and token[0] == "word"
+            and token[1] != "size"
+            and next_token == ("op", "(")
+        ):
+            return self.function()
+
+        operand = self.operand()
+        if self.peek_op(*_COMPARATORS):
+            operator = self.next()[1]
+            return Compare(operator, operand, self.operand())
+        if self.peek_keyword("BETWEEN"):
+            self.next()
+            low = self.operand()
+            if not self.peek_keyword("AND"):
+                raise ExpressionError("Invalid expression: BETWEEN without AND")
+            self.next()
+            return Between(operand, low, self.operand())
+        if self.peek_keyword("IN"):
+            self.next()
+            self.expect_op("(")
+            options = [self.operand()]
+            while self.peek_op(","):
+                self.next()
+                options.append(self.operand())
+            self.expect_op(")")
+            return In(operand, tuple(options))
+        raise ExpressionError("Invalid expression: expected a comparison")
+
+    def function(self) -> Function:
+        name = self.next()[1]
+        if name not in {
+            "attribute_exists",
+            "attribute_not_exists",
+            "attribute_type",
+            "begins_with",
+            "contains",
+        }:
+            raise ExpressionError(f"Invalid function name; function: {name}")
+        self.expect_op("(")
+        args = [self.operand()]
+        while self.peek_op(","):
+            self.next()
+            args.append(self.operand())
+        self.expect_op(")")
+        if not isinstance(args[0], Path):
+            raise ExpressionError(f"Invalid first argument of {name}")
+        return Function(name, tuple(args))
+
+    def operand(self) -> Any:
+        token = self.peek()
+        if token == ("word", "size") and self.peek(1) == ("op", "("):
+            self.next()
+            self.expect_op("(")
+            path = self.path()
+            self.expect_op(")")
+            return Size(path)
+        if token is not None and token[0] == "value":
+            self.next()
+            return Value(self.placeholders.value(token[1]))
+        return self.path()
+
+    def path(self) -> Path:
+        elements: list[PathElement] = [self.attribute_name()]
+        while self.peek_op(".", "["):
+            if self.next()[1] == ".":
+                elements.append(self.attribute_name())
+                continue
+            kind, text = self.next()
+            if kind != "number":
+                raise ExpressionError("Invalid expression: list index expected")
+            elements.append(int(text))
+            self.expect_op("]")
+        return Path(tuple(elements))
+
+    def attribute_name(self) -> str:
+        kind, text = self.next()
+        if kind == "name":
+            return self.placeholders.name(text)
+        if kind == "word":
+            return text
+        raise ExpressionError(
+            f"Invalid expression: attribute name expected, got {text!r}"
+        )
+
+    # Updates
+
+    def update(self) -> list[UpdateAction]:
+        actions: list[UpdateAction] = []
+        seen: set[str] = set()
+        while not self.done():
+            kind, text = self.next()
+            clause = text.upper()
+            if kind != "word" or clause not in {"SET", "REMOVE", "ADD", "DELETE"}:
+                raise ExpressionError(f"Invalid UpdateExpression: unexpected {text!r}")
+            if clause in seen:
+                raise ExpressionError(
+                    f'Invalid UpdateExpression: The "{clause}" section can only '
+                    "be used once in an update expression"
+                )
+            seen.add(clause)
+            while True:
+                actions.append(self.update_action(clause))
+                if not self.peek_op(","):
+                    break
+                self.next()
+        if not actions:
+            raise ExpressionError("Invalid UpdateExpression: empty expression")
+        return actions
+
+    def update_action(self, clause: str) -> UpdateAction:
+        path = self.path()
+        if clause == "SET":
+            self.expect_op("=")
+            return UpdateAction(clause, path, self.set_value())
+        if clause == "REMOVE":
+            return UpdateAction(clause, path)
+        kind, text = self.next()
+        if kind != "value":
+            raise ExpressionError(f"Invalid UpdateExpression: {clause} needs a value")
+        return UpdateAction(clause, path, Value(self.placeholders.value(text)))
+
+    def set_value(self) -> Any:
+        node = self.set_term()
+        if self.peek_op("+", "-"):
+            operator = self.next()[1]
+            node = Arithmetic(operator, node, self.set_term())
+        return node
+
+    def set_term(self) -> Any:
+        token = self.peek()
+        if token is not None and token[0] == "word" and self.peek(1) == ("op", "("):
+            name = self.next()[1]
+            self.expect_op("(")
+            if name == "if_not_exists":
+                path = self.path()
+                self.expect_op(",")
+                default = self.set_value()
+                self.expect_op(")")
+                return IfNotExists(path, default)
+            if name == "list_append":
+                left = self.set_value()
+                self.expect_op(",")
+                right = self.set_value()
+                self.expect_op(")")
+                return ListAppend(left, right)
+            raise ExpressionError(f"Invalid function name; function: {name}")
+        return self.operand()
+
+
+def parse_condition(expression: str | None, placeholders: Placeholders) -> Any:
+    """Returns the parsed condition, or None for no condition."""
+    if expression is None:
+        return None
+    parser = _Parser(expression, placeholders)
+    node = parser.condition()
+    parser.finish()
+    return node
+
+
+def parse_update(expression: str, placeholders: Placeholders) -> list[UpdateAction]:
+    parser = _Parser(expression, placeholders)
+    return parser.update()
+
+
+def parse_projection(expression: str, placeholders: Placeholders) -> list[Path]:
+    parser = _Parser(expression, placeholders)
+    paths = [parser.path()]
+    while parser.peek_op(","):
+        parser.next()
+        paths.append(parser.path())
+    parser.finish()
+    return paths
+
+
+# Evaluation
+
+
+def get_path(item: dict[str, Any], path: Path) -> Any:
+    value: Any = item
+    for element in path.elements:
+        if isinstance(element, int):
+            if not isinstance(value, list) or element >= len(value):
+                return MISSING
+        elif not isinstance(value, dict) or element not in value:
+            return MISSING
+        value = value[element]
+    return value
+
+
+def set_path(item: dict[str, Any], path: Path, value: Any) -> None:
+    parent = get_path(item, Path(path.elements[:-1]))
+    last = path.elements[-1]
+    if isinstance(last, int) and isinstance(parent, list):
+        if last < len(parent):
+            parent[last] = value
+        else:
+            parent.append(value)
+        return
+    if isinstance(last, str) and isinstance(parent, dict):
+        parent[last] = value
+        return
+    raise ExpressionError(
+        "The document path provided in the update expression is invalid for update"
+    )
+
+
+def remove_path(item: dict[str, Any], path: Path) -> None:
+    parent = get_path(item, Path(path.elements[:-1]))
+    last = path.elements[-1]
+    if isinstance(last, int) and isinstance(parent, list) and last < len(parent):
+        del parent[last]
+    elif isinstance(last, str) and isinstance(parent, dict):
+        parent.pop(last, None)
+
+
+def type_code(value: Any) -> str:
+    if isinstance(value, bool):
+        return "BOOL"
+    if value is None:
+        return "NULL"
+    if isinstance(value, str):
+        return "S"
+    if isinstance(value, int | Decimal):
+        return "N"
+    if isinstance(value, bytes | bytearray):
+        return "B"
+    if isinstance(value, dict):
+        return "M"
+    if isinstance(value, list):
+        return "L"
+    if isinstance(value, set | frozenset):
+        element = next(iter(value), "")
+        return {"S": "SS", "N": "NS", "B": "BS"}[type_code(element)]
+    raise ExpressionError(f"Unsupported type {type(value).__name__}")
+
+
+def evaluate_operand(node: Any, item: dict[str, Any]) -> Any:
+    if isinstance(node, Value):
+        return node.value
+    if isinstance(node, Path):
+        return get_path(item, node)
+    if isinstance(node, Size):
+        value = get_path(item, node.path)
+        if value is MISSING or type_code(value) in {"N", "BOOL", "NULL"}:
+            return MISSING
+        return Decimal(len(value))
+    raise ExpressionError(f"Invalid operand {node!r}")
+
+
+def _comparable(left: Any, right: Any) -> bool:
+    if left is MISSING or right is MISSING:
+        return False
+    return type_code(left) == type_code(right) and type_code(left) in {"S", "N", "B"}
+
+
+_ORDERINGS: dict[str, Callable[[Any, Any], bool]] = {
+    "<": lambda left, right: left < right,
+    "<=": lambda left, right: left <= right,
+    ">": lambda left, right: left > right,
+    ">=": lambda left, right: left >= right,
+}
+
+
+def evaluate_condition(node: Any, item: dict[str, Any]) -> bool:
+    if isinstance(node, And):
+        return evaluate_condition(node.left, item) and evaluate_condition(
+            node.right, item
+        )
+    if isinstance(node, Or):
+        return evaluate_condition(node.left, item) or evaluate_condition(
+            node.right, item
+        )
+    if isinstance(node, Not):
+        return not evaluate_condition(node.condition, item)
+    if isinstance(node, Compare):
+        left = evaluate_operand(node.left, item)
+        right = evaluate_operand(node.right, item)
+        if node.operator == "=":
+            return left is not MISSING and right is not MISSING and left == right
+        if node.operator == "<>":
+            return left is MISSING or right is MISSING or left != right
+        return _comparable(left, right) and _ORDERINGS[node.operator](left, right)
+    if isinstance(node, Between):
+        value = evaluate_operand(node.operand, item)
+        low = evaluate_operand(node.low, item)
+        high = evaluate_operand(node.high, item)
+        return (
+            _comparable(value, low)
+            and _comparable(value, high)
+            and bool(low <= value <= high)
+        )
+    if isinstance(node, In):
+        value = evaluate_operand(node.operand, item)
+        return value is not MISSING and any(
+            value == evaluate_operand(option, item) for option in node.options
+        )
+    if isinstance(node, Function):
+        return _evaluate_function(node, item)
+    raise ExpressionError(f"Invalid condition {node!r}")
+
+
+def _evaluate_function(node: Function, item: dict[str, Any]) -> bool:
+    value = evaluate_operand(node.args[0], item)
+    if node.name == "attribute_exists":
+        return value is not MISSING
+    if node.name == "attribute_not_exists":
+        return value is MISSING
+    if len(node.args) != 2:
+        raise ExpressionError(f"Incorrect number of operands for {node.name}")
+
+    argument = evaluate_operand(node.args[1], item)
+    if value is MISSING or argument is MISSING:
+        return False
+    if node.name == "attribute_type":
+        return bool(type_code(value) == argument)
+    if node.name == "begins_with":
+        if isinstance(value, str) and isinstance(argument, str):
+            return value.startswith(argument)
+        if isinstance(value, bytes) and isinstance(argument, bytes):
+            return value.startswith(argument)
+        return False
+    if node.name == "contains":
+        if isinstance(value, str) and isinstance(argument, str):
+            return argument in value
+        if isinstance(value, set | frozenset | list):
+            return argument in value
+        return False
+    raise ExpressionError(f"Invalid function name; function: {node.name}")
+
+
+def evaluate_set_value(node: Any, item: dict[str, Any]) -> Any:
+    if isinstance(node, IfNotExists):
+        value = get_path(item, node.path)
+        return evaluate_set_value(node.default, item) if value is MISSING else value
+    if isinstance(node, ListAppend):
+        left = evaluate_set_value(node.left, item)
+        right = evaluate_set_value(node.right, item)
+        if not isinstance(left, list) or not isinstance(right, list):
+            raise ExpressionError(
+                "An operand in the update expression has an incorrect data type"
+            )
+        return [*left, *right]
+    if isinstance(node, Arithmetic):
+        left = evaluate_set_value(node.left, item)
+        right = evaluate_set_value(node.right, item)
+        if (
+            type_code(left) != "N"
+            or type_code(right) != "N"
+            or MISSING in (left, right)
+        ):
+            raise ExpressionError(
+                "An operand in the update expression has an incorrect data type"
+            )
+        return left + right if node.operator == "+" else left - right
+
+    value = evaluate_operand(node, item)
+    if value is MISSING:
+        raise ExpressionError(
+            "The provided expression refers to an attribute that does not exist "
+            "in the item"
+        )
+    return value
+
+
+def apply_update(
+    item: dict[str, Any], actions: list[UpdateAction]
+) -> tuple[dict[str, Any], set[str]]:
+    """
+    Returns a copy of `item` with `actions` applied, with every value computed
+    from the original item as DynamoDB does, and the top-level attributes the
+    actions touched.
+    """
+    values = [
+        evaluate_set_value(action.value, item) if action.action == "SET" else None
+        for action in actions
+    ]
+    updated = dict(item)
+    for key in {action.path.elements[0] for action in actions}:
+        # A path starts with an attribute name, never a list index.
+        if isinstance(key, str) and isinstance(updated.get(key), dict | list | set):
+            updated[key] = _copy(updated[key])
+
+    for action, value in zip(actions, values, strict=True):
+        if action.action == "SET":
+            set_path(updated, action.path, value)
+        elif action.action == "REMOVE":
+            remove_path(updated, action.path)
+        elif action.action == "ADD":
+            _add(updated, action.path, action.value.value)
+        else:
+            _delete(updated, action.path, action.value.value)
+    touched = {str(action.path.elements[0]) for action in actions}
+    return updated, touched
+
+
+def _add(item: dict[str, Any], path: Path, operand: Any) -> None:
+    current = get_path(item, path)
+    if type_code(operand) == "N":
+        if current is MISSING:
+            current = Decimal(0)
+        if type_code(current) != "N":
+            raise ExpressionError(
+                "An operand in the update expression has an incorrect data type"
+            )
+        set_path(item, path, current + operand)
+        return
+    if isinstance(operand, set):
+        if current is MISSING:
+            current = set()
+        if not isinstance(current, set):
+            raise ExpressionError(
+                "An operand in the update expression has an incorrect data type"
+            )
+        set_path(item, path, current | operand)
+        return
+    raise ExpressionError("Incorrect operand type for operator or function; ADD")
+
+
+def _delete(item: dict[str, Any], path: Path, operand: Any) -> None:
+    current = get_path(item, path)
+    if current is MISSING:
+        return
+    if not isinstance(current, set) or not isinstance(operand, set):
+        raise ExpressionError("Incorrect operand type for operator or function; DELETE")
+    remaining = current - operand
+    if remaining:
+        set_path(item, path, remaining)
+    else:
+        remove_path(item, path)
+
+
+def project(item: dict[str, Any], paths: list[Path]) -> dict[str, Any]:
+    projected: dict[str, Any] = {}
+    for path in paths:
+        value = get_path(item, path)
+        if value is MISSING:
+            continue
+        target = projected
+        for element in path.elements[:-1]:
+            target = target.setdefault(element, {})  # type: ignore[arg-type]
+        target[path.elements[-1]] = value  # type: ignore[index]
+    return projected
+
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _copy(element) for key, element in value.items()}
+    if isinstance(value, list):
+        return [_copy(element) for element in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
@@ -123,6 +123,31 @@ def verify_password_reset_token(token: str) -> str | None:
         return None
 
 
+def encode_cursor(last_evaluated_key: dict[str, Any], scope: str) -> str:
+    """
+    Wraps a DynamoDB `LastEvaluatedKey` in an opaque, signed cursor bound to
+    `scope`, so a cursor can neither be forged nor replayed against another
+    query.
+    """
+    return jwt.encode(
+        {"key": last_evaluated_key, "scope": scope},
+        settings.SECRET_KEY,
+        algorithm=security.ALGORITHM,
+    )
+
+
+def decode_cursor(cursor: str, scope: str) -> dict[str, Any] | None:
+    try:
+        decoded_cursor = jwt.decode(
+            cursor, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+        )
+    except InvalidTokenError:
+        return None
+    if decoded_cursor.get("scope") != scope:
+        return None
+    return dict(decoded_cursor["key"])
+
+
 def now_iso_format() -> str:
     """Returns current moment in ISO format."""
     return datetime.now(tz=timezone.utc).isoformat()
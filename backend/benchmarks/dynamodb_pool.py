@@ -0,0 +1,53 @@
+"""
+Per-request overhead of building a DynamoDB session and resource for every
+call versus reusing the process-wide pool.
+
+Run from ./backend/ with DynamoDB Local up (`docker compose up dynamodb-local`):
+
+    python -m benchmarks.dynamodb_pool --iterations 200
+"""
+
+import argparse
+import asyncio
+
+from app.core.dynamodb import (
+    create_service_resource,
+    create_session,
+    dynamodb_pool,
+)
+from app.crud import partner as partner_crud
+from app.models.dynamodb.base import get_id
+from benchmarks.utils import measure_async, report
+
+
+async def run(iterations: int) -> None:
+    partner_id = get_id()
+
+    async def per_request() -> None:
+        async with create_service_resource(create_session()) as resource:
+            await partner_crud.get_partner(resource, partner_id)
+
+    async def pooled() -> None:
+        resource = await dynamodb_pool.open()
+        await partner_crud.get_partner(resource, partner_id)
+
+    report(
+        [
+            await measure_async(
+                "session + resource per request", per_request, iterations
+            ),
+            await measure_async("pooled resource", pooled, iterations),
+        ]
+    )
+    await dynamodb_pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
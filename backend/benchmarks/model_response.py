@@ -0,0 +1,93 @@
+"""
+Cost of rendering route responses. FastAPI validates the returned object
+against the `response_model` and then serializes the validated copy, with
+`json.dumps` (or, on recent versions, straight to JSON with pydantic-core).
+`ModelResponse` skips the validation and writes the already validated model
+straight to bytes.
+
+Runs in-process, no database or DynamoDB needed:
+
+    python -m benchmarks.model_response --items 100 1000 --services 100 500
+"""
+
+import argparse
+import uuid
+from typing import Any
+
+from fastapi.responses import JSONResponse, Response
+from fastapi.utils import create_model_field
+from pydantic import BaseModel
+
+from app.api.responses import ModelResponse
+from app.crud.partner import to_model
+from app.models.sql.models import Item, ItemsPublic
+from app.schemas.partners import PartnerPublic
+from benchmarks.partners_load import sample_partner
+from benchmarks.utils import Timing, measure, report
+
+
+def compare(
+    content: BaseModel, response_model: type[BaseModel], iterations: int
+) -> list[Timing]:
+    """Mirrors `fastapi.routing.serialize_response` for the FastAPI cases."""
+    field: Any = create_model_field(name="Response", type_=response_model)
+
+    def validate() -> Any:
+        value, errors = field.validate(content, {}, loc=("response",))
+        assert not errors
+        return value
+
+    timings = [
+        measure(
+            "response_model + json.dumps",
+            lambda: JSONResponse(field.serialize(validate(), by_alias=True)).body,
+            iterations,
+        )
+    ]
+    if hasattr(field, "serialize_json"):
+        timings.append(
+            measure(
+                "response_model + dump_json",
+                lambda: Response(field.serialize_json(validate(), by_alias=True)).body,
+                iterations,
+            )
+        )
+    timings.append(
+        measure(
+            "ModelResponse",
+            lambda: ModelResponse(content, response_model).body,
+            iterations,
+        )
+    )
+    return timings
+
+
+def items_page(count: int) -> ItemsPublic:
+    owner_id = uuid.uuid4()
+    return ItemsPublic(
+        data=[
+            Item(title=f"Item {i}", description="Benchmark item", owner_id=owner_id)
+            for i in range(count)
+        ],
+        count=count,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--services", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    for count in args.items:
+        print(f"\nItemsPublic, {count} items")
+        report(compare(items_page(count), ItemsPublic, args.iterations))
+    for count in args.services:
+        print(f"\nPartnerPublic, {count} services")
+        partner = to_model(sample_partner(count))
+        report(compare(partner, PartnerPublic, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
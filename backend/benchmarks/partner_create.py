@@ -0,0 +1,47 @@
+"""
+Latency of `create_partner` through BatchWriteItem versus TransactWriteItems,
+for partners that fit one transaction and for ones that need chunking.
+
+Run from ./backend/ with DynamoDB Local up (`docker compose up dynamodb-local`):
+
+    python -m benchmarks.partner_create --services 10 90 300 --iterations 50
+"""
+
+import argparse
+import asyncio
+from functools import partial
+
+from app.core.dynamodb import dynamodb_pool
+from app.crud import partner as partner_crud
+from benchmarks.partners_load import sample_partner
+from benchmarks.utils import measure_async, report
+
+
+async def run(services: list[int], iterations: int) -> None:
+    resource = await dynamodb_pool.open()
+    for count in services:
+        partner_in = sample_partner(count)
+        items = len(partner_crud.partner_items(partner_crud.to_model(partner_in)))
+        print(f"\n{count} services, {items} items")
+        batch = partial(partner_crud.create_partner, resource, partner_in)
+        transactional = partial(batch, transactional=True)
+        report(
+            [
+                await measure_async("batch_writer", batch, iterations),
+                await measure_async("transact_write_items", transactional, iterations),
+            ]
+        )
+
+    await dynamodb_pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--services", type=int, nargs="+", default=[10, 90, 300])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.services, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Latency of the partner crud paths, create, get and list, for partners with
+10, 100 and 1000 children, to catch regressions between changes.
+
+Runs against the in-memory table from `app.tests.utils.dynamodb` by default,
+so it needs no DynamoDB and measures the crud code itself (serialization,
+validation, expression building) rather than the network:
+
+    python -m benchmarks.partner_crud --children 10 100 1000 --iterations 50
+
+Pass `--dynamodb-local` to run the same cases against DynamoDB Local
+(`docker compose up dynamodb-local`) instead. The speedup column compares
+each size with the smallest one.
+"""
+
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+from functools import partial
+from typing import Any
+
+from types_aiobotocore_dynamodb import DynamoDBServiceResource
+
+from app.core.config import settings
+from app.core.dynamodb import dynamodb_pool
+from app.crud import partner as partner_crud
+from app.tests.utils.dynamodb import fake_service_resource
+from benchmarks.partners_load import sample_partner
+from benchmarks.utils import Timing, measure_async, report
+
+LISTED_PARTNERS = 100
+LIST_PAGE_SIZE = 50
+
+
+async def cases(
+    resource: DynamoDBServiceResource, children: int
+) -> dict[str, Callable[[], Awaitable[Any]]]:
+    partner_in = sample_partner(children)
+    partner = await partner_crud.create_partner(resource, partner_in)
+    for index in range(LISTED_PARTNERS):
+        listed_in = sample_partner(children)
+        listed_in.name = f"Benchmark {children:04d} {index:03d}"
+        await partner_crud.create_partner(resource, listed_in)
+
+    async def read_partner_row() -> Any:
+        partner_crud.invalidate_partner(partner.id)
+        return await partner_crud.get_partner_view(resource, partner.id, set())
+
+    return {
+        "create_partner": partial(partner_crud.create_partner, resource, partner_in),
+        "create_partner transactional": partial(
+            partner_crud.create_partner, resource, partner_in, transactional=True
+        ),
+        "read_partner": partial(partner_crud.read_partner, resource, partner.id),
+        "get_partner (cached)": partial(partner_crud.get_partner, resource, partner.id),
+        "get_partner_view (row only)": read_partner_row,
+        "list_partners": partial(
+            partner_crud.list_partners,
+            resource,
+            f"Benchmark {children:04d}",
+            LIST_PAGE_SIZE,
+        ),
+    }
+
+
+async def run(children: list[int], iterations: int, dynamodb_local: bool) -> None:
+    if dynamodb_local:
+        resource = await dynamodb_pool.open()
+    else:
+        resource = fake_service_resource(settings.DYNAMODB_TABLE_NAME)
+
+    timings: dict[str, list[Timing]] = {}
+    for count in children:
+        for name, fn in (await cases(resource, count)).items():
+            timing = await measure_async(f"{count} children", fn, iterations)
+            timings.setdefault(name, []).append(timing)
+
+    for name, case_timings in timings.items():
+        print(f"\n{name}")
+        report(case_timings)
+
+    if dynamodb_local:
+        await dynamodb_pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--children", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--dynamodb-local", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.children, args.iterations, args.dynamodb_local))
+
+
+if __name__ == "__main__":
+    main()
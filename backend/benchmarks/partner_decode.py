@@ -0,0 +1,125 @@
+"""
+Cost of decoding a partner collection read back from DynamoDB: the public
+`model_validate` per item, the compiled validator per item
+(`from_dynamodb_item`) and one list validator call per item class
+(`from_dynamodb_items`, used by the crud read paths).
+
+Runs in-process, no DynamoDB needed:
+
+    python -m benchmarks.partner_decode --services 500 --staff 100
+"""
+
+import argparse
+from decimal import Decimal
+from typing import Any
+
+from app.crud.partner import to_model
+from app.models.dynamodb.partners import Partner, Service, Staffer
+from app.schemas.partners import PartnerCreate
+from benchmarks.utils import measure, report
+
+
+def sample_items(services: int, staff: int) -> list[dict[str, Any]]:
+    """Returns the items of one partner collection as DynamoDB returns them."""
+    partner = to_model(
+        PartnerCreate.model_validate(
+            {
+                "name": "Decode Benchmark Barber",
+                "address": {
+                    "country": "Serbia",
+                    "city": "Novi Sad",
+                    "location": {
+                        "address": "Zmaj Jovina 1",
+                        "lat": 45.25,
+                        "lon": 19.84,
+                    },
+                },
+                "working_hours": [
+                    {"day": day, "shifts": [{"start": "09:00", "end": "17:00"}]}
+                    for day in ("monday", "tuesday", "wednesday", "thursday")
+                ],
+                "services": [
+                    {"name": f"Service {i}", "price": 1000 + i, "currency": "RSD"}
+                    for i in range(services)
+                ],
+                "staff": [
+                    {"first_name": f"First {i}", "last_name": f"Last {i}"}
+                    for i in range(staff)
+                ],
+            }
+        )
+    )
+    items = [
+        partner.to_dynamodb_item(exclude={"services", "staff"}),
+        *(service.to_dynamodb_item() for service in partner.services),
+        *(staffer.to_dynamodb_item() for staffer in partner.staff),
+    ]
+    for item in items:
+        location = item.get("address", {}).get("location")
+        if location:
+            location["lat"] = Decimal(str(location["lat"]))
+            location["lon"] = Decimal(str(location["lon"]))
+    return items
+
+
+def split(
+    items: list[dict[str, Any]],
+) -> tuple[dict[str, Any], list[dict[str, Any]], list[dict[str, Any]]]:
+    partner, *children = items
+    services = [item for item in children if item["item_type"] == "SERVICE"]
+    staff = [item for item in children if item["item_type"] == "STAFFER"]
+    return partner, services, staff
+
+
+def decode_model_validate(items: list[dict[str, Any]]) -> Partner:
+    partner_item, service_items, staff_items = split(items)
+    partner = Partner.model_validate(partner_item)
+    partner.services = [Service.model_validate(item) for item in service_items]
+    partner.staff = [Staffer.model_validate(item) for item in staff_items]
+    return partner
+
+
+def decode_per_item(items: list[dict[str, Any]]) -> Partner:
+    partner_item, service_items, staff_items = split(items)
+    partner = Partner.from_dynamodb_item(partner_item)
+    partner.services = [Service.from_dynamodb_item(item) for item in service_items]
+    partner.staff = [Staffer.from_dynamodb_item(item) for item in staff_items]
+    return partner
+
+
+def decode_batched(items: list[dict[str, Any]]) -> Partner:
+    partner_item, service_items, staff_items = split(items)
+    partner = Partner.from_dynamodb_item(partner_item)
+    partner.services = Service.from_dynamodb_items(service_items)
+    partner.staff = Staffer.from_dynamodb_items(staff_items)
+    return partner
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--services", type=int, default=500)
+    parser.add_argument("--staff", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    items = sample_items(args.services, args.staff)
+    cases = [
+        ("model_validate per item", decode_model_validate),
+        ("from_dynamodb_item per item", decode_per_item),
+        ("from_dynamodb_items per class", decode_batched),
+    ]
+    expected = decode_model_validate(items)
+    assert all(decode(items) == expected for _, decode in cases)
+    timings = [
+        measure(name, lambda decode=decode: decode(items), args.iterations)
+        for name, decode in cases
+    ]
+
+    print(f"{len(items)} items per partner")
+    report(timings)
+    for timing in timings:
+        print(f"{timing.name}: {timing.mean_ms * 1000 / len(items):.2f} us per item")
+
+
+if __name__ == "__main__":
+    main()
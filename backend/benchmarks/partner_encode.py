@@ -0,0 +1,79 @@
+"""
+Cost of serializing a `create_partner` payload into DynamoDB items: the
+former `model_dump` plus dict merges per item (with the geohash encoded once
+per GSI attribute) versus the per-class codecs behind `to_dynamodb_item`.
+
+Runs in-process, no DynamoDB needed:
+
+    python -m benchmarks.partner_encode --services 500
+"""
+
+import argparse
+from typing import Any
+
+from app.crud.partner import to_model
+from app.models.dynamodb.base import BaseItem
+from app.models.dynamodb.partners import GEO_INDEX_PARTITION_PRECISION, Partner
+from benchmarks.partners_load import sample_partner
+from benchmarks.utils import measure, report
+
+
+def merged_item(item: BaseItem, exclude: Any = None) -> dict[str, Any]:
+    """Serializes `item` the way `to_dynamodb_item` used to."""
+    dynamodb_item = {
+        "pk": item.pk,
+        "sk": item.sk,
+        "item_type": item.entity_type,
+        **item.model_dump(exclude=exclude),
+    }
+    if isinstance(item, Partner):
+        dynamodb_item.update(
+            {
+                "id": str(item.id),
+                "gsi_sk": item.gsi_sk,
+                "gsi_geo_pk": f"GEO#{item.geohash[:GEO_INDEX_PARTITION_PRECISION]}",
+                "gsi_geo_sk": item.geohash,
+            }
+        )
+    else:
+        dynamodb_item.update({"id": str(item.id), "partner_id": item.partner_id})  # type: ignore[attr-defined]
+    return dynamodb_item
+
+
+def encode_merged(partner: Partner) -> list[dict[str, Any]]:
+    return [
+        merged_item(partner, exclude={"services", "staff"}),
+        *(merged_item(service) for service in partner.services),
+        *(merged_item(staffer) for staffer in partner.staff),
+    ]
+
+
+def encode_codec(partner: Partner) -> list[dict[str, Any]]:
+    return [
+        partner.to_dynamodb_item(exclude={"services", "staff"}),
+        *(service.to_dynamodb_item() for service in partner.services),
+        *(staffer.to_dynamodb_item() for staffer in partner.staff),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--services", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    partner = to_model(sample_partner(args.services))
+    assert encode_merged(partner) == encode_codec(partner)
+
+    report(
+        [
+            measure(
+                "model_dump + merges", lambda: encode_merged(partner), args.iterations
+            ),
+            measure("item codec", lambda: encode_codec(partner), args.iterations),
+        ]
+    )
+
+
+if __name__ == "__main__":
+    main()
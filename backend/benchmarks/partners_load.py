@@ -0,0 +1,113 @@
+"""
+Throughput of partner reads at increasing concurrency: the blocking boto3
+path dispatched to AnyIO's worker threads (how the sync handlers used to run)
+versus the async aioboto3 path used by the partners router.
+
+Run from ./backend/ with DynamoDB Local up (`docker compose up dynamodb-local`):
+
+    python -m benchmarks.partners_load --requests 2000 --concurrency 1 10 50 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import anyio.to_thread
+import boto3
+from botocore.config import Config
+
+from app.core.config import settings
+from app.core.dynamodb import dynamodb_pool
+from app.crud import partner as partner_crud
+from app.schemas.partners import PartnerCreate
+
+
+def sample_partner(services: int) -> PartnerCreate:
+    return PartnerCreate.model_validate(
+        {
+            "name": "Load Test Barber",
+            "address": {
+                "country": "Serbia",
+                "city": "Novi Sad",
+                "location": {"address": "Zmaj Jovina 1", "lat": 45.25, "lon": 19.84},
+            },
+            "working_hours": [
+                {"day": "monday", "shifts": [{"start": "09:00", "end": "17:00"}]}
+            ],
+            "services": [
+                {"name": f"Service {i}", "price": 1000 + i, "currency": "RSD"}
+                for i in range(services)
+            ],
+        }
+    )
+
+
+async def load(
+    fn: Callable[[], Awaitable[Any]], requests: int, concurrency: int
+) -> tuple[float, float]:
+    """Returns (requests per second, p95 latency in ms)."""
+    latencies: list[float] = []
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            start = time.perf_counter()
+            await fn()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, statistics.quantiles(latencies, n=20)[-1] * 1000
+
+
+async def run(requests: int, concurrency_levels: list[int], services: int) -> None:
+    resource = await dynamodb_pool.open()
+    partner = await partner_crud.create_partner(resource, sample_partner(services))
+
+    sync_table = boto3.resource(
+        "dynamodb",
+        region_name=settings.AWS_REGION,
+        endpoint_url=settings.DYNAMODB_URL,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        aws_session_token=settings.AWS_SESSION_TOKEN,
+        config=Config(max_pool_connections=settings.DYNAMODB_MAX_POOL_CONNECTIONS),
+    ).Table(settings.DYNAMODB_TABLE_NAME)
+
+    def blocking_query() -> None:
+        sync_table.query(
+            KeyConditionExpression="#pk=:pk",
+            ExpressionAttributeNames={"#pk": "pk"},
+            ExpressionAttributeValues={":pk": partner.pk},
+        )
+
+    async def threadpool_get() -> None:
+        await anyio.to_thread.run_sync(blocking_query)
+
+    async def async_get() -> None:
+        await partner_crud.get_partner(resource, partner.id)
+
+    print(f"{'concurrency':>12}{'path':>12}{'req/s':>12}{'p95 ms':>12}")
+    for concurrency in concurrency_levels:
+        for name, fn in (("threadpool", threadpool_get), ("async", async_get)):
+            throughput, p95 = await load(fn, requests, concurrency)
+            print(f"{concurrency:>12}{name:>12}{throughput:>12.1f}{p95:>12.2f}")
+
+    await dynamodb_pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--services", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency, args.services))
+
+
+if __name__ == "__main__":
+    main()
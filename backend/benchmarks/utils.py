@@ -0,0 +1,66 @@
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class Timing:
+    name: str
+    samples: list[float]
+
+    @property
+    def mean_ms(self) -> float:
+        return statistics.fmean(self.samples) * 1000
+
+    @property
+    def p50_ms(self) -> float:
+        return statistics.median(self.samples) * 1000
+
+    @property
+    def p95_ms(self) -> float:
+        return statistics.quantiles(self.samples, n=20)[-1] * 1000
+
+
+def measure(
+    name: str, fn: Callable[[], Any], iterations: int, warmup: int = 5
+) -> Timing:
+    """Calls `fn` `warmup` times untimed, then `iterations` times timed."""
+    for _ in range(warmup):
+        fn()
+
+    samples: list[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    return Timing(name=name, samples=samples)
+
+
+async def measure_async(
+    name: str, fn: Callable[[], Awaitable[Any]], iterations: int, warmup: int = 5
+) -> Timing:
+    """Awaits `fn` `warmup` times untimed, then `iterations` times timed."""
+    for _ in range(warmup):
+        await fn()
+
+    samples: list[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+
+    return Timing(name=name, samples=samples)
+
+
+def report(timings: list[Timing]) -> None:
+    baseline = timings[0]
+    print(f"{'case':<40}{'mean ms':>12}{'p50 ms':>12}{'p95 ms':>12}{'speedup':>10}")
+    for timing in timings:
+        speedup = baseline.mean_ms / timing.mean_ms
+        print(
+            f"{timing.name:<40}{timing.mean_ms:>12.3f}{timing.p50_ms:>12.3f}"
+            f"{timing.p95_ms:>12.3f}{speedup:>9.2f}x"
+        )
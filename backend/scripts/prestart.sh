@@ -11,3 +11,6 @@ alembic upgrade head
 
 # Create initial data in DB
 python app/initial_data.py
+
+# Create or update the DynamoDB table and its indexes
+python app/provision_dynamodb.py